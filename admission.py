@@ -0,0 +1,149 @@
+"""
+Controle de admissão para turnos que chamam o LLM
+Limita turnos simultâneos e o tamanho da fila de espera (backpressure)
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from logger import agent_logger
+from metrics import ADMISSION_WAIT
+
+log = agent_logger.with_prefix("ADMISSION")
+
+
+class AdmissionRejected(Exception):
+    """Turno recusado: fila cheia (429) ou espera longa demais (503)"""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Semáforo global de turnos com fila de espera limitada
+
+    Até `max_concurrent` turnos executam ao mesmo tempo; outros `max_queue`
+    aguardam na fila por no máximo `queue_timeout` segundos. Acima disso a
+    requisição é recusada imediatamente, com sugestão de Retry-After baseada
+    na duração média dos turnos.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._avg_turn_seconds = 5.0
+
+    def _retry_after(self) -> int:
+        """Estimativa (segundos) até haver vaga para um novo turno"""
+        turns_ahead = self.waiting + 1
+        return max(1, math.ceil(self._avg_turn_seconds * turns_ahead / self.max_concurrent))
+
+    def check(self):
+        """Recusa de imediato (429) se não há vaga nem lugar na fila; não reserva nada"""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected_queue_full += 1
+            log.warning(f"Fila cheia ({self.waiting}/{self.max_queue}); turno recusado")
+            raise AdmissionRejected(429, self._retry_after(), "Fila de atendimento cheia")
+
+    async def acquire(self):
+        """Aguarda uma vaga ou lança AdmissionRejected"""
+        self.check()
+
+        started = time.monotonic()
+        if self._semaphore.locked():
+            self.waiting += 1
+            try:
+                admitted = await self._wait_for_slot()
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                self.rejected_timeout += 1
+                ADMISSION_WAIT.observe(time.monotonic() - started, outcome="timeout")
+                log.warning(f"Turno aguardou {self.queue_timeout}s na fila; recusado")
+                raise AdmissionRejected(503, self._retry_after(), "Tempo de espera na fila esgotado")
+        else:
+            # Há vaga: acquire() retorna sem suspender, então a contagem não tem corrida
+            await self._semaphore.acquire()
+
+        waited = time.monotonic() - started
+        ADMISSION_WAIT.observe(waited, outcome="admitted")
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.admitted += 1
+        self.active += 1
+
+    async def _wait_for_slot(self) -> bool:
+        """
+        Espera a vaga por até `queue_timeout` segundos; False se o prazo esgotou
+
+        Não usa asyncio.wait_for(semaphore.acquire()): se o prazo ou um
+        cancelamento chegam no mesmo ciclo em que o acquire termina, a vaga
+        obtida se perde. Aqui, ao desistir, a vaga já obtida é devolvida.
+        """
+        pending = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            done, _ = await asyncio.wait({pending}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(pending)
+            raise
+        if done:
+            return True
+        self._abandon(pending)
+        return False
+
+    def _abandon(self, pending: asyncio.Future):
+        """Desiste de uma espera, devolvendo a vaga se o acquire já a obteve"""
+        if not pending.done():
+            pending.cancel()
+        # Se o cancelamento não chegar a tempo, a vaga é devolvida quando o acquire terminar
+        pending.add_done_callback(self._release_if_acquired)
+
+    def _release_if_acquired(self, pending: asyncio.Future):
+        if not pending.cancelled() and pending.exception() is None:
+            self._semaphore.release()
+
+    def release(self, turn_seconds: float):
+        """Libera a vaga e atualiza a duração média dos turnos"""
+        self.active -= 1
+        self._semaphore.release()
+        self._avg_turn_seconds = 0.9 * self._avg_turn_seconds + 0.1 * turn_seconds
+
+    @asynccontextmanager
+    async def slot(self):
+        """Mantém uma vaga durante o bloco"""
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Retorna métricas de admissão"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_wait_seconds": round(self.total_wait_seconds / self.admitted, 4) if self.admitted else 0.0,
+            "max_wait_seconds": round(self.max_wait_seconds, 4),
+            "avg_turn_seconds": round(self._avg_turn_seconds, 4),
+        }
@@ -4,18 +4,22 @@ Agente especializado em classificar problemas e sugerir código de categoria.
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 from config import Config
+from llm_client import ResilientLLMClient
 from rag import search_category_code
 from prompts.prompt_category_classifier import category_classifier_instructions
 
 
 def create_category_classifier_agent() -> Agent:
     """Cria o agente que encontra o código de categoria adequado."""
+    settings = Config.get_agent_model_settings("category_classifier_agent")
     return Agent(
         name="category_classifier_agent",
         model=LiteLlm(
-            model=Config.BEDROCK_CLAUDE_MODEL,
-            temperature=Config.TEMPERATURE,
-            max_tokens=Config.MAX_TOKENS,
+            model=settings["model"],
+            temperature=settings["temperature"],
+            max_tokens=settings["max_tokens"],
+            **Config.get_prompt_cache_args(settings["model"]),
+            llm_client=ResilientLLMClient("category_classifier_agent"),
         ),
         instruction=category_classifier_instructions,
         description="Classifica o problema e encontra o código de categoria mais adequado",
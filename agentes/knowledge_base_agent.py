@@ -4,20 +4,39 @@ Agente especializado em buscar informações na base de conhecimento.
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 from config import Config
-from rag import search_knowledge_base
+from llm_client import ResilientLLMClient
+from rag import search_knowledge_base, kb_response_cache
 from prompts.prompt_rag import rag_instructions
 
 
 def create_rag_agent() -> Agent:
     """Cria o agente que consulta a base de conhecimento."""
-    return Agent(
+    settings = Config.get_agent_model_settings("knowledge_base_agent")
+    # Cache semântico: problemas quase repetidos reaproveitam a resposta sem chamar o LLM
+    cache_callbacks = (
+        {
+            "before_model_callback": kb_response_cache.before_model,
+            "after_model_callback": kb_response_cache.after_model,
+            "after_agent_callback": kb_response_cache.after_agent,
+        }
+        if Config.KB_RESPONSE_CACHE_ENABLED
+        else {}
+    )
+    agent = Agent(
         name="knowledge_base_agent",
         model=LiteLlm(
-            model=Config.BEDROCK_CLAUDE_MODEL,
-            temperature=Config.TEMPERATURE,
-            max_tokens=Config.MAX_TOKENS,
+            model=settings["model"],
+            temperature=settings["temperature"],
+            max_tokens=settings["max_tokens"],
+            **Config.get_prompt_cache_args(settings["model"]),
+            llm_client=ResilientLLMClient("knowledge_base_agent"),
         ),
         instruction=rag_instructions,
         description="Busca soluções técnicas na base de conhecimento",
         tools=[search_knowledge_base],
+        **cache_callbacks,
     )
+    # on_model_error_callback só existe nas versões mais novas do ADK
+    if Config.KB_RESPONSE_CACHE_ENABLED and hasattr(agent, "on_model_error_callback"):
+        agent.on_model_error_callback = kb_response_cache.on_model_error
+    return agent
@@ -4,18 +4,22 @@ Agente especializado em gerenciar reservas de salas.
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 from config import Config
+from llm_client import ResilientLLMClient
 from tools import create_ticket
 from prompts.prompt_reservation import reservation_instructions
 
 
 def create_reservation_agent() -> Agent:
     """Cria o agente responsável pelas reservas."""
+    settings = Config.get_agent_model_settings("reservation_agent")
     return Agent(
         name="reservation_agent",
         model=LiteLlm(
-            model=Config.BEDROCK_CLAUDE_MODEL,
-            temperature=Config.TEMPERATURE,
-            max_tokens=Config.MAX_TOKENS,
+            model=settings["model"],
+            temperature=settings["temperature"],
+            max_tokens=settings["max_tokens"],
+            **Config.get_prompt_cache_args(settings["model"]),
+            llm_client=ResilientLLMClient("reservation_agent"),
         ),
         instruction=reservation_instructions,
         description="Gerencia solicitações de reservas de salas",
@@ -4,17 +4,21 @@ Agente que conduz o suporte técnico direto ao usuário.
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 from config import Config
+from llm_client import ResilientLLMClient
 from prompts.prompt_suport import suport_instructions
 
 
 def create_support_agent() -> Agent:
     """Cria o agente de suporte técnico."""
+    settings = Config.get_agent_model_settings("tech_support_agent")
     return Agent(
         name="tech_support_agent",
         model=LiteLlm(
-            model=Config.BEDROCK_CLAUDE_MODEL,
-            temperature=Config.TEMPERATURE,
-            max_tokens=Config.MAX_TOKENS,
+            model=settings["model"],
+            temperature=settings["temperature"],
+            max_tokens=settings["max_tokens"],
+            **Config.get_prompt_cache_args(settings["model"]),
+            llm_client=ResilientLLMClient("tech_support_agent"),
         ),
         instruction=suport_instructions,
         description="Fornece suporte técnico direto ao usuário",
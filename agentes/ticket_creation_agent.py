@@ -4,18 +4,22 @@ Agente dedicado à criação de tickets de suporte.
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 from config import Config
+from llm_client import ResilientLLMClient
 from tools import create_ticket
 from prompts.prompt_ticket import tickect_instructions
 
 
 def create_ticket_creation_agent() -> Agent:
     """Cria o agente responsável por abrir tickets."""
+    settings = Config.get_agent_model_settings("ticket_creator_agent")
     return Agent(
         name="ticket_creator_agent",
         model=LiteLlm(
-            model=Config.BEDROCK_CLAUDE_MODEL,
-            temperature=Config.TEMPERATURE,
-            max_tokens=Config.MAX_TOKENS,
+            model=settings["model"],
+            temperature=settings["temperature"],
+            max_tokens=settings["max_tokens"],
+            **Config.get_prompt_cache_args(settings["model"]),
+            llm_client=ResilientLLMClient("ticket_creator_agent"),
         ),
         instruction=tickect_instructions,
         description="Cria novos tickets de suporte técnico",
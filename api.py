@@ -18,20 +18,44 @@ os.environ["AWS_REGION"] = os.getenv("AWS_REGION", "us-east-1")
 if "AWS_PROFILE" in os.environ:
     del os.environ["AWS_PROFILE"]
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncGenerator, Tuple
 import asyncio
-from orchestrator import create_orchestrator_agent, ConversationState
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
+from orchestrator import get_orchestrator_agent, ConversationState
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
-from rag import KnowledgeBaseRAG
 import uuid
 from logger import agent_logger
-import boto3
-from botocore.exceptions import BotoCoreError, ClientError
 from config import Config
+from session_manager import session_manager
+from session_store import UserSessionStore, UserTurnLocks
+from attachments import load_attachments, attachment_cache
+from idempotency import IdempotencyCache
+from admission import AdmissionController, AdmissionRejected
+from llm_client import LLMDeadlineExceeded
+from warmup import WarmupStatus, warm_knowledge_base, warm_category_codes
+from metrics import registry, CHAT_REQUESTS, CHAT_LATENCY, STAGE_LATENCY
+from session_repair import repair_adk_session, rollback_last_invocation, get_stored_session
+from session_compaction import compact_completed_attendance
+from history_budget import enforce_history_budget
+from problem_splitter import (
+    prepare_problem_units,
+    format_problem_units,
+    format_category_classification,
+    split_problems,
+    looks_technical,
+)
+from rag import start_turn_prefetch, kb_response_cache, classify_category_code
+from pre_router import pre_router, conversation_in_progress, ROUTE_RESERVATION, RESERVATION_AGENT
+from google.adk.events import Event
 
 api_log = agent_logger.with_prefix("API")
 
@@ -74,8 +98,91 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Serviço de sessão e Runner compartilhados: apenas a sessão do ADK e o
+# ConversationState são criados por usuário
+session_service = InMemorySessionService()
+_runner: Optional[Runner] = None
+_agent_runners: Dict[str, Runner] = {}
+# O aquecimento monta os Runners em outra thread enquanto um /chat pode chegar
+_runner_lock = threading.Lock()
+
+
+async def _release_user_session(user_id: str, session_data: Dict[str, Any]):
+    """Libera tudo que pertence ao usuário: sessão do ADK e sessão de atendimento."""
+    await _delete_adk_session(session_data)
+    session_manager.remove_session(user_id)
+
+
+# Turnos do mesmo usuário são serializados (ex.: mensagens duplicadas do WhatsApp)
+user_turn_locks = UserTurnLocks()
+
 # 🔥 MUDANÇA: Armazenar por user_id ao invés de session_id
-user_sessions: Dict[str, Dict[str, Any]] = {}
+# Limitado por tamanho (LRU) e por ociosidade (TTL) para não crescer sem fim;
+# usuários com turno em andamento ou na fila não são removidos
+user_sessions = UserSessionStore(
+    max_size=Config.SESSION_MAX_USERS,
+    idle_ttl=Config.SESSION_IDLE_TTL_SECONDS,
+    on_evict=_release_user_session,
+    is_busy=lambda user_id: user_turn_locks.pending(user_id) > 0,
+)
+
+
+@asynccontextmanager
+async def _user_turn(user_id: str):
+    """Lock do turno do usuário; renova o acesso à sessão no início e no fim do turno"""
+    async with user_turn_locks.hold(user_id):
+        user_sessions.touch(user_id)
+        try:
+            yield
+        finally:
+            user_sessions.touch(user_id)
+
+# Respostas por chave de idempotência (retentativas do gateway não reprocessam)
+idempotency_cache = IdempotencyCache(
+    ttl=Config.IDEMPOTENCY_TTL_SECONDS,
+    max_entries=Config.IDEMPOTENCY_MAX_ENTRIES,
+)
+
+# Limite global de turnos simultâneos + fila de espera limitada (backpressure)
+admission = AdmissionController(
+    max_concurrent=Config.ADMISSION_MAX_CONCURRENT_TURNS,
+    max_queue=Config.ADMISSION_MAX_QUEUE,
+    queue_timeout=Config.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+)
+
+
+def get_runner() -> Runner:
+    """Retorna o Runner único do processo (cria a árvore de agentes na primeira chamada)."""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                orchestrator = get_orchestrator_agent()
+                _runner = Runner(
+                    app_name=orchestrator.name,
+                    agent=orchestrator,
+                    session_service=session_service
+                )
+    return _runner
+
+
+def get_agent_runner(agent_name: str) -> Runner:
+    """
+    Runner que inicia o turno direto em um subagente (ex.: reservation_agent)
+    
+    Usa o mesmo app e serviço de sessão do orquestrador: o histórico é o mesmo
+    e o turno seguinte continua normalmente pela árvore de agentes.
+    """
+    runner = get_runner()
+    if agent_name not in _agent_runners:
+        with _runner_lock:
+            if agent_name not in _agent_runners:
+                _agent_runners[agent_name] = Runner(
+                    app_name=runner.app_name,
+                    agent=runner.agent.find_agent(agent_name),
+                    session_service=session_service
+                )
+    return _agent_runners[agent_name]
 
 
 class MessageRequest(BaseModel):
@@ -172,56 +279,66 @@ async def get_or_create_user_session(user_id: str) -> tuple:
     Returns:
         Tupla (user_id, runner, state, is_new)
     """
+    runner = get_runner()
+    
     if user_id in user_sessions:
         session_data = user_sessions[user_id]
         return (
             user_id,
-            session_data["runner"],
+            runner,
             session_data["state"],
             False
         )
     
-    # Criar nova sessão para este usuário
-    orchestrator = create_orchestrator_agent()
-    session_service = InMemorySessionService()
-    
-    # Sessão do ADK (framework)
+    # Sessão do ADK (framework) no serviço compartilhado
     adk_session = await session_service.create_session(
-        app_name=orchestrator.name,
+        app_name=runner.app_name,
         session_id=f"adk_{user_id}_{str(uuid.uuid4())[:8]}",  # Sessão interna do ADK
         user_id=user_id  # 🔥 Mas vinculada ao user_id
     )
     
-    runner = Runner(
-        app_name=orchestrator.name,
-        agent=orchestrator,
-        session_service=session_service
-    )
-    
     # Estado COM user_id
     state = ConversationState(user_id=user_id)  # 🔥 IMPORTANTE
     
     # Armazenar por user_id
-    user_sessions[user_id] = {
-        "runner": runner,
+    await user_sessions.set(user_id, {
         "state": state,
         "adk_session": adk_session,
         "user_id": user_id
-    }
+    })
     
     return user_id, runner, state, True
 
 
+# Estado do aquecimento (readiness probe)
+warmup = WarmupStatus()
+_warmup_task: Optional[asyncio.Task] = None
+
+
 @app.on_event("startup")
 async def startup_event():
     """Inicializa o sistema"""
+    global _warmup_task
     api_log.info("Iniciando API do Chatbot de Suporte Técnico")
     
-    # Inicializar base de conhecimento
-    rag = KnowledgeBaseRAG()
-    api_log.success("Base de conhecimento carregada")
+    # Aquecimento em segundo plano: /health responde logo e /ready só fica
+    # verde quando RAGs, embeddings e árvore de agentes estão carregados
+    _warmup_task = asyncio.create_task(warmup.run({
+        "knowledge_base": warm_knowledge_base,
+        "category_codes": warm_category_codes,
+        # Árvore de agentes e Runner criados uma única vez para todos os usuários
+        "agents": get_runner,
+    }))
+    
+    user_sessions.start_sweeper(Config.SESSION_SWEEP_INTERVAL_SECONDS)
     
-    api_log.success("API pronta para receber requisições")
+    api_log.success("API iniciada; aquecimento em andamento (veja GET /ready)")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Finaliza tarefas em segundo plano"""
+    await user_sessions.stop_sweeper()
 
 
 @app.get("/")
@@ -241,9 +358,13 @@ async def root():
         },
         "endpoints": {
             "POST /chat": "Enviar mensagem (use user_id)",
+            "POST /chat/stream": "Enviar mensagem com resposta em streaming (SSE)",
             "GET /user/{user_id}/state": "Obter estado do usuário",
             "DELETE /user/{user_id}": "Limpar sessão do usuário",
-            "GET /health": "Verificar saúde da API"
+            "GET /health": "Verificar saúde da API",
+            "GET /ready": "Verificar se o aquecimento terminou (readiness)",
+            "GET /metrics": "Métricas no formato Prometheus",
+            "GET /kb-cache/audit": "Amostras de acertos do cache de respostas da base de conhecimento"
         }
     }
 
@@ -253,7 +374,109 @@ async def health_check():
     """Health check"""
     return {
         "status": "healthy",
-        "active_users": len(user_sessions)  # 🔥 MUDOU: active_users
+        "active_users": len(user_sessions),  # 🔥 MUDOU: active_users
+        "users_in_turn": len(user_turn_locks),
+        "sessions": user_sessions.get_metrics(),
+        "attachment_cache": attachment_cache.get_metrics(),
+        "idempotency": idempotency_cache.get_metrics(),
+        "admission": admission.get_metrics(),
+        "pre_router": pre_router.get_metrics(),
+        "kb_response_cache": kb_response_cache.get_metrics()
+    }
+
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 apenas quando o aquecimento terminou com sucesso
+    
+    Inclui a prontidão e o tempo de aquecimento de cada componente.
+    """
+    report = warmup.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
+# Gauges e contadores lidos dos componentes no momento da coleta
+registry.register_callback(
+    "chatbot_active_users", "Usuários com sessão ativa na API", lambda: len(user_sessions)
+)
+registry.register_callback(
+    "chatbot_attendance_sessions", "Sessões de atendimento no SessionManager",
+    lambda: len(session_manager.sessions)
+)
+registry.register_callback(
+    "chatbot_users_in_turn", "Usuários com turno em execução ou aguardando", lambda: len(user_turn_locks)
+)
+registry.register_callback(
+    "chatbot_admission_queue_depth", "Turnos aguardando vaga no controle de admissão",
+    lambda: admission.waiting
+)
+registry.register_callback(
+    "chatbot_admission_active_turns", "Turnos em execução", lambda: admission.active
+)
+registry.register_callback(
+    "chatbot_admission_rejected_total", "Turnos recusados pelo controle de admissão",
+    lambda: [
+        ({"reason": "queue_full"}, admission.rejected_queue_full),
+        ({"reason": "timeout"}, admission.rejected_timeout),
+    ],
+    type_name="counter"
+)
+registry.register_callback(
+    "chatbot_session_evictions_total", "Sessões de usuário removidas por motivo",
+    lambda: [
+        ({"reason": "lru"}, user_sessions.evictions_lru),
+        ({"reason": "ttl"}, user_sessions.evictions_ttl),
+        ({"reason": "manual"}, user_sessions.removals_manual),
+    ],
+    type_name="counter"
+)
+registry.register_callback(
+    "chatbot_attachment_cache_requests_total", "Consultas ao cache de anexos",
+    lambda: [
+        ({"result": "hit"}, attachment_cache.hits),
+        ({"result": "miss"}, attachment_cache.misses),
+    ],
+    type_name="counter"
+)
+registry.register_callback(
+    "chatbot_idempotency_requests_total", "Requisições com chave de idempotência",
+    lambda: [
+        ({"result": "completed_hit"}, idempotency_cache.hits_completed),
+        ({"result": "in_flight_hit"}, idempotency_cache.hits_in_flight),
+        ({"result": "miss"}, idempotency_cache.misses),
+    ],
+    type_name="counter"
+)
+registry.register_callback(
+    "chatbot_pre_router_hit_rate", "Fração das mensagens resolvidas sem o orquestrador (LLM)",
+    lambda: pre_router.get_metrics()["hit_rate"]
+)
+registry.register_callback(
+    "chatbot_kb_response_cache_hit_rate", "Fração das consultas do knowledge_base_agent respondidas pelo cache semântico",
+    lambda: kb_response_cache.get_metrics()["hit_rate"]
+)
+registry.register_callback(
+    "chatbot_kb_response_cache_entries", "Respostas no cache semântico do knowledge_base_agent",
+    lambda: kb_response_cache.get_metrics()["entries"]
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Métricas no formato de texto do Prometheus"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/kb-cache/audit")
+async def kb_cache_audit():
+    """
+    Amostras de acertos do cache semântico do knowledge_base_agent para
+    revisão de falsos acertos (resposta reaproveitada para outro problema)
+    """
+    return {
+        "metrics": kb_response_cache.get_metrics(),
+        "samples": kb_response_cache.get_audit_samples()
     }
 
 
@@ -286,7 +509,7 @@ async def delete_user_session(user_id: str):
     if user_id not in user_sessions:
         raise HTTPException(status_code=404, detail=f"Usuário {user_id} não encontrado")
     
-    del user_sessions[user_id]
+    await user_sessions.remove(user_id)
     return {
         "message": "Sessão deletada com sucesso",
         "user_id": user_id
@@ -299,7 +522,14 @@ async def delete_user_session(user_id: str):
     summary="Enviar mensagem ao assistente",
     description="Recebe uma mensagem do usuário, processa (suporte ou reserva) e retorna a resposta e tickets criados."
 )
-async def chat(request: MessageRequest):
+async def chat(
+    request: MessageRequest,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        description="Chave opcional; retentativas com a mesma chave reutilizam a resposta original"
+    )
+):
     """
     Enviar mensagem para o chatbot
     
@@ -337,15 +567,103 @@ async def chat(request: MessageRequest):
     - 3 problemas identificados
     - 3 tickets criados (um para cada)
     - Contexto resetado após processar todos
+    
+    Idempotência: com o header `Idempotency-Key`, uma retentativa devolve a
+    resposta já calculada (ou aguarda o processamento ainda em andamento)
+    em vez de executar o pipeline e criar tickets novamente.
+    """
+    started = time.perf_counter()
+    status = 200
+    try:
+        if idempotency_key:
+            return await idempotency_cache.run(
+                (request.userId, idempotency_key),
+                lambda: _handle_chat(request)
+            )
+        return await _handle_chat(request)
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except Exception:
+        status = 500
+        raise
+    finally:
+        CHAT_LATENCY.observe(time.perf_counter() - started, endpoint="/chat")
+        CHAT_REQUESTS.inc(endpoint="/chat", status=status)
+
+
+def _admission_error(exc: AdmissionRejected) -> HTTPException:
+    """Converte a recusa de admissão em 429/503 com Retry-After."""
+    return HTTPException(
+        status_code=exc.status_code,
+        detail=exc.reason,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+async def _handle_chat(request: MessageRequest) -> MessageResponse:
+    """
+    Aguarda a vez do usuário e depois uma vaga no controle de admissão
+    
+    A vaga global só é pedida por quem já tem o lock do usuário: mensagens do
+    mesmo usuário na fila não ocupam várias vagas.
     """
+    try:
+        admission.check()
+        async with _user_turn(request.userId):
+            async with admission.slot():
+                return await _handle_chat_turn(request)
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+
+
+def _discard_failed_turn(request: MessageRequest) -> bool:
+    """
+    Desfaz na sessão do ADK o turno que falhou e repara o histórico restante
+    
+    Só remove eventos se a mensagem deste turno chegou a ser gravada (a falha
+    pode ter ocorrido antes do runner, ex.: no pré-roteador); caso contrário o
+    turno anterior seria apagado. Deve ser chamada com o lock do usuário.
+    
+    Returns:
+        True se o turno foi desfeito
+    """
+    if request.userId not in user_sessions:
+        return False
+    adk_session = user_sessions[request.userId]["adk_session"]
+    stored = get_stored_session(session_service, adk_session.app_name, adk_session.user_id, adk_session.id)
+    last_user = next((e for e in reversed(stored.events) if e.author == "user"), None) if stored else None
+    parts = last_user.content.parts if last_user and last_user.content and last_user.content.parts else []
+    if not "".join(part.text or "" for part in parts).startswith(request.message):
+        return False
+    rollback_last_invocation(session_service, adk_session)
+    repaired = repair_adk_session(session_service, adk_session, trigger="on_error")
+    api_log.warning(f"Turno interrompido desfeito para {request.userId} ({repaired} reparo(s) no histórico)")
+    return True
+
+
+async def _handle_chat_turn(request: MessageRequest) -> MessageResponse:
+    """Executa o turno com reparo em erro de tool_use/tool_result."""
     try:
         return await _process_chat(request)
+    except LLMDeadlineExceeded as e:
+        # LLM lento/indisponível além do prazo do agente: 504 em vez de prender o
+        # gateway. O turno interrompido (ex.: transferência ou tool_use sem
+        # resposta) é desfeito para não contaminar o próximo
+        api_log.error(f"Prazo do LLM esgotado no /chat: {e}")
+        _discard_failed_turn(request)
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        # Se for erro de tool_use sem tool_result, resetar sessão e tentar uma vez
+        # Erro de tool_use sem tool_result: desfaz o turno que falhou, repara o
+        # histórico restante e tenta uma vez, sem descartar a conversa
         err_msg = str(e)
-        if "tool_use" in err_msg and "tool_result" in err_msg:
-            api_log.warning("Erro de tool_use/tool_result detectado; resetando sessão e tentando novamente")
-            user_sessions.pop(request.user_id, None)
+        if "tool_use" in err_msg and "tool_result" in err_msg and request.userId in user_sessions:
+            # Só desfaz se a mensagem deste turno foi gravada; senão o erro veio
+            # do histórico anterior, que é apenas reparado (sem apagar turnos)
+            if not _discard_failed_turn(request):
+                adk_session = user_sessions[request.userId]["adk_session"]
+                repair_adk_session(session_service, adk_session, trigger="on_error")
+            api_log.warning("Erro de tool_use/tool_result detectado; tentando novamente")
             try:
                 return await _process_chat(request, is_retry=True)
             except Exception as e2:
@@ -355,8 +673,85 @@ async def chat(request: MessageRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def _process_chat(request: MessageRequest, is_retry: bool = False):
+@app.post(
+    "/chat/stream",
+    summary="Enviar mensagem com resposta em streaming (SSE)",
+    description=(
+        "Mesma entrada do POST /chat, mas responde com Server-Sent Events: texto parcial "
+        "(delta), transferências entre agentes (agent_transfer), tickets criados "
+        "(ticket_created) e, por último, o MessageResponse completo (final)."
+    )
+)
+async def chat_stream(request: MessageRequest):
+    """
+    Enviar mensagem e receber os eventos do pipeline à medida que acontecem
+    
+    Útil para reduzir o tempo até o primeiro byte no gateway do WhatsApp.
+    Em caso de erro, é emitido um evento `error` com o detalhe.
+    """
+    # Fila cheia é recusada antes de iniciar a resposta (429 real). Lock do
+    # usuário e vaga são obtidos dentro do gerador: se o corpo nunca for
+    # consumido (cliente desconectou), nada fica preso
+    try:
+        admission.check()
+    except AdmissionRejected as e:
+        CHAT_REQUESTS.inc(endpoint="/chat/stream", status=e.status_code)
+        raise _admission_error(e)
+    
+    async def event_stream():
+        started = time.monotonic()
+        status = 200
+        try:
+            async with _user_turn(request.userId):
+                async with admission.slot():
+                    try:
+                        async for event_type, payload in _run_turn(request, streaming=True):
+                            yield _format_sse(event_type, payload)
+                    except Exception as e:
+                        # Sem retry no streaming: o turno que falhou é desfeito
+                        # (como no /chat) antes de avisar o cliente
+                        status = 504 if isinstance(e, LLMDeadlineExceeded) else 500
+                        api_log.error(f"Erro no endpoint /chat/stream: {e}")
+                        _discard_failed_turn(request)
+                        yield _format_sse("error", {"detail": str(e)})
+        except AdmissionRejected as e:
+            # Espera na fila esgotada depois de a resposta já ter começado
+            status = e.status_code
+            yield _format_sse("error", {"detail": e.reason, "status": e.status_code, "retryAfter": e.retry_after})
+        finally:
+            CHAT_LATENCY.observe(time.monotonic() - started, endpoint="/chat/stream")
+            CHAT_REQUESTS.inc(endpoint="/chat/stream", status=status)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _process_chat(request: MessageRequest, is_retry: bool = False) -> MessageResponse:
     """Processa a mensagem via ADK; permite retry controlado."""
+    response = None
+    async for event_type, payload in _run_turn(request, is_retry=is_retry):
+        if event_type == "final":
+            response = payload
+    return response
+
+
+async def _run_turn(
+    request: MessageRequest,
+    is_retry: bool = False,
+    streaming: bool = False,
+) -> AsyncGenerator[Tuple[str, Any], None]:
+    """
+    Executa um turno do usuário e emite eventos à medida que chegam do runner
+    
+    Eventos emitidos (tipo, payload):
+    - ("delta", {...}): texto parcial do assistente (apenas com streaming=True)
+    - ("agent_transfer", {...}): orquestrador transferiu para outro agente
+    - ("ticket_created", {...}): ticket criado neste turno
+    - ("final", MessageResponse): resposta completa do turno
+    """
     user_id, runner, state, is_new = await get_or_create_user_session(request.userId)
     api_log.info(f"Mensagem recebida | user_id={user_id} | nova_sessao={is_new} | retry={is_retry}")
     api_log.debug(f"Payload: {request.message}")
@@ -364,38 +759,146 @@ async def _process_chat(request: MessageRequest, is_retry: bool = False):
     if state.should_reset_context():
         api_log.warning(f"RESET de contexto para usuário {user_id}")
         state.clear_history_except_current()
+        state.category_classification = None
+    
+    adk_session = user_sessions[user_id]["adk_session"]
+    
+    # Assistente aguardando resposta (pergunta ou subagente em andamento): a
+    # mensagem é uma resposta ao fluxo atual, não uma nova solicitação
+    stored = get_stored_session(session_service, adk_session.app_name, user_id, adk_session.id)
+    in_progress = conversation_in_progress(stored.events if stored else [], runner.agent.name)
+    
+    # Pré-roteador: mensagens triviais não chamam o orquestrador e reservas
+    # claras começam direto no reservation_agent
+    if Config.PRE_ROUTER_ENABLED and not is_retry:
+        route, local_reply = await pre_router.route(
+            request.message,
+            has_attachments=bool(request.attachments),
+            in_progress=in_progress,
+        )
+        if local_reply is not None:
+            state.add_message("user", request.message)
+            state.add_message("assistant", local_reply)
+            await _record_local_exchange(adk_session, runner.agent.name, request.message, local_reply)
+            if streaming:
+                yield "delta", {"agent": "pre_router", "text": local_reply}
+            yield "final", MessageResponse(userId=user_id, message=local_reply, tickets=[])
+            return
+        if route == ROUTE_RESERVATION:
+            runner = get_agent_runner(RESERVATION_AGENT)
+            yield "agent_transfer", {"from": "pre_router", "to": RESERVATION_AGENT}
+    
+    # Pré-busca: mensagem técnica dispara já as buscas vetoriais (da mensagem e de
+    # cada problema); as ferramentas dos agentes leem o resultado do cache do turno
+    technical = looks_technical(request.message)
+    problem_texts = [] if in_progress or not technical else split_problems(request.message)
+    if Config.PREFETCH_ENABLED and technical:
+        start_turn_prefetch([request.message] + (problem_texts if len(problem_texts) > 1 else []))
+    
+    # Classificação local do código de categoria antes do LLM (em paralelo com
+    # os anexos): o orquestrador recebe o código pronto no PASSO 5 e só chama o
+    # category_classifier_agent se ela for ambígua. Respostas no meio do
+    # atendimento mantêm a classificação do problema já descrito
+    classification_task = None
+    if (
+        Config.CATEGORY_FAST_PATH_ENABLED and technical and len(problem_texts) < 2
+        and not (in_progress and state.category_classification)
+    ):
+        classification_task = asyncio.create_task(asyncio.to_thread(classify_category_code, request.message))
     
     full_message = request.message
-    attachment_texts = _load_attachments(request.attachments)
+    with STAGE_LATENCY.time(stage="attachment_load"):
+        attachment_texts = await load_attachments(request.attachments)
     if attachment_texts:
         full_message = f"{request.message}\n\n[ANEXOS]\n" + "\n".join(attachment_texts)
         api_log.info(f"Anexos carregados e adicionados ao contexto ({len(attachment_texts)})")
+    
+    # Vários problemas na mesma mensagem: buscas (base de conhecimento e códigos)
+    # de todos eles em paralelo, entregues ao orquestrador na ordem original.
+    # Respostas no meio de um atendimento não são separadas
+    llm_message = full_message
+    if Config.PROBLEM_SPLITTER_ENABLED and not in_progress:
+        with STAGE_LATENCY.time(stage="problem_prefetch"):
+            problem_units = await prepare_problem_units(request.message)
+        if problem_units:
+            llm_message = f"{full_message}\n\n{format_problem_units(problem_units)}"
+            state.category_classification = None
+            # Reservas também geram ticket (create_ticket): todas as unidades contam
+            state.pending_problem_units = len(problem_units)
+    
+    if classification_task is not None:
+        try:
+            with STAGE_LATENCY.time(stage="category_classification"):
+                state.category_classification = await classification_task
+        except Exception as e:
+            api_log.warning(f"Classificação local de categoria falhou: {e}")
+    if state.category_classification and llm_message == full_message:
+        llm_message = f"{full_message}\n\n{format_category_classification(state.category_classification)}"
 
-    state.add_message("user", full_message)
-    adk_session = user_sessions[user_id]["adk_session"]
+    # No retry a mensagem já está no histórico do estado
+    if not is_retry:
+        state.add_message("user", full_message)
+    
+    # Chamadas de ferramenta sem resposta (ex.: turno anterior interrompido)
+    # são corrigidas antes de enviar o histórico ao modelo
+    repair_adk_session(session_service, adk_session, trigger="pre_turn")
+    
+    # Diagnóstico longo: turnos antigos do atendimento viram um resumo quando o
+    # histórico passa do orçamento de tokens
+    if Config.HISTORY_BUDGET_ENABLED:
+        with STAGE_LATENCY.time(stage="history_budget"):
+            await enforce_history_budget(session_service, adk_session)
     
     try:
         from google.genai.types import Content, Part
-        message_obj = Content(role="user", parts=[Part(text=full_message)])
+        message_obj = Content(role="user", parts=[Part(text=llm_message)])
     except Exception:
-        message_obj = {"role": "user", "content": full_message}
+        message_obj = {"role": "user", "content": llm_message}
     
-    from tools import ticket_api_client, set_current_user_id
+    from tools import ticket_api_client, set_current_user_id, start_ticket_collection
     set_current_user_id(user_id)
-    tickets_before = len(ticket_api_client.local_cache)
-    tickets_before_ids = set(ticket_api_client.local_cache.keys())
+    turn_ticket_ids = start_ticket_collection()
     
     bot_response = ""
     response_chunks = []
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE) if streaming else RunConfig()
     
-    for chunk in runner.run(
+    # Runner assíncrono: as chamadas ao Bedrock não bloqueiam o event loop,
+    # permitindo que turnos de usuários diferentes rodem em paralelo
+    async for chunk in runner.run_async(
         new_message=message_obj,
         session_id=adk_session.id,
-        user_id=user_id
+        user_id=user_id,
+        run_config=run_config
     ):
-        response_chunks.append(chunk)
         api_log.debug(f"Chunk recebido: {type(chunk)}")
         
+        actions = getattr(chunk, "actions", None)
+        transfer_to = getattr(actions, "transfer_to_agent", None) if actions else None
+        if transfer_to:
+            yield "agent_transfer", {"from": getattr(chunk, "author", ""), "to": transfer_to}
+        
+        if hasattr(chunk, "get_function_responses"):
+            for function_response in chunk.get_function_responses():
+                result = function_response.response
+                if function_response.name == "create_ticket" and isinstance(result, dict) and result.get("success"):
+                    yield "ticket_created", {
+                        "ticketId": result.get("ticket_id", ""),
+                        "pending": result.get("status", "open") == "open",
+                        "description": result.get("description", ""),
+                        "groupCode": result.get("group_code", "") or "",
+                        "categoryCode": result.get("category_code", "") or "",
+                    }
+        
+        # Texto parcial (modo streaming): o evento final agregado vem em seguida
+        if getattr(chunk, "partial", False):
+            content = getattr(chunk, "content", None)
+            if content and content.parts and getattr(content.parts[0], "text", None):
+                yield "delta", {"agent": getattr(chunk, "author", ""), "text": content.parts[0].text}
+            continue
+        
+        response_chunks.append(chunk)
+        
         if hasattr(chunk, "content"):
             content = chunk.content
             if isinstance(content, str):
@@ -439,11 +942,22 @@ async def _process_chat(request: MessageRequest, is_retry: bool = False):
     
     state.add_message("assistant", bot_response)
     
-    tickets_after_ids = set(ticket_api_client.local_cache.keys())
-    new_ticket_ids = list(tickets_after_ids - tickets_before_ids)
-
+    # Atendimento encerrado neste turno: o histórico até o ticket vira um resumo,
+    # para que o próximo problema não carregue os anteriores no prompt. Com
+    # problemas separados ainda sem ticket, o bloco [PROBLEMAS IDENTIFICADOS]
+    # continua necessário: a compactação espera o ticket do último deles
+    state.pending_problem_units = max(0, state.pending_problem_units - len(turn_ticket_ids))
+    if turn_ticket_ids and session_manager.should_reset_context(user_id):
+        state.category_classification = None
+        if state.pending_problem_units:
+            api_log.info(
+                f"Compactação adiada: {state.pending_problem_units} problema(s) separado(s) ainda sem ticket"
+            )
+        elif Config.SESSION_COMPACTION_ENABLED:
+            compact_completed_attendance(session_service, adk_session)
+    
     tickets_response = []
-    for tid in new_ticket_ids:
+    for tid in turn_ticket_ids:
         ticket = ticket_api_client.local_cache.get(tid, {})
         pending = ticket.get("status", "open") == "open"
         tickets_response.append(
@@ -457,48 +971,53 @@ async def _process_chat(request: MessageRequest, is_retry: bool = False):
             )
         )
     
-    return MessageResponse(
+    yield "final", MessageResponse(
         userId=user_id,
         message=bot_response,
         tickets=tickets_response,
     )
 
 
-def _load_attachments(paths: Optional[list]) -> list:
-    """Carrega anexos do S3 (texto). Retorna lista de strings."""
-    if not paths:
-        return []
-    texts = []
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
-        region_name=Config.AWS_REGION,
+def _format_sse(event_type: str, payload: Any) -> str:
+    """Formata um evento no padrão Server-Sent Events."""
+    if isinstance(payload, BaseModel):
+        payload = payload.model_dump()
+    return f"event: {event_type}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+async def _record_local_exchange(adk_session, author: str, message: str, reply: str):
+    """Registra na sessão do ADK a troca respondida pelo pré-roteador (mantém o histórico coerente)."""
+    from google.genai.types import Content, Part
+    session = await session_service.get_session(
+        app_name=adk_session.app_name,
+        user_id=adk_session.user_id,
+        session_id=adk_session.id
     )
-    for p in paths:
-        try:
-            bucket, key = _parse_s3_path(p)
-            obj = s3.get_object(Bucket=bucket, Key=key)
-            body = obj["Body"].read()
-            try:
-                text = body.decode("utf-8")
-            except Exception:
-                text = body[:2048].hex()
-            texts.append(f"{p}: {text[:2000]}")
-        except (BotoCoreError, ClientError, ValueError) as e:
-            api_log.warning(f"Não foi possível carregar anexo {p}: {e}")
-            continue
-    return texts
+    if session is None:
+        return
+    invocation_id = f"e-{uuid.uuid4()}"
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id,
+        author="user",
+        content=Content(role="user", parts=[Part(text=message)])
+    ))
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id,
+        author=author,
+        content=Content(role="model", parts=[Part(text=reply)])
+    ))
 
 
-def _parse_s3_path(path: str) -> tuple:
-    """Converte s3://bucket/key ou bucket/key em (bucket, key)."""
-    if path.startswith("s3://"):
-        path = path[len("s3://") :]
-    if "/" not in path:
-        raise ValueError("Formato de caminho inválido para S3. Use s3://bucket/key")
-    bucket, key = path.split("/", 1)
-    return bucket, key
+async def _delete_adk_session(session_data: Dict[str, Any]):
+    """Remove a sessão do ADK do serviço compartilhado."""
+    adk_session = session_data.get("adk_session")
+    if adk_session is None:
+        return
+    await session_service.delete_session(
+        app_name=adk_session.app_name,
+        user_id=adk_session.user_id,
+        session_id=adk_session.id
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,209 @@
+"""
+Carregamento de anexos do S3 para o contexto da conversa
+Cliente S3 compartilhado, downloads em paralelo e leitura apenas dos bytes usados
+Texto extraído fica em cache (LRU por bytes), validado pelo ETag do objeto
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import BotoCoreError, ClientError
+
+from config import Config
+from logger import agent_logger
+
+log = agent_logger.with_prefix("ANEXOS")
+
+_s3_client = None
+
+# Pool próprio dos downloads: uma leitura abandonada no prazo não ocupa o
+# executor padrão do event loop (e termina pelo read_timeout do cliente)
+_executor = ThreadPoolExecutor(max_workers=Config.ATTACHMENT_MAX_WORKERS, thread_name_prefix="s3-anexos")
+
+
+def get_s3_client():
+    """Retorna o cliente S3 compartilhado (thread-safe, com pool de conexões)."""
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client(
+            "s3",
+            aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
+            region_name=Config.AWS_REGION,
+            config=BotoConfig(
+                max_pool_connections=Config.S3_MAX_POOL_CONNECTIONS,
+                connect_timeout=Config.S3_CONNECT_TIMEOUT_SECONDS,
+                read_timeout=Config.S3_READ_TIMEOUT_SECONDS,
+                # Sem retentativas: elas passariam do prazo do anexo
+                retries={"mode": "standard", "total_max_attempts": 1},
+            ),
+        )
+    return _s3_client
+
+
+def parse_s3_path(path: str) -> Tuple[str, str]:
+    """Converte s3://bucket/key ou bucket/key em (bucket, key)."""
+    if path.startswith("s3://"):
+        path = path[len("s3://") :]
+    if "/" not in path:
+        raise ValueError("Formato de caminho inválido para S3. Use s3://bucket/key")
+    bucket, key = path.split("/", 1)
+    return bucket, key
+
+
+class AttachmentCache:
+    """
+    Cache LRU do texto extraído dos anexos, limitado por bytes
+
+    A chave é (bucket, key) e cada entrada guarda o ETag da versão lida; antes
+    de reutilizar, o objeto é validado com um GET condicional (If-None-Match).
+    Thread-safe, pois os downloads rodam em threads.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, bucket: str, key: str) -> Optional[Tuple[str, str]]:
+        """Retorna (etag, texto) da última versão lida, se houver"""
+        with self._lock:
+            entry = self._entries.get((bucket, key))
+            if entry is None:
+                return None
+            self._entries.move_to_end((bucket, key))
+            return entry[0], entry[1]
+
+    def put(self, bucket: str, key: str, etag: str, text: str):
+        """Armazena o texto extraído de uma versão (ETag) do objeto"""
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop((bucket, key), None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            self._entries[(bucket, key)] = (etag, text, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def record(self, hit: bool):
+        """Contabiliza um acerto ou falta do cache"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Retorna métricas do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+attachment_cache = AttachmentCache(max_bytes=Config.ATTACHMENT_CACHE_MAX_BYTES)
+
+
+def _decode_attachment(body: bytes) -> str:
+    """Decodifica o conteúdo como UTF-8; binários viram hex."""
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        # A leitura parcial pode cortar um caractere multibyte no final
+        if exc.start >= len(body) - 3:
+            try:
+                return body[: exc.start].decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        return body[:2048].hex()
+
+
+def _fetch_attachment(path: str) -> str:
+    """
+    Baixa apenas o início do objeto (Range) e retorna o texto do anexo.
+    Se o anexo está em cache, o GET é condicional ao ETag: um 304 reutiliza
+    o texto sem baixar nem decodificar nada.
+    """
+    bucket, key = parse_s3_path(path)
+    cached = attachment_cache.get(bucket, key)
+
+    params = {
+        "Bucket": bucket,
+        "Key": key,
+        "Range": f"bytes=0-{Config.ATTACHMENT_MAX_BYTES - 1}",
+    }
+    if cached:
+        params["IfNoneMatch"] = cached[0]
+
+    etag = ""
+    try:
+        obj = get_s3_client().get_object(**params)
+        etag = obj.get("ETag", "")
+        body = obj["Body"].read()
+    except ClientError as exc:
+        code = exc.response.get("Error", {}).get("Code")
+        if cached and code in ("304", "NotModified"):
+            attachment_cache.record(hit=True)
+            return f"{path}: {cached[1]}"
+        # Objeto vazio não aceita Range
+        if code != "InvalidRange":
+            raise
+        body = b""
+
+    attachment_cache.record(hit=False)
+    text = _decode_attachment(body)[:Config.ATTACHMENT_MAX_CHARS]
+    if etag:
+        attachment_cache.put(bucket, key, etag, text)
+    return f"{path}: {text}"
+
+
+async def load_attachments(paths: Optional[list]) -> List[str]:
+    """
+    Carrega anexos do S3 (texto) em paralelo. Retorna lista de strings
+    na mesma ordem dos caminhos recebidos.
+
+    Anexos que falham ou não terminam dentro de ATTACHMENT_TIMEOUT_SECONDS
+    são ignorados (com aviso no log).
+    """
+    if not paths:
+        return []
+
+    loop = asyncio.get_running_loop()
+    tasks = [asyncio.ensure_future(loop.run_in_executor(_executor, _fetch_attachment, p)) for p in paths]
+    _, pending = await asyncio.wait(tasks, timeout=Config.ATTACHMENT_TIMEOUT_SECONDS)
+    for task in pending:
+        task.cancel()
+
+    texts = []
+    for path, task in zip(paths, tasks):
+        if task in pending:
+            log.warning(f"Tempo esgotado ao carregar anexo {path}")
+            continue
+        exc = task.exception()
+        if exc is not None:
+            if isinstance(exc, (BotoCoreError, ClientError, ValueError)):
+                log.warning(f"Não foi possível carregar anexo {path}: {exc}")
+                continue
+            raise exc
+        texts.append(task.result())
+    return texts
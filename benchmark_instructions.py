@@ -0,0 +1,181 @@
+"""
+Relatório da instrução do orquestrador montada por turno (seções por perfil)
+e verificação de regressão do roteamento.
+
+- Tokens da instrução completa x montada, por tipo de turno
+- Checagem offline: cada turno de referência recebe as seções de que o seu
+  roteamento depende (PASSO 0, fluxo de reserva e/ou fluxo técnico)
+- --live: executa o orquestrador no Bedrock com as duas instruções e compara
+  a primeira ação (agente/ferramenta chamada) de cada turno
+
+Uso:
+    python benchmark_instructions.py
+    python benchmark_instructions.py --live
+"""
+import argparse
+import asyncio
+import sys
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import litellm
+
+from config import Config
+from orchestrator import select_instruction_profile
+from prompts.prompt_orchestrador import (
+    SECAO_FLUXO_RESERVA,
+    SECAO_FLUXO_TECNICO_PASSOS,
+    SECAO_GUARDRAILS,
+    SECAO_PROBLEMAS_SEPARADOS,
+    SECAO_REGRAS_TECNICAS,
+    SECAO_TIPOS,
+    build_orchestrador_instructions,
+    orchestrador_instructions,
+)
+from session_manager import SessionState, session_manager
+
+# (tipo de turno, mensagem, estado do atendimento, primeira ação esperada)
+SAMPLES: List[Tuple[str, str, Optional[SessionState], str]] = [
+    ("reserva", "Preciso reservar a sala 401 amanhã às 14h", None, "reservation_agent"),
+    ("reserva", "Quero agendar o auditório para sexta de manhã", None, "reservation_agent"),
+    ("técnico", "Meu computador está muito lento", None, "knowledge_base_agent"),
+    ("técnico", "A impressora do 3º andar está com papel atolado", None, "knowledge_base_agent"),
+    ("técnico", "Outlook não abre desde ontem", SessionState.COMPLETED, "knowledge_base_agent"),
+    ("confirmação", "Sim, resolveu", SessionState.WAITING_CONFIRMATION, "classify_category_code"),
+    ("confirmação", "Não resolveu, continua igual", SessionState.WAITING_CONFIRMATION, "tech_support_agent"),
+    ("misto", "PC lento E quero reservar a sala 302", None, "knowledge_base_agent"),
+    (
+        "múltiplos",
+        "PC lento E email não abre\n\n[PROBLEMAS IDENTIFICADOS: 2]\n\n### #1 (PROBLEMA TÉCNICO): PC lento"
+        "\n\n### #2 (PROBLEMA TÉCNICO): email não abre\n[FIM DOS PROBLEMAS IDENTIFICADOS]",
+        None,
+        "tech_support_agent",
+    ),
+    ("genérico", "Bom dia, preciso de ajuda", None, "reply"),
+]
+
+TECHNICAL_ACTIONS = {"knowledge_base_agent", "tech_support_agent", "classify_category_code", "category_classifier_agent"}
+
+
+def _tokens(text: str) -> int:
+    return litellm.token_counter(model=Config.BEDROCK_CLAUDE_MODEL, text=text)
+
+
+def _required_sections(message: str, expected: str) -> Dict[str, str]:
+    """Seções das quais o roteamento esperado do turno depende"""
+    required = {"PASSO 0": SECAO_TIPOS, "GUARDRAILS": SECAO_GUARDRAILS}
+    if expected == "reservation_agent" or "reservar" in message.lower():
+        required["FLUXO RESERVA"] = SECAO_FLUXO_RESERVA
+    if expected in TECHNICAL_ACTIONS:
+        required["REGRAS TÉCNICAS"] = SECAO_REGRAS_TECNICAS
+        required["PASSOS 2-7"] = SECAO_FLUXO_TECNICO_PASSOS
+    if "[PROBLEMAS IDENTIFICADOS" in message:
+        required["PROBLEMAS SEPARADOS"] = SECAO_PROBLEMAS_SEPARADOS
+    return required
+
+
+def offline_report() -> bool:
+    """Tabela de tokens por tipo de turno e checagem das seções; retorna True se ok"""
+    full_tokens = _tokens(orchestrador_instructions)
+    by_type: Dict[str, List[int]] = {}
+    failures = []
+
+    print("\n" + "=" * 96)
+    print("📊 INSTRUÇÃO DO ORQUESTRADOR POR TURNO")
+    print("=" * 96)
+    print(f"{'tipo':<13} {'perfil':<12} {'tokens':>7} {'redução':>8}  mensagem")
+    for turn_type, message, state, expected in SAMPLES:
+        profile, new_session, split_problems = select_instruction_profile(message, state)
+        instruction = build_orchestrador_instructions(profile, new_session, split_problems)
+        tokens = _tokens(instruction)
+        by_type.setdefault(turn_type, []).append(tokens)
+        first_line = message.splitlines()[0]
+        print(f"{turn_type:<13} {profile:<12} {tokens:>7} {1 - tokens / full_tokens:>8.0%}  {first_line[:45]}")
+
+        missing = [name for name, section in _required_sections(message, expected).items() if section not in instruction]
+        if missing:
+            failures.append(f"'{first_line[:40]}' ({profile}) sem: {', '.join(missing)}")
+
+    print(f"\nInstrução completa: {full_tokens} tokens")
+    print(f"{'tipo':<13} {'tokens médios':>14} {'redução':>8}")
+    for turn_type, values in by_type.items():
+        average = sum(values) / len(values)
+        print(f"{turn_type:<13} {average:>14.0f} {1 - average / full_tokens:>8.0%}")
+
+    if failures:
+        print("\n❌ Seções de roteamento ausentes:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return False
+    print("\n✅ Todos os turnos recebem as seções de que o roteamento depende")
+    return True
+
+
+async def _first_action(runner, message: str, state: Optional[SessionState]) -> str:
+    """Primeira ferramenta/agente acionado pelo orquestrador (ou 'reply')"""
+    from google.genai.types import Content, Part
+    from tools import set_current_user_id
+
+    user_id = f"bench_{uuid.uuid4().hex[:8]}"
+    set_current_user_id(user_id)
+    if state is not None:
+        session_manager.update_session_state(user_id, state)
+
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id)
+    action = "reply"
+    events = runner.run_async(
+        user_id=user_id, session_id=session.id, new_message=Content(role="user", parts=[Part(text=message)])
+    )
+    try:
+        async for event in events:
+            calls = event.get_function_calls()
+            if event.author == "orchestrator" and calls:
+                call = calls[0]
+                action = call.args.get("agent_name", call.name) if call.name == "transfer_to_agent" else call.name
+                break
+    finally:
+        # Encerra o turno aqui: só a primeira ação interessa
+        await events.aclose()
+        session_manager.remove_session(user_id)
+    return action
+
+
+async def live_report() -> bool:
+    """Compara a primeira ação do orquestrador com a instrução completa e a montada"""
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from orchestrator import create_orchestrator_agent
+
+    runners = {}
+    for dynamic in (False, True):
+        Config.DYNAMIC_INSTRUCTIONS_ENABLED = dynamic
+        agent = create_orchestrator_agent()
+        runners[dynamic] = Runner(app_name=agent.name, agent=agent, session_service=InMemorySessionService())
+
+    print(f"\n{'mensagem':<45} {'completa':<26} {'montada':<26}")
+    mismatches = 0
+    for _, message, state, _ in SAMPLES:
+        full_action = await _first_action(runners[False], message, state)
+        dynamic_action = await _first_action(runners[True], message, state)
+        mark = "✅" if full_action == dynamic_action else "❌"
+        mismatches += full_action != dynamic_action
+        print(f"{message.splitlines()[0][:45]:<45} {full_action:<26} {dynamic_action:<26} {mark}")
+
+    print(f"\n{len(SAMPLES) - mismatches}/{len(SAMPLES)} turnos com o mesmo roteamento")
+    return mismatches == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Compara o roteamento real no Bedrock")
+    args = parser.parse_args()
+
+    ok = offline_report()
+    if args.live:
+        ok = asyncio.run(live_report()) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Relatório da separação local de mensagens com vários problemas
+
+- Separação: mensagens de referência (com e sem vários problemas) x número
+  esperado de unidades; lista as divisões falsas e as que faltaram
+- Buscas: tempo das buscas (base de conhecimento + códigos) de cada mensagem
+  com vários problemas, uma unidade após a outra x todas em paralelo
+- --live: tempo ponta a ponta do /chat no Bedrock com o separador ligado e
+  desligado, para as mesmas mensagens
+
+Uso:
+    python benchmark_splitter.py
+    python benchmark_splitter.py --live
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from typing import List, Tuple
+
+from config import Config
+from problem_splitter import prepare_problem_units, split_problems
+from rag import search_category_code, search_knowledge_base
+
+# (mensagem, unidades esperadas)
+SAMPLES: List[Tuple[str, int]] = [
+    ("PC lento E impressora travada E email não abre", 3),
+    ("O pc está lento e a impressora travou", 2),
+    ("1. pc lento\n2. impressora atolada\n3. email não abre", 3),
+    ("Quero reservar a sala 202, meu pc não liga", 2),
+    ("Meu computador não liga; além disso o outlook não abre", 2),
+    ("Meu computador está muito lento", 1),
+    ("Minha impressora e meu computador estão lentos", 1),
+    ("Windows 10. Não liga", 1),
+    ("Preciso da sala 202 - prédio B no dia 10. Pode ser às 14h?", 1),
+    ("O pc liga e desliga sozinho", 1),
+    ("Não funcionou, continua igual", 1),
+    ("Bom dia\nMeu pc não liga", 1),
+]
+RUNS = 5
+
+
+def split_report() -> bool:
+    """Unidades por mensagem de referência; retorna True se todas conferem"""
+    print("\n" + "=" * 96)
+    print("✂️  SEPARAÇÃO DE PROBLEMAS")
+    print("=" * 96)
+    errors = 0
+    for message, expected in SAMPLES:
+        units = split_problems(message)
+        ok = len(units) == expected
+        errors += not ok
+        flat = message.replace("\n", " / ")
+        print(f"{'✅' if ok else '❌'} {len(units)}/{expected}  {flat[:50]:<50} -> {' | '.join(units)[:60]}")
+    print(f"\n{len(SAMPLES) - errors}/{len(SAMPLES)} mensagens separadas como esperado")
+    return errors == 0
+
+
+def _sequential_lookups(message: str):
+    for text in split_problems(message):
+        search_knowledge_base(text, 3)
+        search_category_code(text, 3)
+
+
+def lookup_report():
+    """Tempo das buscas de todas as unidades: em série x em paralelo"""
+    multi = [message for message, expected in SAMPLES if expected > 1]
+    # Aquecimento: modelo de embeddings e coleções carregados
+    search_knowledge_base("aquecimento", 1)
+    search_category_code("aquecimento", 1)
+
+    print(f"\n{'mensagem':<50} {'unid.':>5} {'série (ms)':>11} {'paralelo (ms)':>14}")
+    for message in multi:
+        sequential, parallel = [], []
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            _sequential_lookups(message)
+            sequential.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            asyncio.run(prepare_problem_units(message))
+            parallel.append(time.perf_counter() - started)
+        flat = message.replace("\n", " / ")
+        print(
+            f"{flat[:50]:<50} {len(split_problems(message)):>5} "
+            f"{statistics.median(sequential) * 1000:>11.0f} {statistics.median(parallel) * 1000:>14.0f}"
+        )
+
+
+async def live_report():
+    """Tempo do /chat (Bedrock) por mensagem com o separador ligado e desligado"""
+    import api
+
+    multi = [message for message, expected in SAMPLES if expected > 1]
+    print(f"\n{'mensagem':<50} {'sem separador (s)':>18} {'com separador (s)':>18}")
+    for message in multi:
+        timings = {}
+        for enabled in (False, True):
+            Config.PROBLEM_SPLITTER_ENABLED = enabled
+            user_id = f"bench_split_{uuid.uuid4().hex[:8]}"
+            started = time.perf_counter()
+            await api.chat(api.MessageRequest(userId=user_id, message=message), idempotency_key=None)
+            timings[enabled] = time.perf_counter() - started
+            await api.user_sessions.remove(user_id)
+        flat = message.replace("\n", " / ")
+        print(f"{flat[:50]:<50} {timings[False]:>18.1f} {timings[True]:>18.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Mede o /chat completo no Bedrock")
+    args = parser.parse_args()
+
+    ok = split_report()
+    lookup_report()
+    if args.live:
+        asyncio.run(live_report())
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
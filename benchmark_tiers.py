@@ -0,0 +1,167 @@
+"""
+Relatório de latência e custo por turno para os perfis de modelo por agente
+(MODEL_TIER_PROFILE). Executa as mesmas conversas com cada perfil contra o
+Bedrock e compara tempo de turno, tokens e custo estimado.
+
+Uso:
+    python benchmark_tiers.py                 # perfis "sonnet" e "tiered"
+    python benchmark_tiers.py tiered          # apenas um perfil
+"""
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from typing import Any, Dict, List
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, Part
+
+from config import Config
+from logger import agent_logger
+from orchestrator import create_orchestrator_agent
+from tools import set_current_user_id
+
+log = agent_logger.with_prefix("BENCHMARK")
+
+# Conversas de referência (uma sessão por conversa)
+SCENARIOS: Dict[str, List[str]] = {
+    "suporte_resolvido": [
+        "Meu computador está muito lento desde ontem",
+        "Reiniciei e agora está normal, resolveu",
+    ],
+    "suporte_escalado": [
+        "A impressora do 3º andar está com papel atolado",
+        "Já tentei abrir a tampa e não saiu, continua travada",
+    ],
+    "multiplos_problemas": [
+        "PC lento E email não abre",
+        "O PC resolveu reiniciando",
+        "O email continua sem abrir",
+    ],
+    "reserva": [
+        "Preciso reservar a sala 401 amanhã das 14h às 16h para uma reunião de equipe",
+        "Pode confirmar",
+    ],
+}
+
+
+def _agent_models(agent) -> Dict[str, str]:
+    """Modelo efetivo de cada agente da árvore (nome -> id do modelo)"""
+    models = {agent.name: getattr(agent.model, "model", str(agent.model))}
+    for sub_agent in agent.sub_agents:
+        models.update(_agent_models(sub_agent))
+    return models
+
+
+def _price(model: str) -> tuple:
+    return Config.MODEL_PRICES_PER_MTOK.get(model, (0.0, 0.0))
+
+
+async def run_profile(profile: str) -> Dict[str, Any]:
+    """Executa todas as conversas com um perfil e agrega tempo, tokens e custo por turno"""
+    Config.MODEL_TIER_PROFILE = profile
+    orchestrator = create_orchestrator_agent()
+    models = _agent_models(orchestrator)
+
+    session_service = InMemorySessionService()
+    runner = Runner(app_name=orchestrator.name, agent=orchestrator, session_service=session_service)
+
+    turn_seconds: List[float] = []
+    turn_costs: List[float] = []
+    tokens_by_agent: Dict[str, Dict[str, int]] = {}
+
+    for scenario, messages in SCENARIOS.items():
+        user_id = f"bench_{profile}_{scenario}"
+        session = await session_service.create_session(
+            app_name=runner.app_name, user_id=user_id, session_id=f"bench_{uuid.uuid4().hex[:8]}"
+        )
+        set_current_user_id(user_id)
+
+        for message in messages:
+            cost = 0.0
+            started = time.perf_counter()
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session.id,
+                new_message=Content(role="user", parts=[Part(text=message)]),
+            ):
+                usage = getattr(event, "usage_metadata", None)
+                if usage is None or event.partial:
+                    continue
+                model = models.get(event.author, Config.BEDROCK_CLAUDE_MODEL)
+                input_tokens = usage.prompt_token_count or 0
+                output_tokens = usage.candidates_token_count or 0
+                cache_read = getattr(usage, "cached_content_token_count", None) or 0
+                cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+                agent_tokens = tokens_by_agent.setdefault(
+                    event.author, {"input": 0, "output": 0, "cache_read": 0, "cache_write": 0}
+                )
+                agent_tokens["input"] += input_tokens
+                agent_tokens["output"] += output_tokens
+                agent_tokens["cache_read"] += cache_read
+                agent_tokens["cache_write"] += cache_write
+                price_in, price_out = _price(model)
+                # Tokens servidos/gravados no cache de prompt têm preço próprio
+                uncached = max(0, input_tokens - cache_read - cache_write)
+                cost += (
+                    uncached * price_in
+                    + cache_read * price_in * Config.PROMPT_CACHE_READ_PRICE_FACTOR
+                    + cache_write * price_in * Config.PROMPT_CACHE_WRITE_PRICE_FACTOR
+                    + output_tokens * price_out
+                ) / 1_000_000
+
+            turn_seconds.append(time.perf_counter() - started)
+            turn_costs.append(cost)
+            log.info(f"[{profile}] {scenario}: {turn_seconds[-1]:.2f}s | US$ {cost:.5f} | '{message[:40]}'")
+
+    return {
+        "profile": profile,
+        "models": models,
+        "turns": len(turn_seconds),
+        "latency_avg": statistics.mean(turn_seconds),
+        "latency_p95": sorted(turn_seconds)[min(len(turn_seconds) - 1, int(len(turn_seconds) * 0.95))],
+        "cost_avg": statistics.mean(turn_costs),
+        "tokens_by_agent": tokens_by_agent,
+    }
+
+
+def print_report(results: List[Dict[str, Any]]):
+    """Tabela comparativa entre perfis"""
+    print("\n" + "=" * 78)
+    print("📊 LATÊNCIA E CUSTO POR TURNO POR PERFIL DE MODELO")
+    print("=" * 78)
+    print(f"{'perfil':<10} {'turnos':>7} {'lat. média (s)':>15} {'lat. p95 (s)':>13} {'custo/turno (US$)':>18}")
+    for result in results:
+        print(
+            f"{result['profile']:<10} {result['turns']:>7} {result['latency_avg']:>15.2f} "
+            f"{result['latency_p95']:>13.2f} {result['cost_avg']:>18.5f}"
+        )
+
+    for result in results:
+        print(f"\n[{result['profile']}] tokens por agente")
+        for agent, tokens in sorted(result["tokens_by_agent"].items()):
+            model = result["models"].get(agent, "-").split("/")[-1]
+            print(
+                f"  {agent:<28} {model:<45} in={tokens['input']:>7} out={tokens['output']:>6} "
+                f"cache_read={tokens['cache_read']:>7} cache_write={tokens['cache_write']:>6}"
+            )
+
+    if len(results) > 1:
+        base, other = results[0], results[-1]
+        print(
+            f"\n{other['profile']} vs {base['profile']}: latência "
+            f"{(other['latency_avg'] / base['latency_avg'] - 1):+.0%}, custo "
+            f"{(other['cost_avg'] / base['cost_avg'] - 1) if base['cost_avg'] else 0:+.0%}"
+        )
+
+
+async def main():
+    profiles = sys.argv[1:] or ["sonnet", "tiered"]
+    results = [await run_profile(profile) for profile in profiles]
+    print_report(results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
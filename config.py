@@ -36,7 +36,7 @@ class Config:
     # Claude Model no Bedrock
     # Formato correto para LiteLLM: bedrock/MODEL_ID (sem região no ID)
     # O modelo ID correto para Bedrock usa o prefixo da região: us.anthropic ou apenas anthropic
-    BEDROCK_CLAUDE_MODEL = "bedrock/us.anthropic.claude-3-5-sonnet-20240620-v1:0"
+    BEDROCK_CLAUDE_MODEL = os.getenv("BEDROCK_CLAUDE_MODEL", "bedrock/us.anthropic.claude-3-5-sonnet-20240620-v1:0")
     
     # Modelos alternativos disponíveis:
     # BEDROCK_CLAUDE_MODEL = "bedrock/anthropic.claude-3-5-sonnet-20241022-v2:0"  # Sonnet 3.5 v2
@@ -50,6 +50,146 @@ class Config:
     TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))  # 0.0 = mais determinístico, 1.0 = mais criativo
     MAX_TOKENS = int(os.getenv("MAX_TOKENS", "4096"))
     
+    # Modelo menor/mais rápido para agentes com saída curta e estruturada
+    BEDROCK_FAST_MODEL = os.getenv("BEDROCK_FAST_MODEL", "bedrock/us.anthropic.claude-3-haiku-20240307-v1:0")
+    
+    # Perfis de modelo por agente (modelo, temperatura, limite de saída)
+    # - "sonnet" (padrão): todos os agentes no BEDROCK_CLAUDE_MODEL com TEMPERATURE/MAX_TOKENS
+    # - "tiered": classificador, RAG e criação de ticket no modelo rápido; conversa no Sonnet.
+    #   TEMPERATURE/MAX_TOKENS definidos no ambiente continuam valendo para todos os agentes
+    # Ajuste fino por agente via env (vale sobre tudo): AGENT_<NOME>_MODEL / _TEMPERATURE / _MAX_TOKENS
+    # (ex.: AGENT_TECH_SUPPORT_AGENT_MAX_TOKENS=1500)
+    MODEL_TIER_PROFILE = os.getenv("MODEL_TIER_PROFILE", "sonnet")
+    AGENT_MODEL_TIERS = {
+        "orchestrator": {"model": BEDROCK_CLAUDE_MODEL, "temperature": 0.3, "max_tokens": 1024},
+        "tech_support_agent": {"model": BEDROCK_CLAUDE_MODEL, "temperature": 0.5, "max_tokens": 1024},
+        "reservation_agent": {"model": BEDROCK_CLAUDE_MODEL, "temperature": 0.3, "max_tokens": 1024},
+        "knowledge_base_agent": {"model": BEDROCK_FAST_MODEL, "temperature": 0.2, "max_tokens": 512},
+        "category_classifier_agent": {"model": BEDROCK_FAST_MODEL, "temperature": 0.0, "max_tokens": 256},
+        "ticket_creator_agent": {"model": BEDROCK_FAST_MODEL, "temperature": 0.0, "max_tokens": 512},
+    }
+    
+    # Preço (USD por 1M de tokens: entrada, saída) para o relatório de custo por turno
+    MODEL_PRICES_PER_MTOK = {
+        "bedrock/us.anthropic.claude-3-5-sonnet-20240620-v1:0": (3.00, 15.00),
+        "bedrock/anthropic.claude-3-5-sonnet-20241022-v2:0": (3.00, 15.00),
+        "bedrock/us.anthropic.claude-3-haiku-20240307-v1:0": (0.25, 1.25),
+        "bedrock/anthropic.claude-3-haiku-20240307-v1:0": (0.25, 1.25),
+    }
+    
+    # Cache de prompt do Bedrock: a instrução de sistema (estática) de cada agente
+    # é marcada como prefixo cacheável; leituras/escritas em chatbot_llm_tokens_total.
+    # O Bedrock só tem cache de prompt em alguns modelos (ex.: Claude 3.7 Sonnet,
+    # 3.5 Haiku, Sonnet 4). Os modelos padrão (3.5 Sonnet v1 e Haiku 3) NÃO têm:
+    # com eles o cache fica inativo (aviso no log da inicialização). Para ativar,
+    # use BEDROCK_CLAUDE_MODEL/BEDROCK_FAST_MODEL (ou AGENT_<NOME>_MODEL) com um
+    # modelo compatível, ex.: bedrock/us.anthropic.claude-3-5-haiku-20241022-v1:0
+    PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+    # Preço relativo à entrada normal (Anthropic/Bedrock: leitura 10%, escrita 125%)
+    PROMPT_CACHE_READ_PRICE_FACTOR = float(os.getenv("PROMPT_CACHE_READ_PRICE_FACTOR", "0.1"))
+    PROMPT_CACHE_WRITE_PRICE_FACTOR = float(os.getenv("PROMPT_CACHE_WRITE_PRICE_FACTOR", "1.25"))
+    
+    # Política das chamadas ao LLM (llm_client.py): prazo total por chamada,
+    # retentativas com backoff exponencial e jitter em throttling/indisponibilidade
+    # e hedge opcional (segunda requisição após a latência p95 do agente).
+    # Prazo por agente via env: AGENT_<NOME>_DEADLINE_SECONDS
+    LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "45"))
+    AGENT_LLM_DEADLINES = {
+        "orchestrator": 30.0,
+        "tech_support_agent": 45.0,
+        "reservation_agent": 30.0,
+        "knowledge_base_agent": 20.0,
+        "category_classifier_agent": 15.0,
+        "ticket_creator_agent": 20.0,
+    }
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+    LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+    # Hedge dobra o custo das chamadas lentas: desligado por padrão e só nos agentes listados
+    LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_AGENTS = os.getenv("LLM_HEDGE_AGENTS", "knowledge_base_agent,category_classifier_agent").split(",")
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+    LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+    
+    # Instrução do orquestrador montada por turno (só as seções do fluxo em uso)
+    DYNAMIC_INSTRUCTIONS_ENABLED = os.getenv("DYNAMIC_INSTRUCTIONS_ENABLED", "true").lower() == "true"
+    
+    # Sessões de usuário da API (limite de memória)
+    SESSION_MAX_USERS = int(os.getenv("SESSION_MAX_USERS", "5000"))
+    SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "1800"))
+    SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "60"))
+    
+    # Compactação da sessão do ADK ao encerrar um atendimento (ticket criado)
+    SESSION_COMPACTION_ENABLED = os.getenv("SESSION_COMPACTION_ENABLED", "true").lower() == "true"
+    SESSION_COMPACTION_MAX_TICKETS = int(os.getenv("SESSION_COMPACTION_MAX_TICKETS", "10"))
+    SESSION_COMPACTION_REQUEST_CHARS = int(os.getenv("SESSION_COMPACTION_REQUEST_CHARS", "300"))
+    
+    # Orçamento de tokens do histórico: turnos antigos do atendimento viram um resumo
+    HISTORY_BUDGET_ENABLED = os.getenv("HISTORY_BUDGET_ENABLED", "true").lower() == "true"
+    HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+    # Mínimo de turnos recentes mantidos sem resumo
+    HISTORY_KEEP_RECENT_TURNS = int(os.getenv("HISTORY_KEEP_RECENT_TURNS", "1"))
+    # Ao passar do orçamento, resume até o histórico (resumo incluso) caber nesta
+    # fração dele: a folga evita um novo resumo logo no turno seguinte
+    HISTORY_LOW_WATER_RATIO = float(os.getenv("HISTORY_LOW_WATER_RATIO", "0.5"))
+    HISTORY_SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", BEDROCK_FAST_MODEL)
+    HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "400"))
+    HISTORY_SUMMARY_TIMEOUT_SECONDS = float(os.getenv("HISTORY_SUMMARY_TIMEOUT_SECONDS", "10"))
+    # Mensagens guardadas no ConversationState (log/estado; não vão ao modelo)
+    STATE_HISTORY_MAX_MESSAGES = int(os.getenv("STATE_HISTORY_MAX_MESSAGES", "50"))
+    
+    # Anexos (S3): apenas o início de cada arquivo entra no contexto
+    ATTACHMENT_MAX_CHARS = int(os.getenv("ATTACHMENT_MAX_CHARS", "2000"))
+    ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(ATTACHMENT_MAX_CHARS * 4)))  # UTF-8: até 4 bytes/caractere
+    ATTACHMENT_TIMEOUT_SECONDS = float(os.getenv("ATTACHMENT_TIMEOUT_SECONDS", "5"))
+    S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+    ATTACHMENT_MAX_WORKERS = int(os.getenv("ATTACHMENT_MAX_WORKERS", "16"))
+    # Abaixo do prazo dos anexos, para que leituras abandonadas terminem
+    S3_CONNECT_TIMEOUT_SECONDS = float(os.getenv("S3_CONNECT_TIMEOUT_SECONDS", str(ATTACHMENT_TIMEOUT_SECONDS / 2)))
+    S3_READ_TIMEOUT_SECONDS = float(os.getenv("S3_READ_TIMEOUT_SECONDS", str(ATTACHMENT_TIMEOUT_SECONDS * 0.8)))
+    ATTACHMENT_CACHE_MAX_BYTES = int(os.getenv("ATTACHMENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    
+    # Idempotência do /chat (retentativas do gateway)
+    IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    
+    # Controle de admissão: turnos simultâneos e fila de espera
+    ADMISSION_MAX_CONCURRENT_TURNS = int(os.getenv("ADMISSION_MAX_CONCURRENT_TURNS", "32"))
+    ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+    ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "30"))
+    
+    # Pré-roteador: saudações/confirmações respondidas sem chamar o LLM
+    PRE_ROUTER_ENABLED = os.getenv("PRE_ROUTER_ENABLED", "true").lower() == "true"
+    PRE_ROUTER_SIMILARITY_THRESHOLD = float(os.getenv("PRE_ROUTER_SIMILARITY_THRESHOLD", "0.85"))
+    PRE_ROUTER_MAX_WORDS = int(os.getenv("PRE_ROUTER_MAX_WORDS", "6"))
+    
+    # Mensagens com vários problemas: separação local e buscas em paralelo
+    PROBLEM_SPLITTER_ENABLED = os.getenv("PROBLEM_SPLITTER_ENABLED", "true").lower() == "true"
+    
+    # Pré-busca (base de conhecimento e códigos) disparada na chegada da mensagem
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    PREFETCH_MAX_WORKERS = int(os.getenv("PREFETCH_MAX_WORKERS", "8"))
+    PREFETCH_N_RESULTS = int(os.getenv("PREFETCH_N_RESULTS", "5"))
+    PREFETCH_WAIT_SECONDS = float(os.getenv("PREFETCH_WAIT_SECONDS", "5"))
+    
+    # Classificação rápida de categoria por embeddings (LLM só em caso ambíguo)
+    CATEGORY_FAST_PATH_ENABLED = os.getenv("CATEGORY_FAST_PATH_ENABLED", "true").lower() == "true"
+    CATEGORY_FAST_PATH_CANDIDATES = int(os.getenv("CATEGORY_FAST_PATH_CANDIDATES", "5"))
+    CATEGORY_FAST_PATH_MIN_MARGIN = float(os.getenv("CATEGORY_FAST_PATH_MIN_MARGIN", "0.05"))
+    CATEGORY_FAST_PATH_MIN_SCORE = float(os.getenv("CATEGORY_FAST_PATH_MIN_SCORE", "0.3"))
+    CATEGORY_CONFIDENCE_TEMPERATURE = float(os.getenv("CATEGORY_CONFIDENCE_TEMPERATURE", "0.05"))
+    
+    # Cache semântico das respostas do knowledge_base_agent
+    KB_RESPONSE_CACHE_ENABLED = os.getenv("KB_RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    KB_RESPONSE_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("KB_RESPONSE_CACHE_SIMILARITY_THRESHOLD", "0.92"))
+    KB_RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("KB_RESPONSE_CACHE_TTL_SECONDS", "21600"))
+    KB_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("KB_RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    KB_RESPONSE_CACHE_AUDIT_RATE = float(os.getenv("KB_RESPONSE_CACHE_AUDIT_RATE", "0.05"))
+    KB_RESPONSE_CACHE_AUDIT_BORDERLINE = float(os.getenv("KB_RESPONSE_CACHE_AUDIT_BORDERLINE", "0.02"))
+    KB_RESPONSE_CACHE_AUDIT_MAX_SAMPLES = int(os.getenv("KB_RESPONSE_CACHE_AUDIT_MAX_SAMPLES", "200"))
+    
     # API de Tickets (JSONPlaceholder como exemplo)
     TICKET_API_BASE_URL = "https://jsonplaceholder.typicode.com"
     
@@ -77,6 +217,74 @@ class Config:
             "aws_secret_access_key": cls.AWS_SECRET_ACCESS_KEY,
             "aws_region_name": cls.AWS_REGION
         }
+    
+    @classmethod
+    def get_agent_model_settings(cls, agent_name: str) -> dict:
+        """
+        Modelo, temperatura e max_tokens do agente conforme o perfil ativo
+        (MODEL_TIER_PROFILE). Precedência: AGENT_<NOME>_* > TEMPERATURE/MAX_TOKENS
+        globais definidos no ambiente > tabela do perfil "tiered"
+        """
+        settings = {"model": cls.BEDROCK_CLAUDE_MODEL, "temperature": cls.TEMPERATURE, "max_tokens": cls.MAX_TOKENS}
+        if cls.MODEL_TIER_PROFILE == "tiered" and agent_name in cls.AGENT_MODEL_TIERS:
+            tier = cls.AGENT_MODEL_TIERS[agent_name]
+            settings["model"] = tier["model"]
+            if not os.getenv("TEMPERATURE"):
+                settings["temperature"] = tier["temperature"]
+            if not os.getenv("MAX_TOKENS"):
+                settings["max_tokens"] = tier["max_tokens"]
+        
+        prefix = f"AGENT_{agent_name.upper()}_"
+        if os.getenv(prefix + "MODEL"):
+            settings["model"] = os.getenv(prefix + "MODEL")
+        if os.getenv(prefix + "TEMPERATURE"):
+            settings["temperature"] = float(os.getenv(prefix + "TEMPERATURE"))
+        if os.getenv(prefix + "MAX_TOKENS"):
+            settings["max_tokens"] = int(os.getenv(prefix + "MAX_TOKENS"))
+        
+        from logger import agent_logger
+        agent_logger.info(
+            f"Modelo de {agent_name} (perfil {cls.MODEL_TIER_PROFILE}): {settings['model']} | "
+            f"temperatura={settings['temperature']} | max_tokens={settings['max_tokens']}"
+        )
+        return settings
+    
+    @classmethod
+    def get_llm_policy(cls, agent_name: str) -> dict:
+        """Prazo, retentativas e hedge das chamadas ao LLM do agente"""
+        deadline = cls.AGENT_LLM_DEADLINES.get(agent_name, cls.LLM_DEADLINE_SECONDS)
+        env_deadline = os.getenv(f"AGENT_{agent_name.upper()}_DEADLINE_SECONDS")
+        if env_deadline:
+            deadline = float(env_deadline)
+        return {
+            "deadline_seconds": deadline,
+            "max_retries": cls.LLM_MAX_RETRIES,
+            "hedging": cls.LLM_HEDGING_ENABLED and agent_name in cls.LLM_HEDGE_AGENTS,
+        }
+    
+    @classmethod
+    def get_prompt_cache_args(cls, model: str) -> dict:
+        """
+        Argumentos do LiteLlm que marcam a mensagem de sistema como ponto de
+        cache (cachePoint no Bedrock); vazio se o cache de prompt está desligado
+        ou se o modelo não tem cache de prompt (o LiteLLM descartaria o marcador)
+        """
+        if not cls.PROMPT_CACHE_ENABLED:
+            return {}
+        from litellm.utils import supports_prompt_caching
+        
+        try:
+            supported = supports_prompt_caching(model=model)
+        except Exception:
+            supported = False
+        if not supported:
+            from logger import agent_logger
+            agent_logger.warning(
+                f"Cache de prompt inativo para {model}: o modelo não tem cache de prompt no Bedrock "
+                f"(use um modelo compatível, ex.: Claude 3.5 Haiku ou 3.7 Sonnet)"
+            )
+            return {}
+        return {"cache_control_injection_points": [{"location": "message", "role": "system"}]}
 
 
 # Validar configurações ao importar
@@ -0,0 +1,182 @@
+"""
+Orçamento de tokens do histórico da sessão do ADK
+Quando o histórico do atendimento passa do orçamento, os turnos mais antigos
+viram um resumo contínuo (modelo rápido); os últimos turnos ficam como estão.
+Assim o custo e a latência por turno não crescem em diagnósticos longos
+"""
+import asyncio
+import json
+from typing import Dict, List, Tuple
+
+import litellm
+from google.adk.events import Event
+from google.genai import types
+
+from config import Config
+from llm_client import ResilientLLMClient
+from logger import agent_logger
+from metrics import HISTORY_CONDENSATIONS, LLM_TOKENS
+from prompts.prompt_resumo import resumo_instructions
+from session_compaction import SUMMARY_HEADER as ATTENDANCE_SUMMARY_HEADER
+from session_repair import get_stored_session
+
+log = agent_logger.with_prefix("HISTORY")
+
+RUNNING_SUMMARY_HEADER = "[RESUMO DA CONVERSA DO ATENDIMENTO ATUAL - contexto interno, não responda a esta mensagem]"
+
+_summary_client = ResilientLLMClient("history_summarizer", deadline_seconds=Config.HISTORY_SUMMARY_TIMEOUT_SECONDS)
+
+
+def _event_text(event: Event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    return " ".join(part.text for part in event.content.parts if part.text).strip()
+
+
+def _render_event(event: Event) -> str:
+    """Evento como texto (mensagem, chamada ou resultado de ferramenta)"""
+    lines = []
+    text = _event_text(event)
+    if text:
+        speaker = "Usuário" if event.author == "user" else f"Assistente ({event.author})"
+        lines.append(f"{speaker}: {text}")
+    for call in event.get_function_calls():
+        lines.append(f"Chamada {call.name}: {json.dumps(call.args or {}, ensure_ascii=False, default=str)}")
+    for response in event.get_function_responses():
+        lines.append(f"Resultado {response.name}: {json.dumps(response.response or {}, ensure_ascii=False, default=str)}")
+    return "\n".join(lines)
+
+
+def _count_tokens(text: str) -> int:
+    return litellm.token_counter(model=Config.BEDROCK_CLAUDE_MODEL, text=text) if text else 0
+
+
+def count_history_tokens(events: List[Event]) -> int:
+    """Tokens do histórico, contados no tokenizador do modelo principal"""
+    return _count_tokens("\n".join(_render_event(event) for event in events))
+
+
+def _event_tokens(events: List[Event]) -> List[int]:
+    """Tokens de cada evento (a soma aproxima a contagem do histórico inteiro)"""
+    return [_count_tokens(_render_event(event)) for event in events]
+
+
+def _is_turn_start(event: Event) -> bool:
+    """Mensagem do usuário (não resultado de ferramenta nem resumo interno)"""
+    if event.author != "user" or event.get_function_responses():
+        return False
+    text = _event_text(event)
+    return bool(text) and not text.startswith((ATTENDANCE_SUMMARY_HEADER, RUNNING_SUMMARY_HEADER))
+
+
+def _choose_cut(head: int, turn_starts: List[int], event_tokens: List[int]) -> int:
+    """
+    Início do trecho mantido: o turno mais antigo a partir do qual o histórico
+    mantido, somado ao resumo, cabe na marca baixa (HISTORY_LOW_WATER_RATIO do
+    orçamento). Nunca mantém menos que HISTORY_KEEP_RECENT_TURNS turnos e
+    sempre resume pelo menos o primeiro turno.
+    """
+    low_water = Config.HISTORY_TOKEN_BUDGET * Config.HISTORY_LOW_WATER_RATIO - Config.HISTORY_SUMMARY_MAX_TOKENS
+    latest_cut = turn_starts[-Config.HISTORY_KEEP_RECENT_TURNS]
+    for start in turn_starts:
+        if start > head and sum(event_tokens[start:]) <= low_water:
+            return min(start, latest_cut)
+    return latest_cut
+
+
+def _fallback_summary(events: List[Event]) -> str:
+    """Resumo extrativo (sem LLM): mensagens do usuário e última resposta do assistente"""
+    lines = []
+    for event in events:
+        text = _event_text(event)
+        if text.startswith(RUNNING_SUMMARY_HEADER):
+            lines.append(text[len(RUNNING_SUMMARY_HEADER) :].strip())
+        elif _is_turn_start(event):
+            lines.append(f"- Usuário: {text[:300]}")
+    last_reply = next(
+        (_event_text(e) for e in reversed(events) if e.author != "user" and _event_text(e)),
+        "",
+    )
+    if last_reply:
+        lines.append(f"- Última resposta do assistente: {last_reply[:500]}")
+    return "\n".join(lines)
+
+
+async def _summarize(events: List[Event]) -> Tuple[str, str]:
+    """Resumo dos eventos pelo modelo rápido; (texto, método)"""
+    conversation = "\n".join(_render_event(event) for event in events)
+    try:
+        response = await _summary_client.acompletion(
+            model=Config.HISTORY_SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": resumo_instructions},
+                {"role": "user", "content": conversation},
+            ],
+            tools=None,
+            temperature=0.0,
+            max_tokens=Config.HISTORY_SUMMARY_MAX_TOKENS,
+        )
+        summary = (response.choices[0].message.content or "").strip()
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            labels = {"agent": "history_summarizer", "model": Config.HISTORY_SUMMARY_MODEL}
+            LLM_TOKENS.inc(usage.prompt_tokens or 0, kind="input", **labels)
+            LLM_TOKENS.inc(usage.completion_tokens or 0, kind="output", **labels)
+        if summary:
+            return summary, "llm"
+    except Exception as exc:
+        log.warning(f"Resumo pelo LLM indisponível, usando resumo extrativo: {exc}")
+    return _fallback_summary(events), "fallback"
+
+
+async def enforce_history_budget(session_service, adk_session) -> Dict[str, int]:
+    """
+    Mantém o histórico da sessão dentro de HISTORY_TOKEN_BUDGET (altera no lugar)
+
+    Ao passar do orçamento, os turnos mais antigos (incluindo um resumo contínuo
+    anterior) são substituídos por um novo resumo até o histórico cair para a
+    marca baixa (HISTORY_LOW_WATER_RATIO), mantendo ao menos os últimos
+    HISTORY_KEEP_RECENT_TURNS turnos; assim o resumo não se repete a cada turno.
+    O resumo de atendimentos encerrados, se houver, é mantido no início. O corte
+    é sempre no início de um turno, então nenhuma chamada de ferramenta perde
+    a sua resposta. Deve ser chamada fora de uma invocação do runner.
+
+    Returns:
+        {"tokens": tokens antes, "folded": eventos resumidos}
+    """
+    stored = get_stored_session(session_service, adk_session.app_name, adk_session.user_id, adk_session.id)
+    if stored is None:
+        return {"tokens": 0, "folded": 0}
+
+    events: List[Event] = list(stored.events)
+    event_tokens = await asyncio.to_thread(_event_tokens, events)
+    tokens = sum(event_tokens)
+    if tokens <= Config.HISTORY_TOKEN_BUDGET:
+        return {"tokens": tokens, "folded": 0}
+
+    head = 1 if events and _event_text(events[0]).startswith(ATTENDANCE_SUMMARY_HEADER) else 0
+    turn_starts = [i for i, event in enumerate(events) if i >= head and _is_turn_start(event)]
+    if len(turn_starts) <= Config.HISTORY_KEEP_RECENT_TURNS:
+        log.warning(f"Histórico com {tokens} tokens acima do orçamento, mas sem turnos antigos para resumir")
+        return {"tokens": tokens, "folded": 0}
+
+    cut = _choose_cut(head, turn_starts, event_tokens)
+    folded = events[head:cut]
+    summary_text, method = await _summarize(folded)
+
+    summary = Event(
+        invocation_id=folded[-1].invocation_id,
+        author="user",
+        timestamp=folded[0].timestamp,
+        content=types.Content(role="user", parts=[types.Part(text=f"{RUNNING_SUMMARY_HEADER}\n{summary_text}")]),
+    )
+    # Eventos adicionados durante o resumo (não deveria haver: turno serializado) são preservados
+    stored.events = [*events[:head], summary, *events[cut:], *stored.events[len(events) :]]
+
+    HISTORY_CONDENSATIONS.inc(method=method)
+    log.info(
+        f"Histórico de {adk_session.id} acima do orçamento ({tokens} > {Config.HISTORY_TOKEN_BUDGET} tokens): "
+        f"{len(folded)} eventos resumidos ({method}), {len(events) - cut} mantidos "
+        f"(~{sum(event_tokens[cut:])} tokens)"
+    )
+    return {"tokens": tokens, "folded": len(folded)}
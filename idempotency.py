@@ -0,0 +1,83 @@
+"""
+Deduplicação de requisições por chave de idempotência
+Retentativas do gateway reutilizam a resposta (ou o processamento em andamento)
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from logger import agent_logger
+
+log = agent_logger.with_prefix("IDEMPOTENCY")
+
+
+class IdempotencyCache:
+    """
+    Executa cada chave de idempotência uma única vez
+
+    - Resposta concluída: fica em cache por `ttl` segundos e é devolvida
+      diretamente para retentativas com a mesma chave.
+    - Processamento em andamento: a retentativa aguarda o mesmo processamento
+      em vez de iniciar outro.
+    - Erros não são armazenados; a próxima tentativa executa de novo.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._completed: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.hits_completed = 0
+        self.hits_in_flight = 0
+        self.misses = 0
+
+    def _prune(self):
+        """Remove respostas expiradas e mantém o limite de entradas"""
+        now = time.monotonic()
+        while self._completed:
+            key, (expires_at, _) = next(iter(self._completed.items()))
+            if expires_at > now and len(self._completed) <= self.max_entries:
+                break
+            del self._completed[key]
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Retorna o resultado de `compute` para a chave, executando-o no máximo uma vez"""
+        self._prune()
+
+        cached = self._completed.get(key)
+        if cached is not None:
+            self.hits_completed += 1
+            log.info(f"Resposta reutilizada para a chave {key}")
+            return cached[1]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.hits_in_flight += 1
+            log.info(f"Chave {key} em processamento; aguardando o resultado original")
+        else:
+            self.misses += 1
+            task = asyncio.create_task(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+
+        # shield: se o cliente desistir, o processamento continua para as retentativas
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: Hashable, task: asyncio.Task):
+        self._in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._completed[key] = (time.monotonic() + self.ttl, task.result())
+        self._completed.move_to_end(key)
+        self._prune()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Retorna métricas da deduplicação"""
+        return {
+            "completed_entries": len(self._completed),
+            "in_flight": len(self._in_flight),
+            "hits_completed": self.hits_completed,
+            "hits_in_flight": self.hits_in_flight,
+            "misses": self.misses,
+        }
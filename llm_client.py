@@ -0,0 +1,152 @@
+"""
+Política das chamadas ao LLM (Bedrock via LiteLLM) compartilhada pelos agentes
+Prazo por agente, retentativa com backoff exponencial e jitter em throttling
+ou indisponibilidade e, opcionalmente, hedge: uma segunda requisição após a
+latência p95 observada, ficando com a que terminar primeiro
+"""
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Optional
+
+import litellm
+from google.adk.models.lite_llm import LiteLLMClient
+
+from config import Config
+from logger import agent_logger
+from metrics import LLM_CALL_LATENCY, LLM_DEADLINE_EXCEEDED, LLM_HEDGES, LLM_RETRIES
+
+log = agent_logger.with_prefix("LLM-CLIENT")
+
+# Mensagens de throttling do Bedrock que nem sempre chegam como RateLimitError
+THROTTLING_MARKERS = ("throttlingexception", "too many requests", "rate exceeded")
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """Chamada ao LLM sem resposta dentro do prazo do agente (incluindo retentativas)"""
+
+    def __init__(self, agent_name: str, deadline: float):
+        super().__init__(f"LLM sem resposta em {deadline:g}s ({agent_name})")
+        self.agent_name = agent_name
+        self.deadline = deadline
+
+
+def _retry_reason(exc: Exception) -> Optional[str]:
+    """Motivo da falha se for transitória (vale retentar); None caso contrário"""
+    if isinstance(exc, litellm.RateLimitError) or any(m in str(exc).lower() for m in THROTTLING_MARKERS):
+        return "throttling"
+    if isinstance(exc, (litellm.ServiceUnavailableError, litellm.InternalServerError)):
+        return "unavailable"
+    if isinstance(exc, litellm.Timeout):
+        return "timeout"
+    if isinstance(exc, litellm.APIConnectionError):
+        return "connection"
+    return None
+
+
+class ResilientLLMClient(LiteLLMClient):
+    """
+    Cliente do LiteLlm (campo llm_client) com a política de chamadas do agente
+
+    Cada chamada tem um prazo total (Config.get_llm_policy); falhas transitórias
+    são retentadas com backoff "full jitter" enquanto houver prazo. Com hedge
+    ligado para o agente, uma segunda requisição idêntica sai quando a primeira
+    passa da latência p95 recente e a primeira resposta bem-sucedida é usada
+    (a outra é cancelada). Sem hedge em streaming nem após uma retentativa,
+    para não somar carga a um modelo que já está em throttling.
+    """
+
+    def __init__(self, agent_name: str, deadline_seconds: Optional[float] = None):
+        super().__init__()
+        self.agent_name = agent_name
+        self.policy = Config.get_llm_policy(agent_name)
+        if deadline_seconds is not None:
+            self.policy["deadline_seconds"] = deadline_seconds
+        self._latencies: Deque[float] = deque(maxlen=Config.LLM_HEDGE_WINDOW)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Espera antes do hedge (p95 recente); None sem hedge ou sem amostras suficientes"""
+        if not self.policy["hedging"] or len(self._latencies) < Config.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        p95 = ordered[min(len(ordered) - 1, math.ceil(Config.LLM_HEDGE_PERCENTILE * len(ordered)) - 1)]
+        return max(p95, Config.LLM_HEDGE_MIN_DELAY_SECONDS)
+
+    async def _timed_call(self, model: Any, messages: Any, tools: Any, **kwargs: Any):
+        started = time.perf_counter()
+        response = await super().acompletion(model=model, messages=messages, tools=tools, **kwargs)
+        elapsed = time.perf_counter() - started
+        LLM_CALL_LATENCY.observe(elapsed, agent=self.agent_name)
+        self._latencies.append(elapsed)
+        return response
+
+    async def _hedged_call(self, delay: Optional[float], model: Any, messages: Any, tools: Any, **kwargs: Any):
+        """Requisição principal e, se passar de `delay`, uma segunda; vale a primeira que der certo"""
+        primary = asyncio.ensure_future(self._timed_call(model, messages, tools, **kwargs))
+        tasks = [primary]
+        try:
+            if delay is None:
+                return await primary
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                tasks.append(asyncio.ensure_future(self._timed_call(model, messages, tools, **kwargs)))
+                LLM_HEDGES.inc(agent=self.agent_name, outcome="launched")
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            LLM_HEDGES.inc(agent=self.agent_name, outcome="won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def acompletion(self, model: Any, messages: Any, tools: Any, **kwargs: Any):
+        deadline = self.policy["deadline_seconds"]
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + deadline
+        streaming = bool(kwargs.get("stream"))
+
+        attempt = 0
+        while True:
+            remaining = expires_at - loop.time()
+            if remaining <= 0:
+                LLM_DEADLINE_EXCEEDED.inc(agent=self.agent_name)
+                raise LLMDeadlineExceeded(self.agent_name, deadline)
+
+            # O timeout do LiteLLM também limita a leitura do stream após a conexão
+            call_kwargs = {**kwargs, "timeout": min(kwargs.get("timeout") or remaining, remaining)}
+            delay = None if streaming or attempt else self.hedge_delay()
+            try:
+                return await asyncio.wait_for(
+                    self._hedged_call(delay, model, messages, tools, **call_kwargs), timeout=remaining
+                )
+            except asyncio.TimeoutError as exc:
+                LLM_DEADLINE_EXCEEDED.inc(agent=self.agent_name)
+                raise LLMDeadlineExceeded(self.agent_name, deadline) from exc
+            except Exception as exc:
+                reason = _retry_reason(exc)
+                if reason is None or attempt >= self.policy["max_retries"]:
+                    raise
+                backoff = random.uniform(
+                    0, min(Config.LLM_RETRY_MAX_SECONDS, Config.LLM_RETRY_BASE_SECONDS * 2**attempt)
+                )
+                if backoff >= expires_at - loop.time():
+                    LLM_DEADLINE_EXCEEDED.inc(agent=self.agent_name)
+                    raise LLMDeadlineExceeded(self.agent_name, deadline) from exc
+                attempt += 1
+                LLM_RETRIES.inc(agent=self.agent_name, reason=reason)
+                log.warning(
+                    f"{self.agent_name}: falha transitória ({reason}), "
+                    f"retentativa {attempt}/{self.policy['max_retries']} em {backoff:.2f}s: {exc}"
+                )
+                await asyncio.sleep(backoff)
@@ -8,7 +8,7 @@ import os
 from dotenv import load_dotenv
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
-from orchestrator import create_orchestrator_agent, ConversationState
+from orchestrator import get_orchestrator_agent, ConversationState
 from rag import KnowledgeBaseRAG
 from logger import agent_logger
 from tools import list_all_tickets
@@ -48,7 +48,7 @@ class TechSupportChatbot:
         
         # Criar agente orquestrador
         agent_logger.info("🔧 Criando agentes especializados...")
-        self.orchestrator = create_orchestrator_agent()
+        self.orchestrator = get_orchestrator_agent()
         
         # Serviço de sessão do ADK
         agent_logger.info("📝 Configurando serviço de sessão ADK...")
@@ -148,7 +148,7 @@ class TechSupportChatbot:
         set_current_user_id(self.user_id)
         
         try:
-            for chunk in self.runner.run(
+            async for chunk in self.runner.run_async(
                 new_message=message_obj,
                 session_id=self.adk_session.id,
                 user_id=self.user_id  # 🔥 PASSA user_id para o runner
@@ -0,0 +1,325 @@
+"""
+Métricas no formato de texto do Prometheus (sem dependências externas)
+Contadores, histogramas e gauges em memória, expostos em GET /metrics
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Buckets (segundos) cobrindo de buscas locais (ms) a turnos completos com LLM
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """Contador monotônico com labels"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {v}" for k, v in self._values.items()]
+
+
+class Histogram:
+    """Histograma cumulativo com labels"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List[float]] = {}  # contagens por bucket + [+Inf, soma]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Mede a duração do bloco (em segundos)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', repr(bound)))} {cumulative}")
+                cumulative += series[len(self.buckets)]
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge/contador lido na hora da coleta (ex.: tamanho de filas e caches)"""
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], Any], type_name: str = "gauge"):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.type_name = type_name
+
+    def render(self) -> List[str]:
+        value = self.fn()
+        # Lista de (labels, valor) para séries com labels
+        if isinstance(value, list):
+            return [f"{self.name}{_format_labels(_label_key(labels))} {v}" for labels, v in value]
+        return [f"{self.name} {value}"]
+
+
+class MetricsRegistry:
+    """Registro das métricas do processo"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def register_callback(self, name: str, help_text: str, fn: Callable[[], Any], type_name: str = "gauge"):
+        self._metrics[name] = CallbackMetric(name, help_text, fn, type_name)
+
+    def render(self) -> str:
+        """Gera o texto no formato de exposição do Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = metric.render()
+            except Exception:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+CHAT_REQUESTS = registry.counter(
+    "chatbot_chat_requests_total", "Requisições de chat por endpoint e status HTTP"
+)
+CHAT_LATENCY = registry.histogram(
+    "chatbot_chat_duration_seconds", "Latência ponta a ponta das requisições de chat"
+)
+STAGE_LATENCY = registry.histogram(
+    "chatbot_stage_duration_seconds", "Latência das etapas do turno (ex.: carga de anexos)"
+)
+AGENT_LATENCY = registry.histogram(
+    "chatbot_agent_duration_seconds", "Duração de cada passagem por um agente"
+)
+TOOL_LATENCY = registry.histogram(
+    "chatbot_tool_duration_seconds", "Duração das chamadas de ferramentas pelos agentes"
+)
+EMBEDDING_LATENCY = registry.histogram(
+    "chatbot_embedding_duration_seconds", "Tempo para gerar o embedding da consulta"
+)
+CHROMA_QUERY_LATENCY = registry.histogram(
+    "chatbot_chroma_query_duration_seconds", "Tempo da consulta vetorial no ChromaDB"
+)
+ADMISSION_WAIT = registry.histogram(
+    "chatbot_admission_wait_seconds", "Espera por vaga no controle de admissão por resultado (admitted/timeout)"
+)
+PRE_ROUTER_DECISIONS = registry.counter(
+    "chatbot_pre_router_decisions_total", "Decisões do pré-roteador por rota e método (rule/embedding/skip)"
+)
+PREFETCH_LOOKUPS = registry.counter(
+    "chatbot_prefetch_lookups_total", "Buscas das ferramentas atendidas pela pré-busca do turno (hit/miss/error)"
+)
+CATEGORY_FAST_PATH = registry.counter(
+    "chatbot_category_fast_path_total", "Classificações de categoria resolvidas localmente (decided) ou pelo LLM (fallback)"
+)
+KB_RESPONSE_CACHE = registry.counter(
+    "chatbot_kb_response_cache_total", "Consultas ao cache semântico de respostas do knowledge_base_agent por resultado"
+)
+ORCHESTRATOR_INSTRUCTIONS = registry.counter(
+    "chatbot_orchestrator_instructions_total", "Chamadas do orquestrador por perfil de instrução montado no turno"
+)
+LLM_TOKENS = registry.counter(
+    "chatbot_llm_tokens_total", "Tokens consumidos nas chamadas ao LLM por agente, modelo e tipo "
+    "(input/output; cache_read/cache_write são a parte de input servida/gravada no cache de prompt)"
+)
+LLM_CALL_LATENCY = registry.histogram(
+    "chatbot_llm_call_duration_seconds", "Duração de cada requisição ao LLM por agente (tentativas e hedges)"
+)
+LLM_RETRIES = registry.counter(
+    "chatbot_llm_retries_total", "Retentativas de chamadas ao LLM por agente e motivo (throttling/unavailable/timeout/connection)"
+)
+LLM_HEDGES = registry.counter(
+    "chatbot_llm_hedged_requests_total", "Requisições de hedge ao LLM por agente e resultado (launched/won)"
+)
+LLM_DEADLINE_EXCEEDED = registry.counter(
+    "chatbot_llm_deadline_exceeded_total", "Chamadas ao LLM abandonadas por estourar o prazo do agente"
+)
+SESSION_COMPACTIONS = registry.counter(
+    "chatbot_session_compactions_total", "Compactações da sessão do ADK ao encerrar um atendimento"
+)
+SESSION_COMPACTED_EVENTS = registry.counter(
+    "chatbot_session_compacted_events_total", "Eventos da sessão do ADK substituídos pelo resumo de atendimentos encerrados"
+)
+HISTORY_CONDENSATIONS = registry.counter(
+    "chatbot_history_condensations_total", "Resumos de turnos antigos por estouro do orçamento de histórico, por método (llm/fallback)"
+)
+SESSION_REPAIRS = registry.counter(
+    "chatbot_session_repairs_total", "Reparos de chamadas de ferramenta na sessão do ADK por tipo e origem"
+)
+
+
+class _StartTimes:
+    """
+    Início das passagens em andamento (chave -> perf_counter)
+
+    Uma passagem que termina em exceção não chega ao callback "after"; as
+    entradas mais antigas que `max_age` segundos são descartadas a cada
+    `prune_every` inícios, então o dicionário não cresce sem fim.
+    """
+
+    def __init__(self, max_age: float = 900.0, prune_every: int = 256):
+        self.max_age = max_age
+        self.prune_every = prune_every
+        self._started: Dict[Any, float] = {}
+        self._since_prune = 0
+
+    def start(self, key: Any):
+        now = time.perf_counter()
+        self._started[key] = now
+        self._since_prune += 1
+        if self._since_prune >= self.prune_every:
+            self._since_prune = 0
+            for stale in [k for k, started in self._started.items() if now - started > self.max_age]:
+                del self._started[stale]
+
+    def stop(self, key: Any) -> Optional[float]:
+        """Segundos desde o início (e remove a entrada); None se desconhecida"""
+        started = self._started.pop(key, None)
+        return None if started is None else time.perf_counter() - started
+
+    def __len__(self) -> int:
+        return len(self._started)
+
+
+# Passagens em andamento: (invocation_id, agente) e function_call_id
+_agent_started = _StartTimes()
+_tool_started = _StartTimes()
+
+
+def _before_agent(callback_context):
+    _agent_started.start((callback_context.invocation_id, callback_context.agent_name))
+    return None
+
+
+def _after_agent(callback_context):
+    elapsed = _agent_started.stop((callback_context.invocation_id, callback_context.agent_name))
+    if elapsed is not None:
+        AGENT_LATENCY.observe(elapsed, agent=callback_context.agent_name)
+    return None
+
+
+def _before_tool(tool, args, tool_context):
+    _tool_started.start(tool_context.function_call_id)
+    return None
+
+
+def _after_tool(tool, args, tool_context, tool_response):
+    elapsed = _tool_started.stop(tool_context.function_call_id)
+    if elapsed is not None:
+        TOOL_LATENCY.observe(elapsed, tool=tool.name)
+    return None
+
+
+def _on_tool_error(tool, args, tool_context, error):
+    """Ferramenta que lançou exceção: remove o início (a exceção segue normalmente)"""
+    _tool_started.stop(tool_context.function_call_id)
+    return None
+
+
+def _token_counter(agent_name: str, model_name: str):
+    """Callback after_model que contabiliza os tokens de cada resposta do LLM"""
+
+    def _after_model(callback_context, llm_response):
+        usage = getattr(llm_response, "usage_metadata", None)
+        if usage is not None:
+            LLM_TOKENS.inc(usage.prompt_token_count or 0, agent=agent_name, model=model_name, kind="input")
+            LLM_TOKENS.inc(usage.candidates_token_count or 0, agent=agent_name, model=model_name, kind="output")
+            # Cache de prompt: leituras e escritas (já incluídas em "input")
+            cache_read = getattr(usage, "cached_content_token_count", None) or 0
+            cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+            if cache_read:
+                LLM_TOKENS.inc(cache_read, agent=agent_name, model=model_name, kind="cache_read")
+            if cache_write:
+                LLM_TOKENS.inc(cache_write, agent=agent_name, model=model_name, kind="cache_write")
+        return None
+
+    return _after_model
+
+
+def _chain(existing, callback):
+    """Acrescenta o callback aos que o agente já tem (o ADK aceita lista)"""
+    if existing is None:
+        return callback
+    if isinstance(existing, list):
+        return [*existing, callback]
+    return [existing, callback]
+
+
+def instrument_agent(agent):
+    """Registra callbacks de tempo por agente e por ferramenta e de tokens por modelo"""
+    agent.before_agent_callback = _chain(agent.before_agent_callback, _before_agent)
+    agent.after_agent_callback = _chain(agent.after_agent_callback, _after_agent)
+    agent.before_tool_callback = _chain(agent.before_tool_callback, _before_tool)
+    agent.after_tool_callback = _chain(agent.after_tool_callback, _after_tool)
+    # on_tool_error_callback só existe nas versões mais novas do ADK
+    if hasattr(agent, "on_tool_error_callback"):
+        agent.on_tool_error_callback = _chain(agent.on_tool_error_callback, _on_tool_error)
+    agent.after_model_callback = _chain(
+        agent.after_model_callback, _token_counter(agent.name, getattr(agent.model, "model", str(agent.model)))
+    )
+    return agent
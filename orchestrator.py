@@ -2,9 +2,11 @@
 Agente Orquestrador - Coordena o fluxo de trabalho entre os agentes especializados
 ATUALIZADO: Integrado com session_manager para reset de contexto
 """
+import threading
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 from config import Config
+from llm_client import ResilientLLMClient
 from agentes import (
     create_rag_agent,
     create_ticket_creation_agent,
@@ -13,8 +15,19 @@ from agentes import (
     create_reservation_agent
 )
 from logger import agent_logger
-from prompts.prompt_orchestrador import orchestrador_instructions
-from typing import List, Dict
+from metrics import ORCHESTRATOR_INSTRUCTIONS, instrument_agent
+from pre_router import RESERVATION_PATTERN, normalize_message
+from problem_splitter import looks_technical
+from rag import classify_category_code
+from prompts.prompt_orchestrador import (
+    orchestrador_instructions,
+    build_orchestrador_instructions,
+    PROFILE_FULL,
+    PROFILE_RESERVATION,
+    PROFILE_TECHNICAL,
+)
+from tools import get_current_user_id
+from typing import List, Dict, Optional, Tuple
 
 # NOVO: Importar session_manager
 from session_manager import (
@@ -25,6 +38,67 @@ from session_manager import (
 )
 
 
+# Atendimento técnico em andamento: mensagens curtas ("sim", "não resolveu") seguem o fluxo técnico
+ACTIVE_ATTENDANCE_STATES = {
+    SessionState.DIAGNOSING,
+    SessionState.RESOLVING,
+    SessionState.WAITING_CONFIRMATION,
+    SessionState.TICKET_CREATING,
+}
+CONTEXT_BLOCK_MARKERS = ("\n\n[ANEXOS]", "\n\n[PROBLEMAS IDENTIFICADOS", "\n\n[CATEGORIA PRÉ-CLASSIFICADA]")
+NEW_SESSION_PREFIX = "[NOVA_SESSAO_INICIADA"
+
+
+def select_instruction_profile(message: str, state: Optional[SessionState]) -> Tuple[str, bool, bool]:
+    """
+    Escolhe as seções da instrução do orquestrador para o turno
+
+    A intenção vem das mesmas regras do pré-roteador (reserva x problema
+    técnico), aplicadas só ao texto do usuário; na dúvida usa o prompt completo.
+
+    Returns:
+        (perfil, incluir regras de nova sessão, incluir regras de problemas separados)
+    """
+    text = message
+    for marker in CONTEXT_BLOCK_MARKERS:
+        text = text.split(marker, 1)[0]
+
+    reservation = bool(RESERVATION_PATTERN.search(normalize_message(text)))
+    technical = looks_technical(text)
+    attending = state in ACTIVE_ATTENDANCE_STATES
+
+    if reservation and (technical or attending):
+        profile = PROFILE_FULL
+    elif reservation:
+        profile = PROFILE_RESERVATION
+    elif technical or attending:
+        profile = PROFILE_TECHNICAL
+    else:
+        profile = PROFILE_FULL
+
+    new_session = not attending or message.startswith(NEW_SESSION_PREFIX)
+    split_problems = "[PROBLEMAS IDENTIFICADOS" in message
+    return profile, new_session, split_problems
+
+
+def orchestrator_instruction(context) -> str:
+    """InstructionProvider do orquestrador: monta a instrução a partir da mensagem e do estado do atendimento"""
+    content = context.user_content
+    message = " ".join(part.text for part in content.parts if part.text) if content and content.parts else ""
+
+    user_id = get_current_user_id()
+    attendance = session_manager.sessions.get(user_id) if user_id else None
+    profile, new_session, split_problems = select_instruction_profile(
+        message, attendance.state if attendance else None
+    )
+
+    ORCHESTRATOR_INSTRUCTIONS.inc(profile=profile)
+    agent_logger.debug(
+        f"Instrução do orquestrador: perfil={profile}, nova_sessao={new_session}, problemas_separados={split_problems}"
+    )
+    return build_orchestrador_instructions(profile, new_session, split_problems)
+
+
 def create_orchestrator_agent() -> Agent:
     """
     Agente orquestrador que coordena todo o fluxo de atendimento
@@ -50,15 +124,21 @@ def create_orchestrator_agent() -> Agent:
     
     agent_logger.info("âœ… Todos os agentes criados com sucesso!\n")
     
+    orchestrator_settings = Config.get_agent_model_settings("orchestrator")
     orchestrator = Agent(
         name="orchestrator",
         model=LiteLlm(
-            model=Config.BEDROCK_CLAUDE_MODEL,
-            temperature=Config.TEMPERATURE,
-            max_tokens=Config.MAX_TOKENS
+            model=orchestrator_settings["model"],
+            temperature=orchestrator_settings["temperature"],
+            max_tokens=orchestrator_settings["max_tokens"],
+            **Config.get_prompt_cache_args(orchestrator_settings["model"]),
+            llm_client=ResilientLLMClient("orchestrator"),
         ),
-        instruction=orchestrador_instructions,
+        # Por turno, só as seções do fluxo em uso (reserva/técnico); completo se desligado
+        instruction=orchestrator_instruction if Config.DYNAMIC_INSTRUCTIONS_ENABLED else orchestrador_instructions,
         description="Coordena o fluxo de atendimento tÃ©cnico e delega para agentes especializados",
+        # Classificação local de categoria; o category_classifier_agent fica para casos ambíguos
+        tools=[classify_category_code],
         sub_agents=[
             support_agent, 
             rag_agent, 
@@ -68,9 +148,33 @@ def create_orchestrator_agent() -> Agent:
         ],
     )
     
+    # Latência por agente e por ferramenta (GET /metrics)
+    for agent in [orchestrator, *orchestrator.sub_agents]:
+        instrument_agent(agent)
+    
     return orchestrator
 
 
+# Instância única da árvore de agentes (sem estado por usuário)
+_orchestrator_instance = None
+# Montada pelo aquecimento (em outra thread) e pelo primeiro /chat ao mesmo tempo
+_orchestrator_lock = threading.Lock()
+
+
+def get_orchestrator_agent() -> Agent:
+    """
+    Retorna a árvore de agentes compartilhada do processo.
+    Os agentes não guardam estado por usuário; o que é por usuário fica na
+    sessão do ADK e no ConversationState.
+    """
+    global _orchestrator_instance
+    if _orchestrator_instance is None:
+        with _orchestrator_lock:
+            if _orchestrator_instance is None:
+                _orchestrator_instance = create_orchestrator_agent()
+    return _orchestrator_instance
+
+
 class ConversationState:
     """
     MantÃ©m o estado da conversa para tracking
@@ -85,6 +189,10 @@ class ConversationState:
         self.resolution_notes = None
         self.category_code = None
         self.category_group = None
+        # Classificação local do problema em atendimento (antes do LLM)
+        self.category_classification: Optional[Dict] = None
+        # Problemas separados (técnicos e reservas) da mesma mensagem ainda sem ticket
+        self.pending_problem_units = 0
         self.conversation_history = []
         
         agent_logger.debug(f"â””â”€ Estado da conversa inicializado para user {user_id}")
@@ -125,6 +233,10 @@ class ConversationState:
                 "content": content
             })
         
+        # Histórico local limitado (o contexto do modelo é a sessão do ADK)
+        if len(self.conversation_history) > Config.STATE_HISTORY_MAX_MESSAGES:
+            del self.conversation_history[: -Config.STATE_HISTORY_MAX_MESSAGES]
+        
         # Log da mensagem
         if role == "user":
             agent_logger.user_message(content)
@@ -0,0 +1,221 @@
+"""
+Pré-roteador determinístico das mensagens do usuário
+Saudações, confirmações, agradecimentos e mensagens vazias são respondidos com
+texto fixo, sem chamar o orquestrador; pedidos claros de reserva de sala vão
+direto para o reservation_agent
+"""
+import asyncio
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from logger import agent_logger
+from metrics import PRE_ROUTER_DECISIONS
+
+log = agent_logger.with_prefix("PRE-ROUTER")
+
+ROUTE_EMPTY = "empty"
+ROUTE_GREETING = "greeting"
+ROUTE_ACK = "ack"
+ROUTE_THANKS = "thanks"
+ROUTE_RESERVATION = "reservation"
+ROUTE_LLM = "llm"
+
+RESERVATION_AGENT = "reservation_agent"
+
+REPLIES = {
+    ROUTE_EMPTY: (
+        "Não recebi nenhuma mensagem. Descreva o problema técnico ou a reserva "
+        "de sala de que você precisa."
+    ),
+    ROUTE_GREETING: (
+        "Olá! Sou o assistente de suporte técnico e reservas de salas. "
+        "Descreva o problema ou a reserva de que você precisa."
+    ),
+    ROUTE_ACK: (
+        "Certo! Quando quiser, descreva o problema técnico ou a sala que deseja reservar."
+    ),
+    ROUTE_THANKS: (
+        "Por nada! Se precisar de algo mais, é só descrever o problema ou a reserva."
+    ),
+}
+
+# Vocabulário das mensagens triviais: a mensagem só é tratada localmente se
+# TODAS as palavras estiverem aqui (qualquer outra palavra vai para o LLM)
+GREETING_WORDS = {"oi", "ola", "opa", "eai", "hey", "hello", "hi", "dia", "tarde", "noite", "como", "vai", "tudo"}
+ACK_WORDS = {
+    "ok", "okay", "certo", "beleza", "blz", "entendi", "entendido", "pode", "seguir",
+    "continuar", "ta", "show", "perfeito", "combinado", "joia", "otimo", "legal",
+}
+THANKS_WORDS = {"obrigado", "obrigada", "obg", "brigado", "brigada", "valeu", "vlw", "grato", "grata", "agradeco"}
+FILLER_WORDS = {"e", "ai", "bom", "boa", "bem", "muito", "por", "nada", "entao", "sim", "a", "o"}
+TRIVIAL_WORDS = GREETING_WORDS | ACK_WORDS | THANKS_WORDS | FILLER_WORDS
+
+RESERVATION_PATTERN = re.compile(
+    r"\breserv\w*\b.*\b(sala|auditorio|laboratorio)\b"
+    r"|\b(sala|auditorio|laboratorio)\b.*\breserv\w*\b"
+    r"|\b(agendar|marcar)\b.*\b(sala|auditorio|laboratorio)\b"
+    r"|\bpreciso de (uma )?sala\b"
+)
+# Menção a problema técnico: mensagem mista fica com o orquestrador
+TECH_PATTERN = re.compile(
+    r"\b(pc|computador|notebook|monitor|impressora|email|outlook|senha|rede|internet|wifi"
+    r"|erro|sistema|problema|liga|travad\w*|trava\w*|lent\w*|quebr\w*|defeito)\b"
+)
+
+# Exemplos por rota para a checagem de similaridade (mensagens curtas)
+PROTOTYPES = {
+    ROUTE_GREETING: ["olá, tudo bem?", "bom dia!", "oi, boa tarde", "e aí, como vai?"],
+    ROUTE_ACK: ["ok, pode seguir", "certo, entendi", "beleza, combinado"],
+    ROUTE_THANKS: ["muito obrigado pela ajuda", "valeu, obrigado"],
+    ROUTE_RESERVATION: ["quero reservar uma sala", "preciso agendar uma sala para reunião"],
+}
+
+
+def normalize_message(text: str) -> str:
+    """Minúsculas, sem acentos/pontuação e sem letras repetidas em excesso ("oiii")"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"(\w)\1{2,}", r"\1", text)
+    return " ".join(text.split())
+
+
+def classify_by_rules(normalized: str) -> Optional[str]:
+    """Classificação por regras; None quando nenhuma regra se aplica"""
+    if not normalized:
+        return ROUTE_EMPTY
+
+    words = set(normalized.split())
+    if words <= TRIVIAL_WORDS:
+        if words & THANKS_WORDS:
+            return ROUTE_THANKS
+        if words & GREETING_WORDS:
+            return ROUTE_GREETING
+        if words & ACK_WORDS:
+            return ROUTE_ACK
+        return None
+
+    if RESERVATION_PATTERN.search(normalized) and not TECH_PATTERN.search(normalized):
+        return ROUTE_RESERVATION
+    return None
+
+
+def conversation_in_progress(events: List[Any], root_agent_name: str) -> bool:
+    """
+    Indica se o assistente aguarda resposta do usuário
+
+    Verdadeiro quando a última mensagem do assistente veio de um subagente
+    (fluxo em andamento) ou terminou com pergunta. Nesses casos "ok", "sim" ou
+    "pode seguir" são respostas e precisam ir para o LLM.
+    """
+    for event in reversed(events):
+        if event.author == "user" or not event.content or not event.content.parts:
+            continue
+        text = "".join(part.text or "" for part in event.content.parts).strip()
+        if not text:
+            continue
+        return event.author != root_agent_name or text.endswith("?")
+    return False
+
+
+class PreRouter:
+    """
+    Regras + similaridade de embeddings com exemplos de cada rota
+
+    As regras cobrem os casos óbvios; a similaridade só é usada em mensagens
+    curtas (até PRE_ROUTER_MAX_WORDS palavras) que não mencionam problema técnico.
+    """
+
+    def __init__(self, similarity_threshold: float, max_words: int):
+        self.similarity_threshold = similarity_threshold
+        self.max_words = max_words
+        self._prototypes: Optional[List[Tuple[str, np.ndarray]]] = None
+        self._lock = threading.Lock()
+        self.decisions: Dict[str, int] = {}
+
+    def _embed(self, text: str) -> np.ndarray:
+        from rag import get_rag_instance
+
+        vector = np.asarray(get_rag_instance().embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _get_prototypes(self) -> List[Tuple[str, np.ndarray]]:
+        with self._lock:
+            if self._prototypes is None:
+                self._prototypes = [
+                    (route, self._embed(example))
+                    for route, examples in PROTOTYPES.items()
+                    for example in examples
+                ]
+            return self._prototypes
+
+    def classify_by_similarity(self, text: str) -> Tuple[Optional[str], float]:
+        """Rota do exemplo mais parecido, se acima do limiar (executa fora do event loop)"""
+        query = self._embed(text)
+        best_route, best_score = None, -1.0
+        for route, vector in self._get_prototypes():
+            score = float(np.dot(query, vector))
+            if score > best_score:
+                best_route, best_score = route, score
+        if best_score >= self.similarity_threshold:
+            return best_route, best_score
+        return None, best_score
+
+    def _record(self, route: str, method: str):
+        self.decisions[route] = self.decisions.get(route, 0) + 1
+        PRE_ROUTER_DECISIONS.inc(route=route, method=method)
+
+    async def route(self, message: str, has_attachments: bool, in_progress: bool) -> Tuple[str, Optional[str]]:
+        """
+        Decide o destino da mensagem
+
+        Returns:
+            (rota, resposta_local). resposta_local é None quando a mensagem
+            segue para um agente (ROUTE_RESERVATION ou ROUTE_LLM).
+        """
+        normalized = normalize_message(message)
+
+        # Anexos sempre têm conteúdo a analisar; durante um atendimento, até
+        # "ok" é resposta a uma pergunta do assistente
+        if has_attachments or (in_progress and normalized):
+            self._record(ROUTE_LLM, "skip")
+            return ROUTE_LLM, None
+
+        route, method = classify_by_rules(normalized), "rule"
+        if route is None and len(normalized.split()) <= self.max_words and not TECH_PATTERN.search(normalized):
+            try:
+                route, score = await asyncio.to_thread(self.classify_by_similarity, message)
+                method = "embedding"
+                log.debug(f"Similaridade {score:.3f} -> {route or ROUTE_LLM}")
+            except Exception as exc:
+                log.warning(f"Checagem por similaridade indisponível: {exc}")
+                route = None
+
+        if route is None:
+            self._record(ROUTE_LLM, "rule")
+            return ROUTE_LLM, None
+
+        self._record(route, method)
+        log.info(f"Mensagem roteada localmente: {route} ({method})")
+        return route, REPLIES.get(route)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Retorna decisões por rota e a taxa de acerto (mensagens que não usaram o orquestrador)"""
+        total = sum(self.decisions.values())
+        hits = total - self.decisions.get(ROUTE_LLM, 0)
+        return {
+            "decisions": dict(self.decisions),
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+
+pre_router = PreRouter(
+    similarity_threshold=Config.PRE_ROUTER_SIMILARITY_THRESHOLD,
+    max_words=Config.PRE_ROUTER_MAX_WORDS,
+)
@@ -0,0 +1,177 @@
+"""
+Separação local de mensagens com vários problemas
+Cada problema vira uma unidade independente; busca na base de conhecimento e
+códigos de categoria candidatos (e a classificação local) são obtidos em
+paralelo para todas as unidades
+"""
+import asyncio
+import re
+from typing import Any, Dict, List, Optional
+
+from logger import agent_logger
+from pre_router import RESERVATION_PATTERN, TECH_PATTERN, normalize_message
+from rag import classify_category_code, search_category_code, search_knowledge_base
+
+log = agent_logger.with_prefix("SPLITTER")
+
+KIND_TECHNICAL = "technical"
+KIND_RESERVATION = "reservation"
+
+# Separadores explícitos: " E " maiúsculo, "e também", "além disso", ";" e quebras de linha
+EXPLICIT_SEPARATOR = re.compile(
+    r"\s+E\s+|\s*;\s*|\n+|\s+e tamb[ée]m\s+|\s*,?\s*al[ée]m disso,?\s+",
+)
+# Itens de lista só no início da linha ("1. ...", "2) ...", "- ...", "• ...");
+# no meio da frase "dia 10. ...", "Windows 10. ..." e "sala 202 - prédio B" ficam inteiros
+LIST_MARKER = re.compile(r"^[ \t]*(?:\d+[.)]|[-•*])[ \t]+", re.MULTILINE)
+# Separadores ambíguos (" e " minúsculo, vírgula): só dividem se cada lado for
+# um problema completo (assunto + sintoma, ou reserva) com MIN_SOFT_UNIT_WORDS palavras.
+# "pc liga e desliga" e "minha impressora e meu computador estão lentos" ficam inteiros
+SOFT_SEPARATOR = re.compile(r"\s*,\s*|\s+e\s+")
+SUBJECT_PATTERN = re.compile(
+    r"\b(pc|computador|notebook|monitor|tela|mouse|teclado|impressora|scanner|email|e mail|outlook"
+    r"|senha|rede|internet|wifi|vpn|sistema|telefone|celular|projetor|sala|auditorio|teams|excel|word)\b"
+)
+SYMPTOM_PATTERN = re.compile(
+    r"\b(nao|liga|desliga|travad\w*|trav\w*|lent\w*|quebr\w*|defeito|erro|falh\w*|abre|funciona\w*"
+    r"|conecta\w*|imprime|atolad\w*|bloquead\w*|expirad\w*|caiu|cai|parou|sem)\b"
+)
+
+MIN_UNIT_CHARS = 3
+MIN_SOFT_UNIT_WORDS = 3
+
+
+def _has_subject(text: str) -> bool:
+    normalized = normalize_message(text)
+    return bool(SUBJECT_PATTERN.search(normalized) or RESERVATION_PATTERN.search(normalized))
+
+
+def _is_complete_problem(text: str) -> bool:
+    """Trecho que descreve sozinho um problema (assunto + sintoma) ou uma reserva"""
+    normalized = normalize_message(text)
+    if len(normalized.split()) < MIN_SOFT_UNIT_WORDS:
+        return False
+    if RESERVATION_PATTERN.search(normalized):
+        return True
+    return bool(SUBJECT_PATTERN.search(normalized) and SYMPTOM_PATTERN.search(normalized))
+
+
+def _split_soft(text: str) -> List[str]:
+    """Divide em vírgulas/" e " apenas entre trechos que são problemas completos"""
+    pieces = [p.strip() for p in SOFT_SEPARATOR.split(text) if p.strip()]
+    if len(pieces) < 2 or not all(_is_complete_problem(p) for p in pieces):
+        return [text.strip()]
+    return pieces
+
+
+def split_problems(message: str) -> List[str]:
+    """
+    Separa a mensagem em problemas/solicitações, na ordem em que o usuário citou
+
+    Trechos sem assunto próprio (ex.: "Bom dia", "não imprime" numa linha
+    seguinte) são unidos ao problema vizinho. Retorna uma lista com um único
+    item quando não há mais de um problema.
+    """
+    text = LIST_MARKER.sub("", message)
+    units: List[str] = []
+    orphan = ""
+    for chunk in EXPLICIT_SEPARATOR.split(text):
+        chunk = chunk.strip(" .,")
+        if len(chunk) < MIN_UNIT_CHARS:
+            continue
+        if not _has_subject(chunk):
+            if units:
+                units[-1] = f"{units[-1]}. {chunk}"
+            else:
+                orphan = f"{orphan} {chunk}".strip()
+            continue
+        pieces = _split_soft(chunk)
+        if orphan:
+            pieces[0] = f"{orphan}. {pieces[0]}"
+            orphan = ""
+        units.extend(pieces)
+    return units or [message.strip()]
+
+
+def looks_technical(text: str) -> bool:
+    """Mensagem cita sintoma técnico ou equipamento/serviço (e não é só uma reserva)"""
+    normalized = normalize_message(text)
+    if TECH_PATTERN.search(normalized):
+        return True
+    return bool(SUBJECT_PATTERN.search(normalized)) and not RESERVATION_PATTERN.search(normalized)
+
+
+def _unit_kind(text: str) -> str:
+    return KIND_RESERVATION if RESERVATION_PATTERN.search(normalize_message(text)) else KIND_TECHNICAL
+
+
+async def _lookup(unit: Dict[str, Any]) -> Dict[str, Any]:
+    """Busca na base de conhecimento, códigos candidatos e classificação de uma unidade (em paralelo)"""
+    if unit["kind"] == KIND_RESERVATION:
+        return unit
+    unit["knowledge"], unit["categories"], unit["classification"] = await asyncio.gather(
+        asyncio.to_thread(search_knowledge_base, unit["text"], 3),
+        asyncio.to_thread(search_category_code, unit["text"], 3),
+        asyncio.to_thread(classify_category_code, unit["text"]),
+    )
+    return unit
+
+
+async def prepare_problem_units(message: str) -> List[Dict[str, Any]]:
+    """
+    Separa a mensagem e executa as buscas de todas as unidades ao mesmo tempo
+
+    Returns:
+        Unidades na ordem original ({"index", "text", "kind", "knowledge",
+        "categories", "classification"}), ou lista vazia se a mensagem tem um
+        único problema.
+    """
+    texts = split_problems(message)
+    if len(texts) < 2:
+        return []
+
+    units = [
+        {"index": i, "text": text, "kind": _unit_kind(text), "knowledge": None, "categories": None,
+         "classification": None}
+        for i, text in enumerate(texts, 1)
+    ]
+    # gather preserva a ordem de entrada, independentemente de qual busca termina antes
+    results = await asyncio.gather(*(_lookup(unit) for unit in units), return_exceptions=True)
+    for unit, result in zip(units, results):
+        if isinstance(result, Exception):
+            log.warning(f"Busca do problema #{unit['index']} falhou: {result}")
+
+    log.info(f"{len(units)} problemas identificados: " + " | ".join(u["text"] for u in units))
+    return units
+
+
+def format_problem_units(units: List[Dict[str, Any]]) -> str:
+    """Bloco de contexto (interno) com as unidades e os resultados das buscas"""
+    lines = [f"[PROBLEMAS IDENTIFICADOS: {len(units)}]"]
+    for unit in units:
+        tipo = "RESERVA" if unit["kind"] == KIND_RESERVATION else "PROBLEMA TÉCNICO"
+        lines.append(f"\n### #{unit['index']} ({tipo}): {unit['text']}")
+        if unit["knowledge"]:
+            lines.append(f"[BASE DE CONHECIMENTO #{unit['index']}]\n{unit['knowledge']}")
+        if unit["categories"]:
+            lines.append(f"[CÓDIGOS CANDIDATOS #{unit['index']}]\n{unit['categories']}")
+        if unit.get("classification"):
+            lines.append(f"[CATEGORIA #{unit['index']}] {_describe_classification(unit['classification'])}")
+    lines.append("[FIM DOS PROBLEMAS IDENTIFICADOS]")
+    return "\n".join(lines)
+
+
+def _describe_classification(classification: Dict[str, Any]) -> str:
+    if not classification.get("decided"):
+        return "decided=false (ambígua: category_classifier_agent)"
+    return (
+        f"decided=true | category_code={classification['category_code']} | "
+        f"group_code={classification['group_code']} | grupo={classification['group']}"
+    )
+
+
+def format_category_classification(classification: Optional[Dict[str, Any]]) -> str:
+    """Bloco de contexto (interno) com a classificação local do problema em atendimento"""
+    if not classification:
+        return ""
+    return f"[CATEGORIA PRÉ-CLASSIFICADA] {_describe_classification(classification)}"
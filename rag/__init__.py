@@ -12,7 +12,10 @@ from .category_code import (
     CategoryCodeRAG,
     get_category_rag_instance,
     search_category_code,
+    classify_category_code,
 )
+from .prefetch import start_turn_prefetch
+from .response_cache import kb_response_cache
 
 __all__ = [
     "KnowledgeBaseRAG",
@@ -23,4 +26,7 @@ __all__ = [
     "CategoryCodeRAG",
     "get_category_rag_instance",
     "search_category_code",
+    "classify_category_code",
+    "start_turn_prefetch",
+    "kb_response_cache",
 ]
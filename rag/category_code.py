@@ -2,15 +2,19 @@
 Sistema RAG para classificação de código de categoria.
 Logs padronizados com prefixo para facilitar rastreamento.
 """
+import math
 from typing import Any, Dict, List
 
 import chromadb
 import os
 from chromadb.config import Settings
+from chromadb.utils import embedding_functions
 from sentence_transformers import SentenceTransformer
 
 from config import Config
 from logger import agent_logger
+from metrics import CATEGORY_FAST_PATH, CHROMA_QUERY_LATENCY, EMBEDDING_LATENCY
+from .prefetch import COLLECTION_CODES, get_prefetched
 
 log = agent_logger.with_prefix("RAG-CODE")
 
@@ -34,6 +38,13 @@ class CategoryCodeRAG:
             raise
 
         self.embedding_model = SentenceTransformer(Config.EMBEDDING_MODEL)
+        # Mesma função de embedding que o Chroma usa nas collections (padrão);
+        # calculada explicitamente para medir embedding e consulta separadamente
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Gera o embedding de uma consulta no mesmo espaço da collection."""
+        return [float(x) for x in self.embedding_function([text])[0]]
 
     def search_category_code(
         self, problem_description: str, n_results: int = 5, filter_grupo: str | None = None
@@ -41,11 +52,15 @@ class CategoryCodeRAG:
         """Busca códigos de categoria relevantes baseado na descrição do problema."""
         where_filter = {"grupo_solucao": filter_grupo} if filter_grupo else None
 
-        results = self.collection.query(
-            query_texts=[problem_description],
-            n_results=n_results,
-            where=where_filter,
-        )
+        with EMBEDDING_LATENCY.time(collection="codigo"):
+            query_embedding = self.embed_query(problem_description)
+
+        with CHROMA_QUERY_LATENCY.time(collection="codigo"):
+            results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=where_filter,
+            )
 
         documents = []
         if results and results["documents"]:
@@ -58,7 +73,7 @@ class CategoryCodeRAG:
                         "content": results["documents"][0][i],
                         "metadata": metadata,
                         "distance": distance,
-                        "relevance_score": 1 - distance if distance else 0,
+                        "relevance_score": 1 - distance if distance is not None else 0,
                         "codigo_categoria": metadata.get("codigo_categoria", ""),
                         "grupo_solucao": metadata.get("grupo_solucao", ""),
                         "descricao": metadata.get("descricao", ""),
@@ -69,6 +84,48 @@ class CategoryCodeRAG:
         return documents
 
 
+def score_candidates(candidates: List[Dict[str, Any]], temperature: float) -> Dict[str, Any]:
+    """
+    Escolhe o código mais próximo e calcula confiança e margem
+
+    - Candidatos com o mesmo código contam uma vez (melhor relevância).
+    - confidence: softmax das relevâncias com temperatura (calibrada offline).
+    - margin: relevância do 1º código menos a do 2º código distinto.
+    """
+    best_by_code: Dict[str, Dict[str, Any]] = {}
+    for candidate in candidates:
+        code = candidate.get("codigo_categoria", "")
+        if code and (code not in best_by_code or candidate["relevance_score"] > best_by_code[code]["relevance_score"]):
+            best_by_code[code] = candidate
+
+    ranked = sorted(best_by_code.values(), key=lambda c: c["relevance_score"], reverse=True)
+    if not ranked:
+        return {"codigo_categoria": None, "score": 0.0, "confidence": 0.0, "margin": 0.0, "candidates": []}
+
+    scores = [c["relevance_score"] for c in ranked]
+    exps = [math.exp((s - scores[0]) / temperature) for s in scores]
+    top = ranked[0]
+    return {
+        "codigo_categoria": top["codigo_categoria"],
+        "grupo_solucao": top["grupo_solucao"],
+        "codigo_grupo": top["metadata"].get("codigo_grupo", ""),
+        "descricao": top["descricao"],
+        "score": scores[0],
+        "confidence": exps[0] / sum(exps),
+        "margin": scores[0] - scores[1] if len(scores) > 1 else scores[0],
+        "candidates": [(c["codigo_categoria"], round(c["relevance_score"], 4)) for c in ranked],
+    }
+
+
+def is_confident(classification: Dict[str, Any], min_margin: float, min_score: float) -> bool:
+    """Classificação local pode ser usada sem o LLM?"""
+    return (
+        classification["codigo_categoria"] is not None
+        and classification["margin"] >= min_margin
+        and classification["score"] >= min_score
+    )
+
+
 _category_rag_instance = None
 
 
@@ -89,12 +146,15 @@ def search_category_code(problem_description: str, num_results: int = 5, filter_
     if filter_grupo:
         log.info(f"Filtro de grupo: {filter_grupo}")
 
-    rag = get_category_rag_instance()
-    results = rag.search_category_code(
-        problem_description=problem_description,
-        n_results=num_results,
-        filter_grupo=filter_grupo,
-    )
+    # Resultado pré-buscado no início do turno (apenas consultas sem filtro de grupo)
+    results = None if filter_grupo else get_prefetched(COLLECTION_CODES, problem_description, num_results)
+    if results is None:
+        rag = get_category_rag_instance()
+        results = rag.search_category_code(
+            problem_description=problem_description,
+            n_results=num_results,
+            filter_grupo=filter_grupo,
+        )
 
     if not results:
         log.warning("Nenhum código retornado; sugerindo código genérico")
@@ -131,3 +191,37 @@ def search_category_code(problem_description: str, num_results: int = 5, filter_
     log.info(f"Resumo: retornados={len(results)} | relevância média={avg_relevance:.1f}%")
 
     return formatted_results
+
+
+def classify_category_code(problem_description: str) -> Dict[str, Any]:
+    """
+    Classificação rápida do código de categoria, sem agente.
+    Se decided=true, use category_code e group_code no create_ticket.
+    Se decided=false, a escolha é ambígua: transfira para category_classifier_agent.
+    """
+    results = get_prefetched(COLLECTION_CODES, problem_description, Config.CATEGORY_FAST_PATH_CANDIDATES)
+    if results is None:
+        results = get_category_rag_instance().search_category_code(
+            problem_description, n_results=Config.CATEGORY_FAST_PATH_CANDIDATES
+        )
+
+    classification = score_candidates(results, Config.CATEGORY_CONFIDENCE_TEMPERATURE)
+    decided = Config.CATEGORY_FAST_PATH_ENABLED and is_confident(
+        classification, Config.CATEGORY_FAST_PATH_MIN_MARGIN, Config.CATEGORY_FAST_PATH_MIN_SCORE
+    )
+    CATEGORY_FAST_PATH.inc(result="decided" if decided else "fallback")
+    log.info(
+        f"Classificação rápida: {classification['codigo_categoria']} | "
+        f"score={classification['score']:.3f} margem={classification['margin']:.3f} "
+        f"confiança={classification['confidence']:.2f} | decidido={decided}"
+    )
+
+    if not decided:
+        return {"decided": False, "next_step": "transfer_to_agent(agent_name='category_classifier_agent')"}
+    return {
+        "decided": True,
+        "category_code": classification["codigo_categoria"],
+        "group_code": classification["codigo_grupo"],
+        "group": classification["grupo_solucao"],
+        "confidence": round(classification["confidence"], 3),
+    }
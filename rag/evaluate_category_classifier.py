@@ -0,0 +1,102 @@
+"""
+Avaliação offline da classificação rápida de categoria (embeddings).
+Mostra, para vários limiares de margem, a cobertura do caminho rápido, a
+acurácia e a latência esperada considerando o LLM nos casos ambíguos.
+
+Uso:
+    python -m rag.evaluate_category_classifier avaliacao_categorias.csv
+
+CSV (separador ";"): colunas "descricao" (texto do problema, como o usuário
+escreveu) e "codigo_categoria" (código correto).
+"""
+import argparse
+import math
+import time
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from config import Config
+from logger import agent_logger
+from rag.category_code import get_category_rag_instance, is_confident, score_candidates
+
+log = agent_logger.with_prefix("RAG-EVAL")
+
+MARGINS = [0.0, 0.01, 0.02, 0.03, 0.05, 0.08, 0.1, 0.15, 0.2]
+TEMPERATURES = [0.01, 0.02, 0.03, 0.05, 0.08, 0.1, 0.2]
+
+
+def _fit_temperature(samples: List[Dict[str, Any]]) -> float:
+    """Temperatura que minimiza a log-verossimilhança negativa do código correto"""
+    best_temperature, best_nll = TEMPERATURES[0], float("inf")
+    for temperature in TEMPERATURES:
+        nll = 0.0
+        for sample in samples:
+            scores = dict(sample["candidates"])
+            if sample["expected"] not in scores:
+                nll += 10.0  # código correto fora dos candidatos
+                continue
+            top = max(scores.values())
+            total = sum(math.exp((s - top) / temperature) for s in scores.values())
+            nll -= (scores[sample["expected"]] - top) / temperature - math.log(total)
+        if nll < best_nll:
+            best_temperature, best_nll = temperature, nll
+    return best_temperature
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv_path", nargs="?", default="avaliacao_categorias.csv")
+    parser.add_argument("--llm-accuracy", type=float, default=0.9, help="Acurácia assumida do agente LLM")
+    parser.add_argument("--llm-seconds", type=float, default=4.0, help="Latência assumida do agente LLM")
+    parser.add_argument("--min-score", type=float, default=Config.CATEGORY_FAST_PATH_MIN_SCORE)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv_path, sep=";", encoding="utf-8-sig", dtype=str)
+    log.info(f"{len(df)} exemplos rotulados em {args.csv_path}")
+
+    rag = get_category_rag_instance()
+    samples = []
+    for _, row in df.iterrows():
+        started = time.perf_counter()
+        candidates = rag.search_category_code(row["descricao"], n_results=Config.CATEGORY_FAST_PATH_CANDIDATES)
+        classification = score_candidates(candidates, Config.CATEGORY_CONFIDENCE_TEMPERATURE)
+        samples.append(
+            {
+                "expected": str(row["codigo_categoria"]).strip(),
+                "classification": classification,
+                "candidates": classification["candidates"],
+                "seconds": time.perf_counter() - started,
+            }
+        )
+
+    if not samples:
+        log.error("Nenhum exemplo para avaliar")
+        return
+
+    local_seconds = sum(s["seconds"] for s in samples) / len(samples)
+    top1 = sum(s["classification"]["codigo_categoria"] == s["expected"] for s in samples) / len(samples)
+    log.info(f"Acurácia top-1 sem limiar: {top1:.1%} | latência local média: {local_seconds * 1000:.1f} ms")
+    log.info(
+        f"Temperatura calibrada (NLL): {_fit_temperature(samples)} "
+        f"(atual: {Config.CATEGORY_CONFIDENCE_TEMPERATURE})"
+    )
+
+    print(f"\n{'margem':>7} {'cobertura':>10} {'acur. rápida':>13} {'acur. total':>12} {'latência (s)':>13}")
+    for margin in MARGINS:
+        fast = [s for s in samples if is_confident(s["classification"], margin, args.min_score)]
+        coverage = len(fast) / len(samples)
+        fast_accuracy = (
+            sum(s["classification"]["codigo_categoria"] == s["expected"] for s in fast) / len(fast) if fast else 0.0
+        )
+        # Casos ambíguos vão para o LLM (acurácia e latência assumidas)
+        total_accuracy = coverage * fast_accuracy + (1 - coverage) * args.llm_accuracy
+        expected_seconds = local_seconds + (1 - coverage) * args.llm_seconds
+        print(
+            f"{margin:>7.2f} {coverage:>10.1%} {fast_accuracy:>13.1%} {total_accuracy:>12.1%} {expected_seconds:>13.2f}"
+        )
+    print(f"\nLLM sempre: acurácia {args.llm_accuracy:.1%} | latência {local_seconds + args.llm_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,14 @@ from typing import Any, Dict, List
 import chromadb
 import pandas as pd
 from chromadb.config import Settings
+from chromadb.utils import embedding_functions
 from sentence_transformers import SentenceTransformer
 
 from config import Config
 from logger import agent_logger
+from metrics import CHROMA_QUERY_LATENCY, EMBEDDING_LATENCY
+from .prefetch import COLLECTION_KB, get_prefetched
+from .response_cache import kb_response_cache
 
 log = agent_logger.with_prefix("RAG-KB")
 
@@ -32,6 +36,9 @@ class KnowledgeBaseRAG:
         )
 
         self.embedding_model = SentenceTransformer(Config.EMBEDDING_MODEL)
+        # Mesma função de embedding que o Chroma usa nas collections (padrão);
+        # calculada explicitamente para medir embedding e consulta separadamente
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
 
         log.info(f"Inicializado com {self.collection.count()} documentos")
 
@@ -46,6 +53,7 @@ class KnowledgeBaseRAG:
                 name="tech_support_kb",
                 metadata={"description": "Base de conhecimento de tickets históricos"},
             )
+            kb_response_cache.invalidate("collection recriada")
 
         if self.collection.count() > 0 and not force_reload:
             log.info(
@@ -110,6 +118,9 @@ class KnowledgeBaseRAG:
                     log.error(f"Erro na linha {idx}: {exc}")
                     skipped_count += 1
 
+            if added_count:
+                kb_response_cache.invalidate(f"{added_count} documentos carregados")
+
             log.success("Base de conhecimento carregada")
             log.info(f"Registros adicionados: {added_count}")
             log.info(f"Registros pulados: {skipped_count}")
@@ -124,17 +135,25 @@ class KnowledgeBaseRAG:
         """Adiciona um documento à base de conhecimento."""
         self.collection.add(ids=[doc_id], documents=[content], metadatas=[metadata or {}])
 
+    def embed_query(self, text: str) -> List[float]:
+        """Gera o embedding de uma consulta no mesmo espaço da collection."""
+        return [float(x) for x in self.embedding_function([text])[0]]
+
     def search_knowledge(
         self, query: str, n_results: int = 3, filter_metadata: Dict[str, str] | None = None
     ) -> List[Dict[str, Any]]:
         """Busca na base de conhecimento."""
         enhanced_query = f"PROBLEMA: {query}"
 
-        results = self.collection.query(
-            query_texts=[enhanced_query],
-            n_results=n_results,
-            where=filter_metadata,
-        )
+        with EMBEDDING_LATENCY.time(collection="tech_support_kb"):
+            query_embedding = self.embed_query(enhanced_query)
+
+        with CHROMA_QUERY_LATENCY.time(collection="tech_support_kb"):
+            results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=filter_metadata,
+            )
 
         documents = []
         if results["documents"] and len(results["documents"]) > 0:
@@ -194,8 +213,11 @@ def search_knowledge_base(query: str, num_results: int = 5) -> str:
     """Busca informações na base de conhecimento técnica."""
     log.info(f"Iniciando busca por '{query}' | top={num_results}")
 
-    rag = get_rag_instance()
-    results = rag.search_knowledge(query, n_results=num_results)
+    # Resultado pré-buscado no início do turno, se houver
+    results = get_prefetched(COLLECTION_KB, query, num_results)
+    if results is None:
+        rag = get_rag_instance()
+        results = rag.search_knowledge(query, n_results=num_results)
 
     if not results:
         log.warning("Nenhum resultado encontrado")
@@ -0,0 +1,99 @@
+"""
+Pré-busca das consultas vetoriais no início do turno
+As buscas na base de conhecimento e de códigos são disparadas em paralelo assim
+que a mensagem chega e ficam no cache do turno. Só consultas com o mesmo texto da
+mensagem ou de um problema separado são atendidas: na prática, a classificação
+local de categoria e o separador de problemas. As ferramentas chamadas pelos
+agentes reformulam a consulta e quase sempre vão direto ao índice.
+"""
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from logger import agent_logger
+from metrics import PREFETCH_LOOKUPS
+
+log = agent_logger.with_prefix("RAG-PREFETCH")
+
+COLLECTION_KB = "tech_support_kb"
+COLLECTION_CODES = "codigo"
+
+# (collection, texto normalizado) -> Future com a lista de resultados brutos
+PrefetchKey = Tuple[str, str]
+_turn_prefetch: ContextVar[Optional[Dict[PrefetchKey, Future]]] = ContextVar("turn_prefetch", default=None)
+
+_executor = ThreadPoolExecutor(max_workers=Config.PREFETCH_MAX_WORKERS, thread_name_prefix="rag-prefetch")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def start_turn_prefetch(texts: List[str]) -> Dict[PrefetchKey, Future]:
+    """
+    Dispara, em paralelo, as buscas de cada texto nas duas collections
+    e registra os resultados como cache do turno atual
+
+    Deve ser chamada no contexto do turno (antes de runner.run_async), para
+    que as ferramentas executadas pelos agentes enxerguem o mesmo cache.
+    """
+    from .category_code import get_category_rag_instance
+    from .knowledge_base import get_rag_instance
+
+    searches: Dict[str, Callable[[str], List[Dict[str, Any]]]] = {
+        COLLECTION_KB: lambda text: get_rag_instance().search_knowledge(
+            text, n_results=Config.PREFETCH_N_RESULTS
+        ),
+        COLLECTION_CODES: lambda text: get_category_rag_instance().search_category_code(
+            text, n_results=Config.PREFETCH_N_RESULTS
+        ),
+    }
+
+    cache: Dict[PrefetchKey, Future] = {}
+    for text in texts:
+        normalized = _normalize(text)
+        if not normalized:
+            continue
+        for collection, search in searches.items():
+            key = (collection, normalized)
+            if key not in cache:
+                cache[key] = _executor.submit(search, text)
+
+    _turn_prefetch.set(cache)
+    log.info(f"Pré-busca iniciada: {len(cache)} consultas para {len(texts)} texto(s)")
+    return cache
+
+
+def get_prefetched(collection: str, query: str, n_results: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Resultado pré-buscado para a consulta da ferramenta, se houver
+
+    Só a mesma consulta (texto normalizado: minúsculas, sem pontuação) é
+    atendida pela pré-busca, para que a ferramenta nunca devolva resultados de
+    uma consulta diferente da sua. Isso cobre quem busca com o texto do
+    usuário (classify_category_code e o separador de problemas); as
+    consultas reformuladas pelos agentes no search_knowledge_base são outra
+    busca e vão direto ao índice. Se a pré-busca ainda está em andamento,
+    aguarda por ela em vez de repetir a consulta. Retorna None quando não há
+    cache aplicável (busca direta).
+    """
+    cache = _turn_prefetch.get()
+    if not cache or n_results > Config.PREFETCH_N_RESULTS:
+        return None
+
+    future = cache.get((collection, _normalize(query)))
+    if future is None:
+        PREFETCH_LOOKUPS.inc(collection=collection, result="miss")
+        return None
+
+    try:
+        results = future.result(timeout=Config.PREFETCH_WAIT_SECONDS)
+    except Exception as exc:
+        log.warning(f"Pré-busca indisponível para '{query}': {exc}")
+        PREFETCH_LOOKUPS.inc(collection=collection, result="error")
+        return None
+
+    PREFETCH_LOOKUPS.inc(collection=collection, result="hit")
+    return results[:n_results]
@@ -0,0 +1,292 @@
+"""
+Cache semântico das respostas do knowledge_base_agent
+Problemas quase repetidos ("PC lento", "computador lento", "meu pc está muito
+devagar") reaproveitam a lista de passos já gerada, sem nova chamada ao LLM.
+Chave: embedding da consulta que o agente passou ao search_knowledge_base
+(mesmo espaço da collection), com limiar de similaridade, TTL e descarte LRU,
+separada por agente e instrução. Invalidado a cada recarga da collection
+tech_support_kb.
+"""
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from google.adk.models.llm_response import LlmResponse
+from google.genai.types import Content, Part
+
+from config import Config
+from logger import agent_logger
+from metrics import KB_RESPONSE_CACHE
+
+log = agent_logger.with_prefix("RAG-CACHE")
+
+SEARCH_TOOL = "search_knowledge_base"
+# Turnos com contexto extra (anexos) podem gerar respostas específicas do usuário
+UNCACHEABLE_MARKERS = ("[ANEXOS]", "[PROBLEMAS IDENTIFICADOS")
+# Turnos que falharam sem passar pelos callbacks de erro/fim do agente
+PENDING_MAX_AGE_SECONDS = 900
+
+
+def _search_query(llm_request) -> Optional[str]:
+    """
+    Consulta da busca que acabou de voltar ao modelo (None se a chamada atual
+    não é a que sucede o search_knowledge_base)
+
+    A chave vem do próprio llm_request (argumento `query` da chamada de
+    ferramenta), não da mensagem do usuário: respostas curtas como "sim" ou
+    "não resolveu" de usuários diferentes não compartilham entrada.
+    """
+    contents = llm_request.contents or []
+    if not contents or not any(
+        part.function_response and part.function_response.name == SEARCH_TOOL for part in contents[-1].parts or []
+    ):
+        return None
+    for content in reversed(contents[:-1]):
+        for part in content.parts or []:
+            if part.function_call and part.function_call.name == SEARCH_TOOL:
+                query = (part.function_call.args or {}).get("query")
+                return str(query).strip() if query else None
+    return None
+
+
+def _user_text(callback_context) -> str:
+    content = callback_context.user_content
+    if content is None or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text).strip()
+
+
+def _scope(callback_context, llm_request) -> str:
+    """Agente + hash da instrução de sistema: mudança de prompt não reaproveita respostas antigas"""
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    digest = hashlib.sha1(str(instruction or "").encode("utf-8")).hexdigest()[:12]
+    return f"{callback_context.agent_name}:{digest}"
+
+
+def _response_text(llm_response) -> Optional[str]:
+    """Texto final da resposta (None se parcial, vazia ou com chamada de ferramenta)"""
+    content = llm_response.content
+    if llm_response.partial or content is None or not content.parts:
+        return None
+    if any(part.function_call for part in content.parts):
+        return None
+    text = "".join(part.text for part in content.parts if part.text).strip()
+    return text or None
+
+
+class SemanticResponseCache:
+    """
+    Cache LRU (com TTL) de respostas indexado por similaridade de embeddings
+
+    Os callbacks do agente consultam o cache na chamada ao modelo que sucede o
+    search_knowledge_base (a que redigiria a resposta com o resultado da busca)
+    e gravam a resposta final dessa chamada.
+    Acertos são amostrados para auditoria de falsos acertos (resposta
+    reaproveitada para um problema diferente).
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float,
+        ttl_seconds: float,
+        max_entries: int,
+        audit_rate: float,
+        audit_max_samples: int,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.audit_rate = audit_rate
+        # (escopo, consulta) -> (vetor, resposta, criado_em)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Chamadas ao modelo sem resposta ainda: invocation_id -> consulta
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._audit_samples: Deque[Dict[str, Any]] = deque(maxlen=audit_max_samples)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _embed(self, text: str) -> np.ndarray:
+        from .knowledge_base import get_rag_instance
+
+        vector = np.asarray(get_rag_instance().embed_query(f"PROBLEMA: {text}"), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, scope: str, query: str, vector: np.ndarray) -> Optional[Tuple[str, str, float]]:
+        """Resposta da entrada mais parecida do escopo acima do limiar: (query_original, resposta, similaridade)"""
+        now = time.monotonic()
+        best_key, best_score = None, -1.0
+        with self._lock:
+            for key, (entry_vector, _, created_at) in list(self._entries.items()):
+                if now - created_at > self.ttl_seconds:
+                    del self._entries[key]
+                    self.expirations += 1
+                    continue
+                if key[0] != scope:
+                    continue
+                score = float(np.dot(vector, entry_vector))
+                if score > best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None or best_score < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return best_key[1], self._entries[best_key][1], best_score
+
+    def store(self, scope: str, query: str, vector: np.ndarray, response: str, generation: int):
+        """Grava a resposta, a menos que a base tenha sido recarregada durante o turno"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries.pop((scope, query), None)
+            self._entries[(scope, query)] = (vector, response, time.monotonic())
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, reason: str):
+        """Descarta todas as respostas (a base de conhecimento mudou)"""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+        KB_RESPONSE_CACHE.inc(result="invalidated")
+        log.info(f"Cache de respostas invalidado ({reason}): {dropped} entradas descartadas")
+
+    def _audit(self, query: str, cached_query: str, similarity: float, response: str):
+        """Amostra acertos para revisão; os próximos ao limiar são sempre registrados"""
+        borderline = similarity < self.similarity_threshold + Config.KB_RESPONSE_CACHE_AUDIT_BORDERLINE
+        if not borderline and random.random() >= self.audit_rate:
+            return
+        with self._lock:
+            self._audit_samples.append(
+                {
+                    "timestamp": time.time(),
+                    "query": query,
+                    "cached_query": cached_query,
+                    "similarity": round(similarity, 4),
+                    "borderline": borderline,
+                    "response": response[:500],
+                }
+            )
+
+    # --- Callbacks do agente -------------------------------------------------
+
+    def _prune_pending(self, now: float):
+        for invocation_id, pending in list(self._pending.items()):
+            if now - pending["started_at"] > PENDING_MAX_AGE_SECONDS:
+                self._pending.pop(invocation_id, None)
+
+    async def before_model(self, callback_context, llm_request):
+        """Chamada que sucede a busca na base: responde do cache quando possível"""
+        invocation_id = callback_context.invocation_id
+        self._pending.pop(invocation_id, None)
+
+        query = _search_query(llm_request)
+        if not query:
+            return None
+        if any(marker in _user_text(callback_context) for marker in UNCACHEABLE_MARKERS):
+            KB_RESPONSE_CACHE.inc(result="skip")
+            return None
+        scope = _scope(callback_context, llm_request)
+
+        try:
+            vector = await asyncio.to_thread(self._embed, query)
+        except Exception as exc:
+            log.warning(f"Cache de respostas indisponível: {exc}")
+            return None
+
+        hit = self.lookup(scope, query, vector)
+        if hit is None:
+            KB_RESPONSE_CACHE.inc(result="miss")
+            now = time.monotonic()
+            self._prune_pending(now)
+            self._pending[invocation_id] = {
+                "scope": scope,
+                "query": query,
+                "vector": vector,
+                "generation": self.generation,
+                "started_at": now,
+            }
+            return None
+
+        cached_query, response, similarity = hit
+        KB_RESPONSE_CACHE.inc(result="hit")
+        self._audit(query, cached_query, similarity, response)
+        log.info(f"Resposta do cache (similaridade {similarity:.3f}): '{query[:60]}' ~ '{cached_query[:60]}'")
+        return LlmResponse(content=Content(role="model", parts=[Part(text=response)]))
+
+    def after_model(self, callback_context, llm_response):
+        """Grava a resposta final redigida a partir da busca"""
+        pending = self._pending.get(callback_context.invocation_id)
+        if pending is None or llm_response.content is None:
+            return None
+
+        response = _response_text(llm_response)
+        if response is not None:
+            self._pending.pop(callback_context.invocation_id, None)
+            self.store(pending["scope"], pending["query"], pending["vector"], response, pending["generation"])
+        elif not llm_response.partial:
+            # Nova chamada de ferramenta em vez da resposta: a próxima chamada decide
+            self._pending.pop(callback_context.invocation_id, None)
+        return None
+
+    def on_model_error(self, callback_context, llm_request, error):
+        """Chamada ao modelo falhou: descarta o estado do turno e deixa o erro seguir"""
+        self._pending.pop(callback_context.invocation_id, None)
+        return None
+
+    def after_agent(self, callback_context):
+        """Descarta o estado do turno (transferências antes da resposta final)"""
+        self._pending.pop(callback_context.invocation_id, None)
+        return None
+
+    # --- Exportação ----------------------------------------------------------
+
+    def get_audit_samples(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._audit_samples)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Retorna métricas do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "audit_samples": len(self._audit_samples),
+                "pending": len(self._pending),
+            }
+
+
+kb_response_cache = SemanticResponseCache(
+    similarity_threshold=Config.KB_RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+    ttl_seconds=Config.KB_RESPONSE_CACHE_TTL_SECONDS,
+    max_entries=Config.KB_RESPONSE_CACHE_MAX_ENTRIES,
+    audit_rate=Config.KB_RESPONSE_CACHE_AUDIT_RATE,
+    audit_max_samples=Config.KB_RESPONSE_CACHE_AUDIT_MAX_SAMPLES,
+)
@@ -0,0 +1,121 @@
+"""
+Compactação do histórico de eventos da sessão do ADK ao encerrar um atendimento
+Os eventos até o último ticket criado viram um único evento de resumo (tickets
+já criados e a solicitação original); o prompt e a memória passam a depender
+só do atendimento atual, não de toda a vida do usuário
+"""
+import re
+from typing import Dict, List, Optional
+
+from google.adk.events import Event
+from google.genai import types
+
+from config import Config
+from logger import agent_logger
+from metrics import SESSION_COMPACTED_EVENTS, SESSION_COMPACTIONS
+from session_repair import get_stored_session
+
+log = agent_logger.with_prefix("SESSION-COMPACT")
+
+SUMMARY_HEADER = "[RESUMO DOS ATENDIMENTOS ENCERRADOS - contexto interno, não responda a esta mensagem]"
+TICKET_LINE = re.compile(r"^- TKT-\S+ .*$", re.MULTILINE)
+# Blocos de contexto anexados à mensagem do usuário (anexos, problemas separados)
+CONTEXT_BLOCK = re.compile(r"\n\n\[(ANEXOS|PROBLEMAS IDENTIFICADOS)")
+
+
+def _event_text(event: Event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    return " ".join(part.text for part in event.content.parts if part.text).strip()
+
+
+def _is_summary(event: Event) -> bool:
+    return _event_text(event).startswith(SUMMARY_HEADER)
+
+
+def _ticket_lines(events: List[Event]) -> List[str]:
+    """Linhas de tickets do resumo anterior e das respostas de create_ticket"""
+    lines: List[str] = []
+    for event in events:
+        if _is_summary(event):
+            lines.extend(TICKET_LINE.findall(_event_text(event)))
+            continue
+        for response in event.get_function_responses():
+            result = response.response or {}
+            if response.name == "create_ticket" and result.get("success"):
+                description = str(result.get("description", ""))[:120]
+                lines.append(f"- {result.get('ticket_id', '')} ({result.get('status', 'open')}): {description}")
+    return lines[-Config.SESSION_COMPACTION_MAX_TICKETS :]
+
+
+def _original_request(events: List[Event]) -> Optional[str]:
+    """Primeira mensagem do usuário no trecho compactado (sem blocos de contexto)"""
+    for event in events:
+        if event.author == "user" and not _is_summary(event) and not event.get_function_responses():
+            text = CONTEXT_BLOCK.split(_event_text(event), 1)[0].strip()
+            if text:
+                return text[: Config.SESSION_COMPACTION_REQUEST_CHARS]
+    return None
+
+
+def _last_ticket_index(events: List[Event]) -> Optional[int]:
+    """Índice do evento com a resposta do último create_ticket bem-sucedido"""
+    for index in range(len(events) - 1, -1, -1):
+        for response in events[index].get_function_responses():
+            if response.name == "create_ticket" and (response.response or {}).get("success"):
+                return index
+    return None
+
+
+def compact_session_events(session) -> Dict[str, int]:
+    """
+    Substitui os eventos até o último ticket criado por um evento de resumo (altera no lugar)
+
+    Os eventos posteriores ao ticket (resposta ao usuário, próximo problema
+    da mesma mensagem) são mantidos como estão. O resumo é um evento do
+    usuário, então a conversa continua alternando usuário/assistente.
+
+    Returns:
+        {"folded": eventos removidos, "kept": eventos mantidos após o resumo}
+    """
+    events: List[Event] = session.events
+    cut = _last_ticket_index(events)
+    if cut is None:
+        return {"folded": 0, "kept": len(events)}
+
+    folded, kept = events[: cut + 1], events[cut + 1 :]
+    lines = [SUMMARY_HEADER, "Tickets já criados:", *_ticket_lines(folded)]
+    original_request = _original_request(folded)
+    if original_request:
+        lines.append(f"Solicitação do último atendimento encerrado: {original_request}")
+
+    summary = Event(
+        invocation_id=folded[-1].invocation_id,
+        author="user",
+        timestamp=folded[0].timestamp,
+        content=types.Content(role="user", parts=[types.Part(text="\n".join(lines))]),
+    )
+    session.events = [summary, *kept]
+    return {"folded": len(folded), "kept": len(kept)}
+
+
+def compact_completed_attendance(session_service, adk_session) -> Dict[str, int]:
+    """
+    Compacta a sessão do ADK guardada no serviço após um atendimento encerrado
+
+    Deve ser chamada fora de uma invocação do runner (ao fim do turno).
+    """
+    stored = get_stored_session(session_service, adk_session.app_name, adk_session.user_id, adk_session.id)
+    if stored is None:
+        return {"folded": 0, "kept": 0}
+
+    before = len(stored.events)
+    counts = compact_session_events(stored)
+    if counts["folded"]:
+        SESSION_COMPACTIONS.inc()
+        SESSION_COMPACTED_EVENTS.inc(counts["folded"])
+        log.info(
+            f"Sessão {adk_session.id} compactada: {before} -> {len(stored.events)} eventos "
+            f"({counts['folded']} resumidos, {counts['kept']} mantidos)"
+        )
+    return counts
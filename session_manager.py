@@ -87,6 +87,10 @@ class SessionManager:
             self.sessions[user_id] = AttendanceSession(user_id)
         return self.sessions[user_id]
     
+    def remove_session(self, user_id: str):
+        """Remove a sessão do usuário (ex.: quando a sessão da API expira)"""
+        self.sessions.pop(user_id, None)
+    
     def should_reset_context(self, user_id: str) -> bool:
         """
         Verifica se deve resetar contexto para este usuÃ¡rio
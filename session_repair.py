@@ -0,0 +1,156 @@
+"""
+Reparo do histórico de eventos da sessão do ADK
+Chamadas de ferramenta sem resposta (tool_use sem tool_result) fazem o Bedrock
+recusar o turno; em vez de descartar a sessão, o histórico é corrigido no lugar
+"""
+from typing import Dict, List, Optional
+
+from google.adk.events import Event
+from google.genai import types
+
+from logger import agent_logger
+from metrics import SESSION_REPAIRS
+
+log = agent_logger.with_prefix("SESSION-REPAIR")
+
+INTERRUPTED_TOOL_RESPONSE = {
+    "success": False,
+    "error": "Chamada interrompida antes de concluir; execute novamente se ainda for necessário.",
+}
+
+
+def get_stored_session(session_service, app_name: str, user_id: str, session_id: str):
+    """
+    Retorna o objeto de sessão armazenado no serviço (não uma cópia)
+
+    O InMemorySessionService devolve cópias em get_session; o reparo precisa
+    alterar a lista de eventos guardada. Outros serviços não são suportados.
+    """
+    sessions = getattr(session_service, "sessions", None)
+    if not isinstance(sessions, dict):
+        return None
+    return sessions.get(app_name, {}).get(user_id, {}).get(session_id)
+
+
+def _interrupted_response_event(call_event: Event, calls: List[types.FunctionCall]) -> Event:
+    """Evento com respostas de erro para as chamadas que ficaram sem resultado"""
+    return Event(
+        invocation_id=call_event.invocation_id,
+        author=call_event.author,
+        branch=call_event.branch,
+        timestamp=call_event.timestamp,
+        content=types.Content(
+            role="user",
+            parts=[
+                types.Part(
+                    function_response=types.FunctionResponse(
+                        id=call.id, name=call.name, response=dict(INTERRUPTED_TOOL_RESPONSE)
+                    )
+                )
+                for call in calls
+            ],
+        ),
+    )
+
+
+def repair_session_events(session) -> Dict[str, int]:
+    """
+    Corrige pares chamada/resposta de ferramenta na sessão (altera no lugar)
+
+    - Chamada sem resposta: recebe uma resposta de erro logo após o evento
+      da chamada, mantendo o restante da conversa.
+    - Resposta sem chamada correspondente: a parte é removida (e o evento,
+      se ficar vazio).
+
+    Returns:
+        Contagem de reparos por tipo: {"dangling_call": n, "orphan_result": n}
+    """
+    events: List[Event] = session.events
+    call_ids = set()
+    response_ids = set()
+    for event in events:
+        for call in event.get_function_calls():
+            call_ids.add(call.id)
+        for response in event.get_function_responses():
+            response_ids.add(response.id)
+
+    repaired: List[Event] = []
+    counts = {"dangling_call": 0, "orphan_result": 0}
+
+    for event in events:
+        if event.content and event.content.parts:
+            parts = [
+                part for part in event.content.parts
+                if not (part.function_response and part.function_response.id not in call_ids)
+            ]
+            removed = len(event.content.parts) - len(parts)
+            if removed:
+                counts["orphan_result"] += removed
+                if not parts:
+                    continue
+                event.content.parts = parts
+
+        repaired.append(event)
+
+        dangling = [
+            call for call in event.get_function_calls()
+            if call.id not in response_ids
+        ]
+        if dangling:
+            counts["dangling_call"] += len(dangling)
+            repaired.append(_interrupted_response_event(event, dangling))
+
+    if counts["dangling_call"] or counts["orphan_result"]:
+        events[:] = repaired
+    return counts
+
+
+def repair_adk_session(session_service, adk_session, trigger: str) -> int:
+    """
+    Verifica e corrige a sessão armazenada do usuário; retorna o nº de reparos
+
+    Args:
+        trigger: origem da verificação ("pre_turn" ou "on_error"), usada na métrica
+    """
+    stored = get_stored_session(
+        session_service, adk_session.app_name, adk_session.user_id, adk_session.id
+    )
+    if stored is None:
+        return 0
+
+    counts = repair_session_events(stored)
+    total = 0
+    for kind, count in counts.items():
+        if count:
+            SESSION_REPAIRS.inc(count, kind=kind, trigger=trigger)
+            total += count
+    if total:
+        log.warning(
+            f"Sessão {adk_session.id} reparada ({trigger}): "
+            f"{counts['dangling_call']} chamada(s) sem resposta, "
+            f"{counts['orphan_result']} resposta(s) órfã(s)"
+        )
+    return total
+
+
+def rollback_last_invocation(session_service, adk_session) -> Optional[str]:
+    """
+    Remove da sessão os eventos do último turno (a partir da última mensagem
+    do usuário), para que o turno possa ser refeito sem duplicar a mensagem
+
+    Returns:
+        invocation_id removido, ou None se não havia o que remover
+    """
+    stored = get_stored_session(
+        session_service, adk_session.app_name, adk_session.user_id, adk_session.id
+    )
+    if stored is None:
+        return None
+
+    for index in range(len(stored.events) - 1, -1, -1):
+        if stored.events[index].author == "user":
+            invocation_id = stored.events[index].invocation_id
+            del stored.events[index:]
+            return invocation_id
+    return None
+
@@ -0,0 +1,196 @@
+"""
+Armazenamento limitado das sessões de usuário da API
+Mantém no máximo N usuários (LRU) e expira usuários ociosos (TTL)
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from logger import agent_logger
+
+log = agent_logger.with_prefix("SESSION-STORE")
+
+
+class UserSessionStore:
+    """
+    Dicionário de sessões por user_id com limite de tamanho e TTL de ociosidade
+
+    Cada acesso move o usuário para o fim da fila (mais recente). Ao passar do
+    limite, o usuário menos recente é removido; o sweeper remove os que
+    ficaram ociosos por mais de `idle_ttl` segundos. Toda remoção passa pelo
+    callback `on_evict`, que limpa os recursos associados ao usuário.
+
+    Usuários com turno em andamento (`is_busy`) não são removidos pelo LRU nem
+    pelo TTL: a remoção fica para depois do turno, que renova o acesso.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        idle_ttl: float,
+        on_evict: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
+        is_busy: Optional[Callable[[str], bool]] = None,
+    ):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self.is_busy = is_busy or (lambda user_id: False)
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self.evictions_lru = 0
+        self.evictions_ttl = 0
+        self.removals_manual = 0
+        self.evictions_deferred = 0
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, user_id: str) -> Dict[str, Any]:
+        data = self._entries[user_id]
+        self._touch(user_id)
+        return data
+
+    def _touch(self, user_id: str):
+        """Marca o usuário como usado agora"""
+        self._entries.move_to_end(user_id)
+        self._last_access[user_id] = time.monotonic()
+
+    def touch(self, user_id: str):
+        """Renova o acesso do usuário, se ainda estiver armazenado (ex.: fim do turno)"""
+        if user_id in self._entries:
+            self._touch(user_id)
+
+    async def set(self, user_id: str, data: Dict[str, Any]):
+        """Armazena a sessão do usuário, removendo o menos recente se passar do limite"""
+        self._entries[user_id] = data
+        self._touch(user_id)
+
+        while len(self._entries) > self.max_size:
+            oldest_id = next((uid for uid in self._entries if not self.is_busy(uid)), None)
+            if oldest_id is None:
+                # Todos com turno em andamento: o limite volta a valer no próximo set
+                self.evictions_deferred += 1
+                log.warning(f"Limite de {self.max_size} usuários excedido, mas todos estão com turno em andamento")
+                break
+            self.evictions_lru += 1
+            log.info(f"Limite de {self.max_size} usuários atingido; removendo {oldest_id} (LRU)")
+            await self._evict(oldest_id)
+
+    async def remove(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Remove explicitamente a sessão do usuário"""
+        if user_id not in self._entries:
+            return None
+        self.removals_manual += 1
+        return await self._evict(user_id)
+
+    async def sweep(self) -> int:
+        """Remove usuários ociosos há mais de idle_ttl segundos"""
+        now = time.monotonic()
+        idle = [
+            user_id
+            for user_id, last_access in self._last_access.items()
+            if now - last_access > self.idle_ttl
+        ]
+        expired = [user_id for user_id in idle if not self.is_busy(user_id)]
+        self.evictions_deferred += len(idle) - len(expired)
+        for user_id in expired:
+            self.evictions_ttl += 1
+            await self._evict(user_id)
+
+        if expired:
+            log.info(f"{len(expired)} sessões ociosas removidas | ativas={len(self._entries)}")
+        return len(expired)
+
+    async def _evict(self, user_id: str) -> Optional[Dict[str, Any]]:
+        data = self._entries.pop(user_id, None)
+        self._last_access.pop(user_id, None)
+        if data is not None and self.on_evict:
+            try:
+                await self.on_evict(user_id, data)
+            except Exception as exc:
+                log.error(f"Erro ao liberar recursos de {user_id}: {exc}")
+        return data
+
+    def start_sweeper(self, interval: float):
+        """Inicia a tarefa periódica de limpeza de sessões ociosas"""
+        if self._sweeper_task is not None:
+            return
+
+        async def _loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.sweep()
+                except Exception as exc:
+                    log.error(f"Erro no sweeper de sessões: {exc}")
+
+        self._sweeper_task = asyncio.create_task(_loop())
+        log.info(f"Sweeper iniciado | intervalo={interval}s | ttl={self.idle_ttl}s | max={self.max_size}")
+
+    async def stop_sweeper(self):
+        """Interrompe a tarefa de limpeza"""
+        if self._sweeper_task is None:
+            return
+        self._sweeper_task.cancel()
+        try:
+            await self._sweeper_task
+        except asyncio.CancelledError:
+            pass
+        self._sweeper_task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Retorna métricas do armazenamento"""
+        return {
+            "active_users": len(self._entries),
+            "max_size": self.max_size,
+            "idle_ttl_seconds": self.idle_ttl,
+            "evictions_lru": self.evictions_lru,
+            "evictions_ttl": self.evictions_ttl,
+            "removals_manual": self.removals_manual,
+            "evictions_deferred": self.evictions_deferred,
+        }
+
+
+class UserTurnLocks:
+    """
+    Um asyncio.Lock por usuário para serializar os turnos de conversa
+
+    Mensagens do mesmo usuário são processadas estritamente em ordem de
+    chegada; usuários diferentes continuam em paralelo. O lock é descartado
+    quando não há mais turnos ativos ou aguardando para aquele usuário.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._holders: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, user_id: str):
+        """Aguarda a vez do usuário e mantém o lock durante o turno"""
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        self._holders[user_id] = self._holders.get(user_id, 0) + 1
+
+        if lock.locked():
+            log.info(f"Turno em andamento para {user_id}; mensagem aguardando na fila")
+
+        try:
+            async with lock:
+                yield
+        finally:
+            self._holders[user_id] -= 1
+            if self._holders[user_id] == 0:
+                del self._holders[user_id]
+                del self._locks[user_id]
+
+    def pending(self, user_id: str) -> int:
+        """Quantidade de turnos ativos ou aguardando para o usuário"""
+        return self._holders.get(user_id, 0)
+
+    def __len__(self) -> int:
+        return len(self._locks)
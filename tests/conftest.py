@@ -0,0 +1,43 @@
+"""
+Fixtures compartilhadas dos testes
+
+Os testes que montam a API (árvore de agentes, RAG) precisam das dependências
+completas do projeto; sem elas esses testes são pulados.
+"""
+import os
+
+import pytest
+
+# Mapa de custos do LiteLLM local: os testes não acessam a rede
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+
+@pytest.fixture
+def chat_api(monkeypatch):
+    """
+    Módulo api com o pipeline mínimo (sem pré-roteador, pré-busca, separação
+    de problemas e classificação local) e função para trocar o modelo de todos
+    os agentes
+    """
+    pytest.importorskip("chromadb")
+    pytest.importorskip("sentence_transformers")
+    import api
+    from config import Config
+
+    for flag in ("PRE_ROUTER_ENABLED", "PREFETCH_ENABLED", "PROBLEM_SPLITTER_ENABLED", "KB_RESPONSE_CACHE_ENABLED",
+                 "CATEGORY_FAST_PATH_ENABLED"):
+        monkeypatch.setattr(Config, flag, False)
+
+    orchestrator = api.get_runner().agent
+    agents = [orchestrator, *orchestrator.sub_agents]
+    original_models = {agent.name: agent.model for agent in agents}
+
+    def use_model(llm):
+        for agent in agents:
+            agent.model = llm
+
+    api.use_model = use_model
+    yield api
+    for agent in agents:
+        agent.model = original_models[agent.name]
+    del api.use_model
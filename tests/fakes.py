@@ -0,0 +1,50 @@
+"""
+Modelos falsos para os testes (substituem o LiteLlm/Bedrock dos agentes)
+"""
+import asyncio
+from typing import AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+class SlowFakeLlm(BaseLlm):
+    """Responde sempre o mesmo texto após `delay` segundos (simula a espera do Bedrock)"""
+
+    delay: float = 0.3
+    reply: str = "Resposta de teste"
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.reply)]))
+
+
+class RecordingFakeLlm(SlowFakeLlm):
+    """Guarda o texto da última mensagem do usuário enviada ao modelo"""
+
+    last_user_text: str = ""
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        for content in reversed(llm_request.contents):
+            if content.role == "user" and content.parts and content.parts[0].text:
+                self.last_user_text = content.parts[0].text
+                break
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+class FailingFakeLlm(SlowFakeLlm):
+    """Responde normalmente até `fail_from` chamadas; depois levanta `error`"""
+
+    fail_from: int = 0
+    error: Exception = RuntimeError("falha do modelo")
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        if self.calls >= self.fail_from:
+            self.calls += 1
+            raise self.error
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
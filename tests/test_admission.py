@@ -0,0 +1,124 @@
+"""
+Controle de admissão: vagas liberadas sempre e uma vaga por usuário
+"""
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+from metrics import ADMISSION_WAIT
+from tests.fakes import SlowFakeLlm
+
+
+def test_queue_full_is_rejected_without_reserving():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1.0)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.check()
+        controller.release(0.1)
+        controller.check()
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429
+    assert controller.get_metrics()["active"] == 0
+
+
+def _wait_count(outcome: str) -> float:
+    for line in ADMISSION_WAIT.render():
+        if line.startswith(f'chatbot_admission_wait_seconds_count{{outcome="{outcome}"}}'):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_wait_is_observed_for_admitted_and_timed_out_turns():
+    admitted_before, timeout_before = _wait_count("admitted"), _wait_count("timeout")
+
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        controller.release(0.1)
+        return rejected.value
+
+    assert asyncio.run(scenario()).status_code == 503
+    assert _wait_count("admitted") == admitted_before + 1
+    assert _wait_count("timeout") == timeout_before + 1
+
+
+def test_cancelled_waiter_never_leaks_the_slot():
+    async def scenario():
+        # Cancela o turno na fila em vários pontos ao redor da liberação da vaga,
+        # inclusive depois de o acquire interno já ter obtido a vaga
+        for steps in range(6):
+            controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5.0)
+            await controller.acquire()
+            waiter = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0)
+            controller.release(0.1)
+            for _ in range(steps):
+                await asyncio.sleep(0)
+            waiter.cancel()
+            try:
+                await waiter
+                controller.release(0.1)  # já tinha sido admitido: devolve como o slot() faria
+            except asyncio.CancelledError:
+                pass
+            await asyncio.sleep(0)
+            assert not controller._semaphore.locked(), f"vaga perdida (steps={steps})"
+            assert controller.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_timed_out_waiter_gives_back_a_slot_obtained_in_the_race():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5.0)
+        await controller.acquire()
+        pending = asyncio.ensure_future(controller._semaphore.acquire())
+        controller.release(0.1)
+        await pending  # o acquire obteve a vaga, mas quem esperava já desistiu
+        controller._abandon(pending)
+        await asyncio.sleep(0)
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert not controller._semaphore.locked()
+
+
+def test_stream_body_never_consumed_keeps_no_slot(chat_api):
+    async def scenario():
+        for _ in range(3):
+            response = await chat_api.chat_stream(chat_api.MessageRequest(userId="stream_abandon", message="Olá"))
+            # Cliente desconectou antes do corpo: o gerador é descartado sem iniciar
+            await response.body_iterator.aclose()
+        return chat_api.admission.get_metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["active"] == 0
+    assert chat_api.user_turn_locks.pending("stream_abandon") == 0
+
+
+def test_queued_turns_of_one_user_hold_one_slot(chat_api):
+    chat_api.use_model(SlowFakeLlm(model="fake", delay=0.2))
+
+    async def scenario():
+        peak = 0
+
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, chat_api.admission.active)
+                await asyncio.sleep(0.01)
+
+        watcher = asyncio.create_task(watch())
+        await asyncio.gather(*[
+            chat_api.chat(chat_api.MessageRequest(userId="one_slot_user", message=f"Olá {i}"), idempotency_key=None)
+            for i in range(4)
+        ])
+        watcher.cancel()
+        return peak
+
+    assert asyncio.run(scenario()) == 1
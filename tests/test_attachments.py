@@ -0,0 +1,99 @@
+"""
+Carregamento de anexos contra um S3 local (moto)
+"""
+import asyncio
+import time
+
+import pytest
+
+moto = pytest.importorskip("moto")
+
+import attachments
+from config import Config
+
+BUCKET = "anexos-teste"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(Config, "AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setattr(Config, "AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(Config, "AWS_REGION", "us-east-1")
+    monkeypatch.setattr(attachments, "_s3_client", None)
+    monkeypatch.setattr(attachments, "attachment_cache", attachments.AttachmentCache(max_bytes=1024 * 1024))
+    with moto.mock_aws():
+        client = attachments.get_s3_client()
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    attachments._s3_client = None
+
+
+def test_loads_in_order_and_reads_only_the_prefix(s3, monkeypatch):
+    monkeypatch.setattr(Config, "ATTACHMENT_MAX_CHARS", 100)
+    monkeypatch.setattr(Config, "ATTACHMENT_MAX_BYTES", 400)
+    s3.put_object(Bucket=BUCKET, Key="log.txt", Body=b"x" * 5_000_000)
+    s3.put_object(Bucket=BUCKET, Key="nota.txt", Body="impressora travada".encode())
+
+    texts = asyncio.run(attachments.load_attachments([f"s3://{BUCKET}/log.txt", f"s3://{BUCKET}/nota.txt"]))
+
+    assert texts == [f"s3://{BUCKET}/log.txt: " + "x" * 100, f"s3://{BUCKET}/nota.txt: impressora travada"]
+
+
+def test_ranged_read_requests_only_used_bytes(s3, monkeypatch):
+    monkeypatch.setattr(Config, "ATTACHMENT_MAX_BYTES", 400)
+    ranges = []
+    original = s3.get_object
+
+    def get_object(**params):
+        response = original(**params)
+        ranges.append((params.get("Range"), response["ContentLength"]))
+        return response
+
+    monkeypatch.setattr(s3, "get_object", get_object)
+    s3.put_object(Bucket=BUCKET, Key="grande.pdf", Body=b"%PDF" + b"0" * 1_000_000)
+
+    asyncio.run(attachments.load_attachments([f"{BUCKET}/grande.pdf"]))
+
+    assert ranges == [("bytes=0-399", 400)]
+
+
+def test_missing_object_is_skipped(s3):
+    s3.put_object(Bucket=BUCKET, Key="ok.txt", Body=b"ok")
+
+    texts = asyncio.run(attachments.load_attachments([f"s3://{BUCKET}/nao-existe.txt", f"s3://{BUCKET}/ok.txt"]))
+
+    assert texts == [f"s3://{BUCKET}/ok.txt: ok"]
+
+
+def test_cached_text_is_reused_while_etag_matches(s3):
+    s3.put_object(Bucket=BUCKET, Key="nota.txt", Body=b"versao 1")
+    path = f"s3://{BUCKET}/nota.txt"
+
+    first = asyncio.run(attachments.load_attachments([path]))
+    second = asyncio.run(attachments.load_attachments([path]))
+    s3.put_object(Bucket=BUCKET, Key="nota.txt", Body=b"versao 2")
+    third = asyncio.run(attachments.load_attachments([path]))
+
+    assert first == second == [f"{path}: versao 1"]
+    assert third == [f"{path}: versao 2"]
+    assert attachments.attachment_cache.get_metrics()["hits"] == 1
+
+
+def test_deadline_drops_slow_attachment(s3, monkeypatch):
+    monkeypatch.setattr(Config, "ATTACHMENT_TIMEOUT_SECONDS", 0.2)
+    s3.put_object(Bucket=BUCKET, Key="rapido.txt", Body=b"rapido")
+    fetch = attachments._fetch_attachment
+
+    def slow_fetch(path):
+        if "lento" in path:
+            time.sleep(1.0)
+        return fetch(path)
+
+    monkeypatch.setattr(attachments, "_fetch_attachment", slow_fetch)
+    started = time.perf_counter()
+    texts = asyncio.run(attachments.load_attachments([f"s3://{BUCKET}/lento.txt", f"s3://{BUCKET}/rapido.txt"]))
+
+    assert time.perf_counter() - started < 0.8
+    assert texts == [f"s3://{BUCKET}/rapido.txt: rapido"]
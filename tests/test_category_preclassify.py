@@ -0,0 +1,63 @@
+"""
+Classificação local do código de categoria antes do orquestrador
+"""
+import asyncio
+
+from tests.fakes import RecordingFakeLlm
+
+DECIDED = {"decided": True, "category_code": "1523", "group_code": "9", "group": "Help Desk", "confidence": 0.93}
+
+
+def _send(api, user_id, message):
+    return api.chat(api.MessageRequest(userId=user_id, message=message), idempotency_key=None)
+
+
+def test_decided_code_reaches_orchestrator_without_llm_call(chat_api, monkeypatch):
+    from config import Config
+
+    monkeypatch.setattr(Config, "CATEGORY_FAST_PATH_ENABLED", True)
+    classified = []
+    monkeypatch.setattr(chat_api, "classify_category_code", lambda text: classified.append(text) or DECIDED)
+    llm = RecordingFakeLlm(model="fake", delay=0.0, reply="Você já tentou reiniciar?")
+    chat_api.use_model(llm)
+
+    async def scenario():
+        await _send(chat_api, "preclass_decided", "Meu pc está muito lento")
+        first_sent = llm.last_user_text
+        await _send(chat_api, "preclass_decided", "Sim, já reiniciei e continua lento")
+        return first_sent, llm.last_user_text
+
+    first_sent, reply_sent = asyncio.run(scenario())
+    expected = "[CATEGORIA PRÉ-CLASSIFICADA] decided=true | category_code=1523 | group_code=9"
+    assert expected in first_sent
+    # A resposta no meio do atendimento reaproveita a classificação do problema descrito
+    assert expected in reply_sent
+    assert classified == ["Meu pc está muito lento"]
+
+
+def test_ambiguous_code_points_to_classifier_agent(chat_api, monkeypatch):
+    from config import Config
+
+    monkeypatch.setattr(Config, "CATEGORY_FAST_PATH_ENABLED", True)
+    monkeypatch.setattr(chat_api, "classify_category_code", lambda text: {"decided": False})
+    llm = RecordingFakeLlm(model="fake", delay=0.0)
+    chat_api.use_model(llm)
+
+    asyncio.run(_send(chat_api, "preclass_ambiguous", "A impressora não imprime"))
+
+    assert "[CATEGORIA PRÉ-CLASSIFICADA] decided=false" in llm.last_user_text
+
+
+def test_non_technical_message_is_not_classified(chat_api, monkeypatch):
+    from config import Config
+
+    monkeypatch.setattr(Config, "CATEGORY_FAST_PATH_ENABLED", True)
+    classified = []
+    monkeypatch.setattr(chat_api, "classify_category_code", lambda text: classified.append(text) or DECIDED)
+    llm = RecordingFakeLlm(model="fake", delay=0.0)
+    chat_api.use_model(llm)
+
+    asyncio.run(_send(chat_api, "preclass_greeting", "Olá, bom dia"))
+
+    assert classified == []
+    assert "[CATEGORIA" not in llm.last_user_text
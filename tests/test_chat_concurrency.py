@@ -0,0 +1,89 @@
+"""
+/chat com vários usuários simultâneos: as esperas pelo LLM se sobrepõem
+"""
+import asyncio
+import threading
+import time
+
+from tests.fakes import SlowFakeLlm
+
+MODEL_DELAY = 0.5
+
+
+async def _chat_many(api, users: int) -> float:
+    started = time.perf_counter()
+    responses = await asyncio.gather(*[
+        api.chat(api.MessageRequest(userId=f"concurrency_{users}_{i}", message="Olá, tudo bem?"), idempotency_key=None)
+        for i in range(users)
+    ])
+    elapsed = time.perf_counter() - started
+    assert all(response.message == "Resposta de teste" for response in responses)
+    return elapsed
+
+
+def test_concurrent_users_overlap_llm_waits(chat_api):
+    chat_api.use_model(SlowFakeLlm(model="fake", delay=MODEL_DELAY))
+
+    async def scenario():
+        await _chat_many(chat_api, 1)  # aquecimento (tokenizador, sessão do ADK)
+        return await _chat_many(chat_api, 1), await _chat_many(chat_api, 10)
+
+    single, concurrent = asyncio.run(scenario())
+
+    # Em série, 10 usuários levariam ~10x; com o runner assíncrono, bem menos
+    assert concurrent < 10 * MODEL_DELAY / 2
+    throughput_gain = (10 / concurrent) / (1 / single)
+    assert throughput_gain > 3, f"vazão só {throughput_gain:.1f}x maior com 10 usuários"
+
+
+def test_health_responds_during_slow_turn(chat_api):
+    chat_api.use_model(SlowFakeLlm(model="fake", delay=1.0))
+
+    async def scenario():
+        turn = asyncio.create_task(
+            chat_api.chat(chat_api.MessageRequest(userId="concurrency_health", message="Olá"), idempotency_key=None)
+        )
+        await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        await chat_api.health_check()
+        health_seconds = time.perf_counter() - started
+        await turn
+        return health_seconds
+
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_agent_tree_is_built_once_under_concurrent_first_calls(chat_api, monkeypatch):
+    import orchestrator
+
+    original_create = orchestrator.create_orchestrator_agent
+    builds = []
+
+    def slow_create():
+        builds.append(threading.get_ident())
+        time.sleep(0.05)  # janela em que outra thread também veria a instância vazia
+        return original_create()
+
+    monkeypatch.setattr(orchestrator, "create_orchestrator_agent", slow_create)
+    monkeypatch.setattr(orchestrator, "_orchestrator_instance", None)
+    monkeypatch.setattr(chat_api, "_runner", None)
+    monkeypatch.setattr(chat_api, "_agent_runners", {})
+
+    # Aquecimento (to_thread) e primeiros /chat pedem o Runner ao mesmo tempo
+    start = threading.Barrier(8)
+    runners, agent_runners = [], []
+
+    def first_call():
+        start.wait()
+        runners.append(chat_api.get_runner())
+        agent_runners.append(chat_api.get_agent_runner("reservation_agent"))
+
+    threads = [threading.Thread(target=first_call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(runner) for runner in runners}) == 1
+    assert len({id(runner) for runner in agent_runners}) == 1
@@ -0,0 +1,77 @@
+"""
+Turnos que falham (prazo do LLM, tool_use sem tool_result) não deixam eventos
+na sessão do ADK nem apagam o turno anterior
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from llm_client import LLMDeadlineExceeded
+from tests.fakes import FailingFakeLlm, SlowFakeLlm
+
+
+def _stored_texts(api, user_id):
+    adk_session = api.user_sessions[user_id]["adk_session"]
+    stored = api.get_stored_session(api.session_service, adk_session.app_name, user_id, adk_session.id)
+    return [e.content.parts[0].text for e in stored.events if e.content and e.content.parts]
+
+
+def test_chat_deadline_rolls_back_the_turn(chat_api):
+    chat_api.use_model(FailingFakeLlm(model="fake", delay=0.0, fail_from=1, error=LLMDeadlineExceeded("orchestrator", 1)))
+
+    async def scenario():
+        await chat_api.chat(chat_api.MessageRequest(userId="deadline_chat", message="primeira"), idempotency_key=None)
+        before = _stored_texts(chat_api, "deadline_chat")
+        with pytest.raises(HTTPException) as exc:
+            await chat_api.chat(chat_api.MessageRequest(userId="deadline_chat", message="segunda"), idempotency_key=None)
+        return before, exc.value.status_code
+
+    before, status = asyncio.run(scenario())
+
+    assert status == 504
+    assert _stored_texts(chat_api, "deadline_chat") == before
+
+
+def test_stream_error_rolls_back_the_turn(chat_api):
+    chat_api.use_model(FailingFakeLlm(model="fake", delay=0.0, fail_from=1, error=LLMDeadlineExceeded("orchestrator", 1)))
+
+    async def scenario():
+        await chat_api.chat(chat_api.MessageRequest(userId="deadline_stream", message="primeira"), idempotency_key=None)
+        before = _stored_texts(chat_api, "deadline_stream")
+        response = await chat_api.chat_stream(chat_api.MessageRequest(userId="deadline_stream", message="segunda"))
+        body = "".join([chunk async for chunk in response.body_iterator])
+        return before, body
+
+    before, body = asyncio.run(scenario())
+
+    assert "event: error" in body
+    assert _stored_texts(chat_api, "deadline_stream") == before
+
+
+def test_tool_use_error_before_the_message_is_stored_keeps_the_previous_turn(chat_api, monkeypatch):
+    model = SlowFakeLlm(model="fake", delay=0.0)
+    chat_api.use_model(model)
+    original_repair = chat_api.repair_adk_session
+    failures = []
+
+    def repair_then_fail_once(session_service, adk_session, trigger):
+        # Falha antes de o runner gravar a nova mensagem (ex.: histórico quebrado)
+        if trigger == "pre_turn" and model.calls and not failures:
+            failures.append(trigger)
+            raise RuntimeError("tool_use ids were found without tool_result blocks")
+        return original_repair(session_service, adk_session, trigger=trigger)
+
+    monkeypatch.setattr(chat_api, "repair_adk_session", repair_then_fail_once)
+
+    async def scenario():
+        await chat_api.chat(chat_api.MessageRequest(userId="tool_use_retry", message="primeira"), idempotency_key=None)
+        return await chat_api.chat(chat_api.MessageRequest(userId="tool_use_retry", message="segunda"), idempotency_key=None)
+
+    response = asyncio.run(scenario())
+
+    assert failures == ["pre_turn"]
+    assert response.message == "Resposta de teste"
+    texts = _stored_texts(chat_api, "tool_use_retry")
+    assert texts[0] == "primeira" and texts.count("primeira") == 1
+    assert sum(text.startswith("segunda") for text in texts) == 1
@@ -0,0 +1,81 @@
+"""
+Orçamento de tokens do histórico da sessão
+"""
+import asyncio
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+import history_budget
+from config import Config
+
+def _message(author, invocation_id, words):
+    return Event(
+        invocation_id=invocation_id,
+        author=author,
+        content=types.Content(
+            role="user" if author == "user" else "model",
+            parts=[types.Part(text=" ".join(["palavra"] * words))],
+        ),
+    )
+
+
+def _setup(monkeypatch):
+    monkeypatch.setattr(Config, "HISTORY_TOKEN_BUDGET", 600)
+    monkeypatch.setattr(Config, "HISTORY_KEEP_RECENT_TURNS", 1)
+    monkeypatch.setattr(Config, "HISTORY_LOW_WATER_RATIO", 0.5)
+    monkeypatch.setattr(Config, "HISTORY_SUMMARY_MAX_TOKENS", 50)
+    monkeypatch.setattr(history_budget, "_count_tokens", lambda text: len(text.split()))
+    summaries = []
+
+    async def summarize(events):
+        summaries.append(len(events))
+        return "resumo curto", "llm"
+
+    monkeypatch.setattr(history_budget, "_summarize", summarize)
+    service = InMemorySessionService()
+    session = asyncio.run(service.create_session(app_name="orchestrator", user_id="budget"))
+    return service, session, summaries
+
+
+def _conversation(service, session, turns, words=25, enforce=True):
+    """Executa `turns` turnos (usuário + assistente), aplicando o orçamento antes de cada um"""
+    stored = history_budget.get_stored_session(service, session.app_name, session.user_id, session.id)
+    for turn in range(turns):
+        if enforce:
+            asyncio.run(history_budget.enforce_history_budget(service, session))
+        stored.events.extend([_message("user", f"inv-{turn}", 10), _message("orchestrator", f"inv-{turn}", words)])
+    return stored
+
+
+def test_condensation_folds_down_to_low_water_mark(monkeypatch):
+    service, session, summaries = _setup(monkeypatch)
+    stored = _conversation(service, session, 20, enforce=False)
+
+    asyncio.run(history_budget.enforce_history_budget(service, session))
+
+    assert len(summaries) == 1
+    remaining = sum(history_budget._event_tokens(stored.events))
+    assert remaining <= Config.HISTORY_TOKEN_BUDGET * Config.HISTORY_LOW_WATER_RATIO
+
+
+def test_condensation_does_not_repeat_every_turn(monkeypatch):
+    service, session, summaries = _setup(monkeypatch)
+
+    # Turnos longos (~1/3 do orçamento, ex.: resultados da base de conhecimento):
+    # resumir só até caber no orçamento exigiria um resumo a cada turno
+    _conversation(service, session, 20, words=190)
+
+    assert 0 < len(summaries) <= 10
+
+
+def test_keeps_recent_turns_even_above_low_water(monkeypatch):
+    service, session, summaries = _setup(monkeypatch)
+    monkeypatch.setattr(Config, "HISTORY_LOW_WATER_RATIO", 0.05)
+    stored = _conversation(service, session, 20, enforce=False)
+
+    asyncio.run(history_budget.enforce_history_budget(service, session))
+
+    user_turns = [e for e in stored.events if history_budget._is_turn_start(e)]
+    assert len(user_turns) == Config.HISTORY_KEEP_RECENT_TURNS == 1
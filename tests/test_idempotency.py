@@ -0,0 +1,77 @@
+"""
+IdempotencyCache: retentativas com a mesma chave não reprocessam o turno
+"""
+import asyncio
+
+import pytest
+
+from idempotency import IdempotencyCache
+
+
+def test_repeated_key_attaches_to_in_flight_turn_then_replays_result():
+    async def scenario():
+        cache = IdempotencyCache(ttl=60, max_entries=10)
+        calls = []
+        release = asyncio.Event()
+
+        async def compute():
+            calls.append("turno")
+            await release.wait()
+            return {"message": "resposta", "tickets": ["TKT-1"]}
+
+        first = asyncio.create_task(cache.run(("user", "k1"), compute))
+        await asyncio.sleep(0)
+        retry = asyncio.create_task(cache.run(("user", "k1"), compute))
+        await asyncio.sleep(0)
+        in_flight = cache.get_metrics()["in_flight"]
+        release.set()
+        results = await asyncio.gather(first, retry)
+        replay = await cache.run(("user", "k1"), compute)
+        return cache, calls, in_flight, results, replay
+
+    cache, calls, in_flight, results, replay = asyncio.run(scenario())
+
+    assert calls == ["turno"]
+    assert in_flight == 1
+    assert results[0] is results[1] is replay
+    assert cache.get_metrics() == {
+        "completed_entries": 1,
+        "in_flight": 0,
+        "hits_completed": 1,
+        "hits_in_flight": 1,
+        "misses": 1,
+    }
+
+
+def test_other_users_and_keys_are_processed_separately():
+    async def scenario():
+        cache = IdempotencyCache(ttl=60, max_entries=10)
+
+        async def compute(value):
+            return value
+
+        return await asyncio.gather(
+            cache.run(("user-a", "k1"), lambda: compute("a")),
+            cache.run(("user-b", "k1"), lambda: compute("b")),
+            cache.run(("user-a", "k2"), lambda: compute("a2")),
+        )
+
+    assert asyncio.run(scenario()) == ["a", "b", "a2"]
+
+
+def test_failed_turn_is_not_cached():
+    async def scenario():
+        cache = IdempotencyCache(ttl=60, max_entries=10)
+        attempts = []
+
+        async def compute():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("falha do modelo")
+            return "ok"
+
+        with pytest.raises(RuntimeError):
+            await cache.run("k", compute)
+        return await cache.run("k", compute), len(attempts)
+
+    assert asyncio.run(scenario()) == ("ok", 2)
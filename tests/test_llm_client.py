@@ -0,0 +1,178 @@
+"""
+Política das chamadas ao LLM: retentativa com backoff "full jitter", prazo do
+agente e hedge após a latência p95 (cliente do LiteLLM substituído por um falso)
+"""
+import asyncio
+import time
+
+import pytest
+from google.adk.models.lite_llm import LiteLLMClient
+
+import llm_client
+from config import Config
+from llm_client import LLMDeadlineExceeded, ResilientLLMClient
+from metrics import LLM_DEADLINE_EXCEEDED, LLM_HEDGES, LLM_RETRIES, _label_key
+
+THROTTLED = RuntimeError("ThrottlingException: Too many requests, please wait before trying again.")
+
+
+def _count(counter, **labels) -> float:
+    return counter._values.get(_label_key(labels), 0.0)
+
+
+class _FakeBedrock:
+    """
+    Substitui o LiteLLMClient.acompletion: cada chamada consome o próximo
+    passo do roteiro, (atraso, resultado ou exceção), e registra quando começou
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.started = []
+
+    async def acompletion(self, model, messages, tools, **kwargs):
+        self.started.append(time.perf_counter())
+        delay, outcome = self.script.pop(0)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def bedrock(monkeypatch):
+    def install(*script):
+        fake = _FakeBedrock(script)
+
+        async def acompletion(client, model, messages, tools, **kwargs):
+            return await fake.acompletion(model, messages, tools, **kwargs)
+
+        monkeypatch.setattr(LiteLLMClient, "acompletion", acompletion)
+        return fake
+
+    return install
+
+
+class _Jitter:
+    """Registra os limites sorteados pelo backoff; `pick` escolhe o valor (padrão: 0)"""
+
+    def __init__(self):
+        self.bounds = []
+        self.pick = lambda low, high: 0.0
+
+    def uniform(self, low, high):
+        self.bounds.append((low, high))
+        return self.pick(low, high)
+
+
+@pytest.fixture
+def jitter(monkeypatch):
+    fake = _Jitter()
+    monkeypatch.setattr(llm_client.random, "uniform", fake.uniform)
+    return fake
+
+
+def _client(agent_name: str, deadline: float, hedging: bool = False) -> ResilientLLMClient:
+    client = ResilientLLMClient(agent_name, deadline_seconds=deadline)
+    client.policy.update(max_retries=3, hedging=hedging)
+    return client
+
+
+def test_throttling_is_retried_with_full_jitter_backoff(bedrock, jitter, monkeypatch):
+    monkeypatch.setattr(Config, "LLM_RETRY_BASE_SECONDS", 0.5)
+    monkeypatch.setattr(Config, "LLM_RETRY_MAX_SECONDS", 0.75)
+    fake = bedrock((0, THROTTLED), (0, THROTTLED), (0, THROTTLED), (0, "resposta"))
+    client = _client("retry_agent", deadline=5.0)
+    retries_before = _count(LLM_RETRIES, agent="retry_agent", reason="throttling")
+
+    assert asyncio.run(client.acompletion("fake", [], None)) == "resposta"
+
+    # Sorteio entre 0 e base * 2^tentativa, limitado ao máximo
+    assert jitter.bounds == [(0, 0.5), (0, 0.75), (0, 0.75)]
+    assert len(fake.started) == 4
+    assert _count(LLM_RETRIES, agent="retry_agent", reason="throttling") == retries_before + 3
+
+
+def test_non_transient_error_is_not_retried(bedrock, jitter):
+    fake = bedrock((0, ValueError("payload inválido")))
+
+    with pytest.raises(ValueError):
+        asyncio.run(_client("no_retry_agent", deadline=5.0).acompletion("fake", [], None))
+    assert len(fake.started) == 1
+    assert jitter.bounds == []
+
+
+def test_backoff_beyond_the_deadline_gives_up_without_sleeping(bedrock, jitter, monkeypatch):
+    monkeypatch.setattr(Config, "LLM_RETRY_BASE_SECONDS", 5.0)
+    monkeypatch.setattr(Config, "LLM_RETRY_MAX_SECONDS", 8.0)
+    jitter.pick = lambda low, high: high
+    fake = bedrock((0, THROTTLED), (0, "não deveria ser chamado"))
+    exceeded_before = _count(LLM_DEADLINE_EXCEEDED, agent="backoff_agent")
+
+    started = time.perf_counter()
+    with pytest.raises(LLMDeadlineExceeded) as exc:
+        asyncio.run(_client("backoff_agent", deadline=1.0).acompletion("fake", [], None))
+
+    assert time.perf_counter() - started < 0.5
+    assert isinstance(exc.value.__cause__, RuntimeError)
+    assert len(fake.started) == 1
+    assert _count(LLM_DEADLINE_EXCEEDED, agent="backoff_agent") == exceeded_before + 1
+
+
+def test_slow_call_raises_deadline_exceeded(bedrock):
+    bedrock((5.0, "tarde demais"))
+    exceeded_before = _count(LLM_DEADLINE_EXCEEDED, agent="slow_agent")
+
+    started = time.perf_counter()
+    with pytest.raises(LLMDeadlineExceeded) as exc:
+        asyncio.run(_client("slow_agent", deadline=0.2).acompletion("fake", [], None))
+
+    assert time.perf_counter() - started < 1.0
+    assert exc.value.agent_name == "slow_agent" and exc.value.deadline == 0.2
+    assert _count(LLM_DEADLINE_EXCEEDED, agent="slow_agent") == exceeded_before + 1
+
+
+def _hedging_client(agent_name: str, monkeypatch) -> ResilientLLMClient:
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.0)
+    client = _client(agent_name, deadline=5.0, hedging=True)
+    # Latências recentes de 0,01s a 0,20s: p95 = 0,19s
+    client._latencies.extend(round(0.01 * i, 2) for i in range(1, Config.LLM_HEDGE_MIN_SAMPLES + 1))
+    return client
+
+
+def test_hedge_is_launched_at_p95_and_wins(bedrock, monkeypatch):
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_SAMPLES", 20)
+    client = _hedging_client("hedge_agent", monkeypatch)
+    delay = client.hedge_delay()
+    fake = bedrock((2.0, "principal"), (0.0, "hedge"))
+    launched_before = _count(LLM_HEDGES, agent="hedge_agent", outcome="launched")
+    won_before = _count(LLM_HEDGES, agent="hedge_agent", outcome="won")
+
+    started = time.perf_counter()
+    assert asyncio.run(client.acompletion("fake", [], None)) == "hedge"
+
+    assert delay == pytest.approx(0.19)
+    assert len(fake.started) == 2
+    assert delay - 0.01 <= fake.started[1] - fake.started[0] < delay + 0.15
+    assert time.perf_counter() - started < 1.0  # a principal (2s) foi cancelada
+    assert _count(LLM_HEDGES, agent="hedge_agent", outcome="launched") == launched_before + 1
+    assert _count(LLM_HEDGES, agent="hedge_agent", outcome="won") == won_before + 1
+
+
+def test_fast_primary_launches_no_hedge(bedrock, monkeypatch):
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_SAMPLES", 20)
+    client = _hedging_client("fast_agent", monkeypatch)
+    fake = bedrock((0.0, "principal"))
+    launched_before = _count(LLM_HEDGES, agent="fast_agent", outcome="launched")
+
+    assert asyncio.run(client.acompletion("fake", [], None)) == "principal"
+    assert len(fake.started) == 1
+    assert _count(LLM_HEDGES, agent="fast_agent", outcome="launched") == launched_before
+
+
+def test_hedge_needs_enough_samples(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_HEDGE_MIN_SAMPLES", 20)
+    client = _client("few_samples_agent", deadline=5.0, hedging=True)
+    client._latencies.extend([0.1] * 19)
+
+    assert client.hedge_delay() is None
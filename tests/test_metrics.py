@@ -0,0 +1,48 @@
+"""
+Métricas: inícios de passagens que terminam em exceção não se acumulam
+"""
+from types import SimpleNamespace
+
+import metrics
+
+
+def test_stale_start_times_are_pruned(monkeypatch):
+    starts = metrics._StartTimes(max_age=10.0, prune_every=4)
+    clock = [1000.0]
+    monkeypatch.setattr(metrics.time, "perf_counter", lambda: clock[0])
+
+    for i in range(3):
+        starts.start(("falhou", i))  # nunca chegam ao "after"
+    clock[0] += 60
+    starts.start("ativa")
+
+    assert len(starts) == 1
+    assert starts.stop("ativa") == 0.0
+    assert starts.stop(("falhou", 0)) is None
+
+
+def test_tool_error_clears_start_time():
+    tool = SimpleNamespace(name="search_knowledge_base")
+    tool_context = SimpleNamespace(function_call_id="call-erro")
+
+    metrics._before_tool(tool, {}, tool_context)
+    metrics._on_tool_error(tool, {}, tool_context, RuntimeError("falha"))
+
+    assert metrics._tool_started.stop("call-erro") is None
+
+
+def test_instrument_agent_registers_tool_error_callback():
+    agent = SimpleNamespace(
+        name="agente",
+        model="fake",
+        before_agent_callback=None,
+        after_agent_callback=None,
+        before_tool_callback=None,
+        after_tool_callback=None,
+        after_model_callback=None,
+        on_tool_error_callback=None,
+    )
+
+    metrics.instrument_agent(agent)
+
+    assert agent.on_tool_error_callback is metrics._on_tool_error
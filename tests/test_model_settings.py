@@ -0,0 +1,40 @@
+"""
+Modelo, temperatura e max_tokens efetivos de cada agente
+"""
+from config import Config
+
+
+def test_default_profile_keeps_single_model_settings(monkeypatch):
+    monkeypatch.setattr(Config, "MODEL_TIER_PROFILE", "sonnet")
+    monkeypatch.setattr(Config, "TEMPERATURE", 0.6)
+    monkeypatch.setattr(Config, "MAX_TOKENS", 3000)
+
+    settings = Config.get_agent_model_settings("category_classifier_agent")
+
+    assert settings == {"model": Config.BEDROCK_CLAUDE_MODEL, "temperature": 0.6, "max_tokens": 3000}
+
+
+def test_tiered_profile_uses_table_when_globals_are_not_set(monkeypatch):
+    monkeypatch.setattr(Config, "MODEL_TIER_PROFILE", "tiered")
+    monkeypatch.delenv("TEMPERATURE", raising=False)
+    monkeypatch.delenv("MAX_TOKENS", raising=False)
+    monkeypatch.delenv("AGENT_CATEGORY_CLASSIFIER_AGENT_MAX_TOKENS", raising=False)
+
+    settings = Config.get_agent_model_settings("category_classifier_agent")
+
+    assert settings == Config.AGENT_MODEL_TIERS["category_classifier_agent"]
+
+
+def test_global_env_wins_over_tier_and_agent_env_wins_over_global(monkeypatch):
+    monkeypatch.setattr(Config, "MODEL_TIER_PROFILE", "tiered")
+    monkeypatch.setattr(Config, "TEMPERATURE", 0.1)
+    monkeypatch.setattr(Config, "MAX_TOKENS", 2048)
+    monkeypatch.setenv("TEMPERATURE", "0.1")
+    monkeypatch.setenv("MAX_TOKENS", "2048")
+    monkeypatch.setenv("AGENT_CATEGORY_CLASSIFIER_AGENT_MAX_TOKENS", "128")
+
+    settings = Config.get_agent_model_settings("category_classifier_agent")
+
+    assert settings["model"] == Config.BEDROCK_FAST_MODEL
+    assert settings["temperature"] == 0.1
+    assert settings["max_tokens"] == 128
@@ -0,0 +1,127 @@
+"""
+Regressão da instrução do orquestrador montada por seções
+
+O prompt completo é comparado com o snapshot em tests/snapshots; mudanças
+intencionais no prompt atualizam o arquivo:
+
+    python -c "from prompts.prompt_orchestrador import orchestrador_instructions as p; \
+open('tests/snapshots/prompt_orchestrador_full.txt', 'w', encoding='utf-8').write(p)"
+"""
+from pathlib import Path
+
+import pytest
+
+from prompts import prompt_orchestrador as prompts
+from prompts.prompt_orchestrador import (
+    INSTRUCTION_PROFILES,
+    PROFILE_FULL,
+    PROFILE_RESERVATION,
+    PROFILE_TECHNICAL,
+    build_orchestrador_instructions,
+    orchestrador_instructions,
+)
+
+SNAPSHOT = Path(__file__).parent / "snapshots" / "prompt_orchestrador_full.txt"
+SECTIONS = {name: value for name, value in vars(prompts).items() if name.startswith("SECAO_")}
+RESERVATION_ONLY = {"SECAO_FLUXO_RESERVA", "SECAO_EXEMPLO_RESERVA", "SECAO_CHECKLIST_RESERVA"}
+TECHNICAL_ONLY = {
+    "SECAO_NOVA_SESSAO",
+    "SECAO_REGRAS_TECNICAS",
+    "SECAO_FLUXO_TECNICO",
+    "SECAO_FLUXO_TECNICO_NOVA_SESSAO",
+    "SECAO_FLUXO_TECNICO_PASSO_1",
+    "SECAO_PROBLEMAS_SEPARADOS",
+    "SECAO_FLUXO_TECNICO_PASSOS",
+    "SECAO_EXEMPLO_TECNICO",
+    "SECAO_FLUXO_VISUAL",
+    "SECAO_CHECKLIST_TECNICO",
+}
+SHARED = {"SECAO_MISSAO", "SECAO_TIPOS", "SECAO_NUNCA", "SECAO_SEMPRE", "SECAO_LEMBRE_SE", "SECAO_GUARDRAILS"}
+
+
+def _names(profile):
+    by_value = {value: name for name, value in SECTIONS.items()}
+    return [by_value[section] for section in INSTRUCTION_PROFILES[profile]]
+
+
+def test_full_prompt_matches_snapshot():
+    assert orchestrador_instructions == SNAPSHOT.read_text(encoding="utf-8")
+    assert build_orchestrador_instructions(PROFILE_FULL) == orchestrador_instructions
+
+
+def test_full_profile_uses_every_section_once():
+    assert sorted(_names(PROFILE_FULL)) == sorted(SECTIONS)
+
+
+@pytest.mark.parametrize("profile", [PROFILE_RESERVATION, PROFILE_TECHNICAL])
+def test_profiles_keep_the_full_prompt_order(profile):
+    full_order = _names(PROFILE_FULL)
+    positions = [full_order.index(name) for name in _names(profile)]
+    assert positions == sorted(positions)
+
+
+@pytest.mark.parametrize(
+    "profile, required, excluded",
+    [
+        (PROFILE_RESERVATION, SHARED | RESERVATION_ONLY, TECHNICAL_ONLY),
+        (PROFILE_TECHNICAL, SHARED | TECHNICAL_ONLY, RESERVATION_ONLY),
+    ],
+)
+def test_profile_sections(profile, required, excluded):
+    names = set(_names(profile))
+    assert required <= names
+    assert not names & excluded
+    assembled = build_orchestrador_instructions(profile)
+    assert all(SECTIONS[name] in assembled for name in required)
+
+
+def test_optional_sections_are_dropped_only_when_not_needed():
+    lean = build_orchestrador_instructions(PROFILE_TECHNICAL, new_session=False, split_problems=False)
+
+    assert prompts.SECAO_NOVA_SESSAO not in lean
+    assert prompts.SECAO_FLUXO_TECNICO_NOVA_SESSAO not in lean
+    assert prompts.SECAO_PROBLEMAS_SEPARADOS not in lean
+    assert prompts.SECAO_FLUXO_TECNICO_PASSOS in lean
+    assert build_orchestrador_instructions(PROFILE_TECHNICAL) == "".join(INSTRUCTION_PROFILES[PROFILE_TECHNICAL])
+
+
+def test_unknown_profile_falls_back_to_full_prompt():
+    assert build_orchestrador_instructions("desconhecido") == orchestrador_instructions
+
+
+class TestSelectInstructionProfile:
+    @pytest.fixture(autouse=True)
+    def _select(self):
+        pytest.importorskip("chromadb")
+        pytest.importorskip("sentence_transformers")
+        from orchestrator import select_instruction_profile
+        from session_manager import SessionState
+
+        self.select = select_instruction_profile
+        self.states = SessionState
+
+    @pytest.mark.parametrize(
+        "message, state_name, expected",
+        [
+            ("Quero reservar a sala 202 amanhã", None, (PROFILE_RESERVATION, True, False)),
+            ("Meu pc não liga", None, (PROFILE_TECHNICAL, True, False)),
+            ("sim, resolveu", "WAITING_CONFIRMATION", (PROFILE_TECHNICAL, False, False)),
+            ("Meu pc não liga e quero reservar a sala 202", None, (PROFILE_FULL, True, False)),
+            ("oi", None, (PROFILE_FULL, True, False)),
+            ("[NOVA_SESSAO_INICIADA - EXECUTAR_FLUXO_COMPLETO] pc lento", "DIAGNOSING", (PROFILE_TECHNICAL, True, False)),
+        ],
+    )
+    def test_profile_by_message_and_state(self, message, state_name, expected):
+        state = getattr(self.states, state_name) if state_name else None
+        assert self.select(message, state) == expected
+
+    def test_context_blocks_do_not_change_intent(self):
+        message = (
+            "oi\n\n[ANEXOS]\nreserva da sala 202 para o dia 10\n\n"
+            "[CATEGORIA PRÉ-CLASSIFICADA] decided=true | category_code=1523"
+        )
+        assert self.select(message, None)[0] == PROFILE_FULL
+
+    def test_split_block_enables_split_rules(self):
+        message = "PC lento E impressora travada\n\n[PROBLEMAS IDENTIFICADOS: 2]\n..."
+        assert self.select(message, None) == (PROFILE_TECHNICAL, True, True)
@@ -0,0 +1,85 @@
+"""
+Pré-roteador: saudações e agradecimentos respondidos localmente, reservas
+direto no reservation_agent e mensagens técnicas seguindo para o orquestrador
+"""
+import asyncio
+
+import pytest
+
+from pre_router import (
+    REPLIES,
+    RESERVATION_AGENT,
+    ROUTE_GREETING,
+    ROUTE_LLM,
+    ROUTE_RESERVATION,
+    ROUTE_THANKS,
+    PreRouter,
+    classify_by_rules,
+    normalize_message,
+)
+from tests.fakes import SlowFakeLlm
+
+
+@pytest.mark.parametrize("message, route", [
+    ("Olá, tudo bem?", ROUTE_GREETING),
+    ("oiii, boa tarde", ROUTE_GREETING),
+    ("Muito obrigado!", ROUTE_THANKS),
+    ("valeu", ROUTE_THANKS),
+    ("Quero reservar a sala 202 amanhã", ROUTE_RESERVATION),
+    ("preciso de uma sala para reunião", ROUTE_RESERVATION),
+    ("Meu PC não liga", None),
+    ("quero reservar a sala 202 e meu pc não liga", None),
+    ("olá, minha impressora travou", None),
+])
+def test_rules(message, route):
+    assert classify_by_rules(normalize_message(message)) == route
+
+
+def test_technical_text_goes_to_the_llm_without_similarity_check(monkeypatch):
+    router = PreRouter(similarity_threshold=0.8, max_words=6)
+
+    def no_embedding(text):
+        raise AssertionError("mensagem técnica não deve passar pela similaridade")
+
+    monkeypatch.setattr(router, "classify_by_similarity", no_embedding)
+
+    assert asyncio.run(router.route("impressora travada", has_attachments=False, in_progress=False)) == (ROUTE_LLM, None)
+
+
+def test_short_reply_during_a_flow_is_not_handled_locally():
+    router = PreRouter(similarity_threshold=0.8, max_words=6)
+
+    assert asyncio.run(router.route("ok", has_attachments=False, in_progress=True)) == (ROUTE_LLM, None)
+    assert router.get_metrics()["decisions"] == {ROUTE_LLM: 1}
+
+
+def _authors(api, user_id):
+    adk_session = api.user_sessions[user_id]["adk_session"]
+    stored = api.get_stored_session(api.session_service, adk_session.app_name, user_id, adk_session.id)
+    return [event.author for event in stored.events if event.author != "user"]
+
+
+def test_chat_routes_through_the_pre_router(chat_api, monkeypatch):
+    monkeypatch.setattr(chat_api.Config, "PRE_ROUTER_ENABLED", True)
+    monkeypatch.setattr(chat_api.pre_router, "classify_by_similarity", lambda text: (None, 0.0))
+    model = SlowFakeLlm(model="fake", delay=0.0)
+    chat_api.use_model(model)
+
+    async def chat(user_id, message):
+        return await chat_api.chat(chat_api.MessageRequest(userId=user_id, message=message), idempotency_key=None)
+
+    async def scenario():
+        greeting = await chat("pre_router_greeting", "Oi, bom dia!")
+        thanks = await chat("pre_router_greeting", "obrigado")
+        calls_after_trivial = model.calls
+        await chat("pre_router_reservation", "Quero reservar a sala 202 amanhã às 14h")
+        await chat("pre_router_technical", "Meu computador não liga")
+        return greeting, thanks, calls_after_trivial
+
+    greeting, thanks, calls_after_trivial = asyncio.run(scenario())
+
+    assert greeting.message == REPLIES[ROUTE_GREETING]
+    assert thanks.message == REPLIES[ROUTE_THANKS]
+    assert calls_after_trivial == 0
+    assert _authors(chat_api, "pre_router_reservation") == [RESERVATION_AGENT]
+    assert _authors(chat_api, "pre_router_technical") == [chat_api.get_runner().agent.name]
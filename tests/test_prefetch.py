@@ -0,0 +1,73 @@
+"""
+Pré-busca do turno: só a mesma consulta reaproveita o resultado, sem ir ao índice
+"""
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+from rag import category_code, knowledge_base, prefetch
+
+
+def _done(results):
+    future = Future()
+    future.set_result(results)
+    return future
+
+
+@pytest.fixture
+def turn_cache():
+    results = [{"id": f"r{i}"} for i in range(5)]
+    token = prefetch._turn_prefetch.set({
+        (prefetch.COLLECTION_KB, prefetch._normalize("Meu computador está muito lento")): _done(results),
+    })
+    yield results
+    prefetch._turn_prefetch.reset(token)
+
+
+def test_same_query_is_served_from_prefetch(turn_cache):
+    results = prefetch.get_prefetched(prefetch.COLLECTION_KB, "meu computador está muito lento!", 3)
+    assert results == turn_cache[:3]
+
+
+def test_reworded_query_is_not_served_from_prefetch(turn_cache):
+    assert prefetch.get_prefetched(prefetch.COLLECTION_KB, "computador lento e travando", 3) is None
+    assert prefetch.get_prefetched(prefetch.COLLECTION_KB, "computador muito lento", 3) is None
+
+
+def test_other_collection_or_more_results_is_a_direct_search(turn_cache):
+    assert prefetch.get_prefetched(prefetch.COLLECTION_CODES, "Meu computador está muito lento", 3) is None
+    assert prefetch.get_prefetched(prefetch.COLLECTION_KB, "Meu computador está muito lento", 50) is None
+
+
+def _index_untouched(monkeypatch):
+    def no_index():
+        raise AssertionError("consulta pré-buscada não deve ir ao índice")
+
+    monkeypatch.setattr(knowledge_base, "get_rag_instance", no_index)
+    monkeypatch.setattr(category_code, "get_category_rag_instance", no_index)
+
+
+def test_prefetched_query_is_served_without_touching_the_index(monkeypatch):
+    message = "Meu computador está muito lento"
+    kb_results = [{"content": "Limpar arquivos temporários", "metadata": {"name": "PC lento"}, "relevance_score": 0.9}]
+    code_results = [{
+        "codigo_categoria": "HW-01", "grupo_solucao": "Suporte", "descricao": "Desempenho",
+        "metadata": {"codigo_grupo": "G1"}, "relevance_score": 0.9,
+    }]
+    token = prefetch._turn_prefetch.set({
+        (prefetch.COLLECTION_KB, prefetch._normalize(message)): _done(kb_results),
+        (prefetch.COLLECTION_CODES, prefetch._normalize(message)): _done(code_results),
+    })
+    _index_untouched(monkeypatch)
+    monkeypatch.setattr(category_code.Config, "CATEGORY_FAST_PATH_ENABLED", True)
+    try:
+        found = knowledge_base.search_knowledge_base(message, 3)
+        classification = category_code.classify_category_code(message)
+    finally:
+        prefetch._turn_prefetch.reset(token)
+
+    assert "PC lento" in found
+    assert classification["category_code"] == "HW-01"
@@ -0,0 +1,89 @@
+"""
+Separação local de mensagens com vários problemas
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+import problem_splitter
+from problem_splitter import prepare_problem_units, split_problems
+from tests.fakes import RecordingFakeLlm
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("PC lento E impressora travada E email não abre", ["PC lento", "impressora travada", "email não abre"]),
+        ("O pc está lento e a impressora travou", ["O pc está lento", "a impressora travou"]),
+        ("1. pc lento\n2. impressora atolada\n3. email não abre", ["pc lento", "impressora atolada", "email não abre"]),
+        ("Quero reservar a sala 202, meu pc não liga", ["Quero reservar a sala 202", "meu pc não liga"]),
+        ("Meu computador não liga; além disso o outlook não abre", ["Meu computador não liga", "o outlook não abre"]),
+    ],
+)
+def test_splits_independent_problems(message, expected):
+    assert split_problems(message) == expected
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "Preciso reservar a sala no dia 10. Pode ser às 14h?",
+        "Windows 10. Não liga",
+        "Preciso da sala 202 - prédio B amanhã",
+        "Minha impressora e meu computador estão lentos",
+        "O pc liga e desliga sozinho",
+        "Não funcionou, continua igual",
+        "Sim, já reiniciei, e o computador continua lento",
+    ],
+)
+def test_does_not_split_single_request(message):
+    assert len(split_problems(message)) == 1
+
+
+def test_line_without_subject_joins_its_neighbour():
+    assert split_problems("Bom dia\nMeu pc não liga") == ["Bom dia. Meu pc não liga"]
+
+
+def test_units_keep_original_order_with_parallel_lookups(monkeypatch):
+    delays = {"PC lento": 0.2, "impressora travada": 0.0, "email não abre": 0.1}
+
+    def search(text, n_results):
+        import time
+
+        time.sleep(delays[text])
+        return f"resultado {text}"
+
+    monkeypatch.setattr(problem_splitter, "search_knowledge_base", search)
+    monkeypatch.setattr(problem_splitter, "search_category_code", search)
+    monkeypatch.setattr(problem_splitter, "classify_category_code", lambda text: {"decided": False})
+
+    units = asyncio.run(prepare_problem_units("PC lento E impressora travada E email não abre"))
+
+    assert [unit["text"] for unit in units] == list(delays)
+    assert [unit["knowledge"] for unit in units] == [f"resultado {text}" for text in delays]
+
+
+def test_reply_in_ongoing_attendance_is_not_split(chat_api, monkeypatch):
+    from config import Config
+
+    monkeypatch.setattr(Config, "PROBLEM_SPLITTER_ENABLED", True)
+    monkeypatch.setattr(problem_splitter, "search_knowledge_base", lambda text, n: "")
+    monkeypatch.setattr(problem_splitter, "search_category_code", lambda text, n: "")
+    monkeypatch.setattr(problem_splitter, "classify_category_code", lambda text: {"decided": False})
+    llm = RecordingFakeLlm(model="fake", delay=0.0, reply="Você já tentou reiniciar?")
+    chat_api.use_model(llm)
+
+    async def scenario():
+        first = "PC lento E impressora travada"
+        await chat_api.chat(chat_api.MessageRequest(userId="split_in_progress", message=first), idempotency_key=None)
+        first_sent = llm.last_user_text
+        reply = "Sim, já reiniciei E continua lento"
+        await chat_api.chat(chat_api.MessageRequest(userId="split_in_progress", message=reply), idempotency_key=None)
+        return first_sent, llm.last_user_text
+
+    first_sent, reply_sent = asyncio.run(scenario())
+    assert "[PROBLEMAS IDENTIFICADOS: 2]" in first_sent
+    assert "[PROBLEMAS IDENTIFICADOS" not in reply_sent
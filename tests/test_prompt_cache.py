@@ -0,0 +1,99 @@
+"""
+Cache de prompt do Bedrock: cachePoint na mensagem de sistema enviada pelo LiteLlm
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from config import Config
+
+CACHING_MODEL = "bedrock/us.anthropic.claude-3-5-haiku-20241022-v1:0"
+DEFAULT_MODELS = (
+    "bedrock/us.anthropic.claude-3-5-sonnet-20240620-v1:0",
+    "bedrock/us.anthropic.claude-3-haiku-20240307-v1:0",
+)
+CONVERSE_RESPONSE = {
+    "output": {"message": {"role": "assistant", "content": [{"text": "ok"}]}},
+    "stopReason": "end_turn",
+    "usage": {"inputTokens": 10, "outputTokens": 2, "totalTokens": 12, "cacheWriteInputTokens": 8},
+    "metrics": {"latencyMs": 1},
+}
+
+
+@pytest.fixture
+def fake_bedrock():
+    """Endpoint local no formato da API Converse; guarda os corpos recebidos"""
+    bodies = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("content-length", 0))
+            bodies.append(json.loads(self.rfile.read(length)))
+            payload = json.dumps(CONVERSE_RESPONSE).encode()
+            self.send_response(200)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", bodies
+    server.shutdown()
+
+
+def _call(model, api_base):
+    llm = LiteLlm(
+        model=model,
+        **Config.get_prompt_cache_args(model),
+        api_base=api_base,
+        aws_access_key_id="teste",
+        aws_secret_access_key="teste",
+        aws_region_name="us-east-1",
+    )
+    request = LlmRequest(
+        model=model,
+        contents=[types.Content(role="user", parts=[types.Part(text="Meu pc está lento")])],
+        config=types.GenerateContentConfig(system_instruction="Você é o orquestrador"),
+    )
+
+    async def run():
+        return [response async for response in llm.generate_content_async(request)]
+
+    return asyncio.run(run())
+
+
+def test_system_prompt_gets_cache_point(fake_bedrock, monkeypatch):
+    monkeypatch.setattr(Config, "PROMPT_CACHE_ENABLED", True)
+    api_base, bodies = fake_bedrock
+
+    responses = _call(CACHING_MODEL, api_base)
+
+    assert bodies[0]["system"] == [{"text": "Você é o orquestrador"}, {"cachePoint": {"type": "default"}}]
+    assert responses[-1].content.parts[0].text == "ok"
+
+
+def test_default_models_have_no_cache_marker(fake_bedrock, monkeypatch):
+    monkeypatch.setattr(Config, "PROMPT_CACHE_ENABLED", True)
+    api_base, bodies = fake_bedrock
+
+    # Modelos padrão sem cache de prompt no Bedrock: nada é injetado (e o log avisa)
+    assert all(Config.get_prompt_cache_args(model) == {} for model in DEFAULT_MODELS)
+    _call(DEFAULT_MODELS[0], api_base)
+
+    assert not any("cachePoint" in block for block in bodies[0]["system"])
+
+
+def test_disabled_cache_injects_nothing(monkeypatch):
+    monkeypatch.setattr(Config, "PROMPT_CACHE_ENABLED", False)
+
+    assert Config.get_prompt_cache_args(CACHING_MODEL) == {}
@@ -0,0 +1,103 @@
+"""
+Cache semântico das respostas do knowledge_base_agent
+"""
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+# rag/__init__ carrega o ChromaDB e o modelo de embeddings
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+from rag.response_cache import SemanticResponseCache
+
+VECTORS = {
+    "pc lento": np.array([1.0, 0.0, 0.0], dtype=np.float32),
+    "computador lento": np.array([0.99, 0.141, 0.0], dtype=np.float32),
+    "impressora atolada": np.array([0.0, 1.0, 0.0], dtype=np.float32),
+}
+
+
+def _cache():
+    cache = SemanticResponseCache(
+        similarity_threshold=0.9, ttl_seconds=60, max_entries=10, audit_rate=0.0, audit_max_samples=10
+    )
+    cache._embed = lambda text: VECTORS[text] / np.linalg.norm(VECTORS[text])
+    return cache
+
+
+def _context(invocation_id, user_text="sim"):
+    return SimpleNamespace(
+        invocation_id=invocation_id,
+        agent_name="knowledge_base_agent",
+        user_content=types.Content(role="user", parts=[types.Part(text=user_text)]),
+    )
+
+
+def _request(query=None, instruction="instrução do agente"):
+    contents = [types.Content(role="user", parts=[types.Part(text="sim")])]
+    if query is not None:
+        contents += [
+            types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+                name="search_knowledge_base", args={"query": query}
+            ))]),
+            types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+                name="search_knowledge_base", response={"result": "passos"}
+            ))]),
+        ]
+    return LlmRequest(contents=contents, config=types.GenerateContentConfig(system_instruction=instruction))
+
+
+def _answer(text):
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def _turn(cache, invocation_id, query, answer, instruction="instrução do agente"):
+    """Executa a chamada pós-busca; grava `answer` se não houver acerto. Retorna o texto do acerto"""
+    context = _context(invocation_id)
+    hit = asyncio.run(cache.before_model(context, _request(query, instruction)))
+    if hit is not None:
+        return hit.content.parts[0].text
+    cache.after_model(context, _answer(answer))
+    return None
+
+
+def test_first_model_call_is_not_looked_up():
+    cache = _cache()
+
+    assert asyncio.run(cache.before_model(_context("inv-1"), _request())) is None
+    assert cache.get_metrics()["misses"] == 0
+
+
+def test_key_is_the_search_query_not_the_user_message():
+    cache = _cache()
+    assert _turn(cache, "inv-1", "pc lento", "Reinicie o PC") is None
+
+    # Mesmo "sim" do usuário, busca diferente: não reaproveita
+    assert _turn(cache, "inv-2", "impressora atolada", "Abra a tampa") is None
+    # Busca parecida de outro usuário: reaproveita
+    assert _turn(cache, "inv-3", "computador lento", "nunca usada") == "Reinicie o PC"
+
+
+def test_changed_instruction_does_not_reuse_answers():
+    cache = _cache()
+    _turn(cache, "inv-1", "pc lento", "Reinicie o PC")
+
+    assert _turn(cache, "inv-2", "pc lento", "Nova resposta", instruction="instrução nova") is None
+
+
+def test_model_error_drops_pending_state():
+    cache = _cache()
+    context = _context("inv-1")
+    request = _request("pc lento")
+    asyncio.run(cache.before_model(context, request))
+    assert cache.get_metrics()["pending"] == 1
+
+    cache.on_model_error(context, request, RuntimeError("Bedrock indisponível"))
+
+    assert cache.get_metrics()["pending"] == 0
@@ -0,0 +1,73 @@
+"""
+Compactação da sessão ao encerrar atendimentos com problemas separados
+"""
+import asyncio
+
+import pytest
+
+# problem_splitter importa o pacote rag (ChromaDB e modelo de embeddings)
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+import problem_splitter
+from tests.fakes import SlowFakeLlm
+
+
+class _TicketingFakeLlm(SlowFakeLlm):
+    """Simula o create_ticket de um problema por turno (ticket na coleta do turno e atendimento encerrado)"""
+
+    created: int = 0
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        import tools
+        from session_manager import mark_attendance_completed
+
+        self.created += 1
+        ticket_id = f"TKT-{self.created}"
+        tools._turn_ticket_ids.get().append(ticket_id)
+        mark_attendance_completed(tools.get_current_user_id(), ticket_id)
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+@pytest.fixture
+def ticketing_api(chat_api, monkeypatch):
+    """API com separação de problemas e compactação ativas; devolve (api, lista de compactações)"""
+    from config import Config
+
+    monkeypatch.setattr(Config, "PROBLEM_SPLITTER_ENABLED", True)
+    monkeypatch.setattr(Config, "SESSION_COMPACTION_ENABLED", True)
+    monkeypatch.setattr(problem_splitter, "search_knowledge_base", lambda text, n: "")
+    monkeypatch.setattr(problem_splitter, "search_category_code", lambda text, n: "")
+    monkeypatch.setattr(problem_splitter, "classify_category_code", lambda text: {"decided": False})
+    compactions = []
+    monkeypatch.setattr(chat_api, "compact_completed_attendance", lambda *args: compactions.append(args))
+    chat_api.use_model(_TicketingFakeLlm(model="fake", delay=0.0, reply="Ticket criado."))
+    return chat_api, compactions
+
+
+def _compactions_per_turn(api, compactions, user_id, messages):
+    async def scenario():
+        counts = []
+        for message in messages:
+            await api.chat(api.MessageRequest(userId=user_id, message=message), idempotency_key=None)
+            counts.append(len(compactions))
+        return counts
+
+    return asyncio.run(scenario())
+
+
+def test_compaction_waits_for_every_split_problem(ticketing_api):
+    api, compactions = ticketing_api
+    messages = ["PC lento E impressora travada E email não abre", "Sim, resolveu", "Também resolveu"]
+
+    # Ticket do 1º e do 2º problema: o bloco com o 3º ainda é necessário
+    assert _compactions_per_turn(api, compactions, "compact_split", messages) == [0, 0, 1]
+
+
+def test_reservation_ticket_does_not_release_a_pending_technical_problem(ticketing_api):
+    api, compactions = ticketing_api
+    messages = ["Quero reservar a sala 202 e meu pc não liga", "Reservada; agora o PC"]
+
+    # O ticket da reserva não pode encerrar o bloco antes do problema do PC
+    assert _compactions_per_turn(api, compactions, "compact_mixed", messages) == [0, 1]
@@ -0,0 +1,81 @@
+"""
+Reparo do histórico da sessão: pares chamada/resposta de ferramenta
+"""
+from types import SimpleNamespace
+
+from google.adk.events import Event
+from google.genai import types
+
+from session_repair import INTERRUPTED_TOOL_RESPONSE, repair_session_events
+
+
+def _text(author: str, text: str) -> Event:
+    role = "user" if author == "user" else "model"
+    return Event(invocation_id="inv", author=author, content=types.Content(role=role, parts=[types.Part(text=text)]))
+
+
+def _call(call_id: str, name: str = "search_knowledge_base") -> Event:
+    return Event(
+        invocation_id="inv",
+        author="knowledge_base_agent",
+        content=types.Content(
+            role="model",
+            parts=[types.Part(function_call=types.FunctionCall(id=call_id, name=name, args={"query": "vpn"}))],
+        ),
+    )
+
+
+def _response(call_id: str, name: str = "search_knowledge_base") -> Event:
+    return Event(
+        invocation_id="inv",
+        author="knowledge_base_agent",
+        content=types.Content(
+            role="user",
+            parts=[types.Part(function_response=types.FunctionResponse(id=call_id, name=name, response={"ok": True}))],
+        ),
+    )
+
+
+def test_dangling_call_gets_an_error_response_right_after_it():
+    call = _call("call-1")
+    session = SimpleNamespace(events=[_text("user", "vpn caiu"), call, _text("user", "e agora?")])
+
+    counts = repair_session_events(session)
+
+    assert counts == {"dangling_call": 1, "orphan_result": 0}
+    assert session.events[1] is call
+    responses = session.events[2].get_function_responses()
+    assert [(r.id, r.name) for r in responses] == [("call-1", "search_knowledge_base")]
+    assert responses[0].response == INTERRUPTED_TOOL_RESPONSE
+    assert session.events[3].content.parts[0].text == "e agora?"
+
+
+def test_orphan_response_is_removed_with_its_empty_event():
+    session = SimpleNamespace(events=[_text("user", "vpn caiu"), _response("sem-chamada"), _text("orchestrator", "Ok")])
+
+    counts = repair_session_events(session)
+
+    assert counts == {"dangling_call": 0, "orphan_result": 1}
+    assert [e.content.parts[0].text for e in session.events] == ["vpn caiu", "Ok"]
+
+
+def test_orphan_part_is_dropped_but_the_rest_of_the_event_is_kept():
+    mixed = _response("sem-chamada")
+    mixed.content.parts.insert(0, types.Part(text="resultado parcial"))
+    session = SimpleNamespace(events=[_text("user", "vpn caiu"), mixed])
+
+    counts = repair_session_events(session)
+
+    assert counts["orphan_result"] == 1
+    assert [p.text for p in session.events[1].content.parts] == ["resultado parcial"]
+
+
+def test_healthy_history_is_left_untouched():
+    events = [_text("user", "vpn caiu"), _call("call-1"), _response("call-1"), _text("orchestrator", "Tente reconectar")]
+    session = SimpleNamespace(events=list(events))
+
+    counts = repair_session_events(session)
+
+    assert counts == {"dangling_call": 0, "orphan_result": 0}
+    assert session.events == events
+    assert all(a is b for a, b in zip(session.events, events))
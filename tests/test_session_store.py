@@ -0,0 +1,94 @@
+"""
+UserSessionStore: LRU/TTL não removem usuários com turno em andamento
+"""
+import asyncio
+
+from session_store import UserSessionStore, UserTurnLocks
+
+
+def _store(max_size=10, idle_ttl=60.0):
+    evicted = []
+    locks = UserTurnLocks()
+
+    async def on_evict(user_id, data):
+        evicted.append(user_id)
+
+    store = UserSessionStore(
+        max_size=max_size,
+        idle_ttl=idle_ttl,
+        on_evict=on_evict,
+        is_busy=lambda user_id: locks.pending(user_id) > 0,
+    )
+    return store, locks, evicted
+
+
+def test_sweep_skips_user_with_running_turn():
+    async def scenario():
+        store, locks, evicted = _store(idle_ttl=0.0)
+        await store.set("busy", {})
+        await store.set("idle", {})
+        await asyncio.sleep(0.01)
+        async with locks.hold("busy"):
+            await store.sweep()
+            assert "busy" in store
+        return store, evicted
+
+    store, evicted = asyncio.run(scenario())
+    assert evicted == ["idle"]
+    assert store.get_metrics()["evictions_deferred"] == 1
+
+
+def test_lru_evicts_oldest_idle_user():
+    async def scenario():
+        store, locks, evicted = _store(max_size=2)
+        await store.set("a", {})
+        await store.set("b", {})
+        async with locks.hold("a"):
+            await store.set("c", {})
+        return store, evicted
+
+    store, evicted = asyncio.run(scenario())
+    assert evicted == ["b"]
+    assert "a" in store and "c" in store
+
+
+def test_touch_renews_idle_ttl():
+    async def scenario():
+        store, _, evicted = _store(idle_ttl=0.05)
+        await store.set("u", {})
+        await asyncio.sleep(0.04)
+        store.touch("u")
+        await asyncio.sleep(0.02)
+        await store.sweep()
+        return evicted
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_turns_of_one_user_run_in_arrival_order_while_others_run_in_parallel():
+    async def scenario():
+        locks = UserTurnLocks()
+        log = []
+
+        async def turn(user_id, index, delay):
+            async with locks.hold(user_id):
+                log.append((user_id, index, "início"))
+                await asyncio.sleep(delay)
+                log.append((user_id, index, "fim"))
+
+        # Turnos do usuário "a" chegam em sequência (o 1º é o mais lento)
+        tasks = [asyncio.create_task(turn("a", i, 0.03 if i == 0 else 0.005)) for i in range(5)]
+        tasks.append(asyncio.create_task(turn("b", 0, 0.005)))
+        await asyncio.sleep(0)
+        pending_a = locks.pending("a")
+        await asyncio.gather(*tasks)
+        return log, pending_a, len(locks)
+
+    log, pending_a, remaining = asyncio.run(scenario())
+
+    a_events = [(index, phase) for user_id, index, phase in log if user_id == "a"]
+    assert a_events == [(i, phase) for i in range(5) for phase in ("início", "fim")]
+    # "b" não espera a fila de "a": termina antes do 1º turno de "a"
+    assert log.index(("b", 0, "fim")) < log.index(("a", 0, "fim"))
+    assert pending_a == 5
+    assert remaining == 0
@@ -0,0 +1,39 @@
+"""
+user_id por turno (contextvars): tickets criados em turnos simultâneos são
+atribuídos ao usuário certo
+"""
+import asyncio
+import random
+
+import tools
+from session_manager import session_manager
+
+USERS = 200
+
+
+async def _turn(user_id: str):
+    tools.set_current_user_id(user_id)
+    ticket_ids = tools.start_ticket_collection()
+    # Intercala os turnos; metade cria o ticket numa thread (como ferramentas síncronas)
+    await asyncio.sleep(random.uniform(0, 0.02))
+    if random.random() < 0.5:
+        result = await asyncio.to_thread(tools.create_ticket, user_id, f"problema de {user_id}")
+    else:
+        result = tools.create_ticket(user_id, f"problema de {user_id}")
+    await asyncio.sleep(random.uniform(0, 0.02))
+    assert tools.get_current_user_id() == user_id
+    return user_id, result["ticket_id"], list(ticket_ids)
+
+
+def test_concurrent_tickets_are_attributed_to_their_user():
+    async def scenario():
+        return await asyncio.gather(*[_turn(f"stress_{i}") for i in range(USERS)])
+
+    results = asyncio.run(scenario())
+
+    for user_id, ticket_id, turn_ticket_ids in results:
+        assert turn_ticket_ids == [ticket_id]
+        assert session_manager.sessions[user_id].ticket_id == ticket_id
+        assert session_manager.should_reset_context(user_id)
+        session_manager.remove_session(user_id)
+    assert len({ticket_id for _, ticket_id, _ in results}) == USERS
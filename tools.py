@@ -3,6 +3,7 @@ Tools para gerenciamento de tickets (apenas em cache local).
 Removido call externo; agora apenas organiza dados e armazena em memória.
 """
 from typing import Dict, Any, Optional, List
+from contextvars import ContextVar, Token
 from config import Config
 from logger import agent_logger
 import uuid
@@ -14,26 +15,45 @@ litellm.turn_off_message_logging = True
 litellm.suppress_debug_info = True
 litellm.drop_params = True
 
-# 🔥 Variável global para armazenar user_id atual
-_current_user_id = None
+# user_id do turno atual, isolado por requisição (contextvars): cada task
+# asyncio enxerga apenas o seu próprio valor, então turnos concorrentes de
+# usuários diferentes não se misturam
+_current_user_id: ContextVar[Optional[str]] = ContextVar("current_user_id", default=None)
 
 
-def set_current_user_id(user_id: str):
-    """Define o user_id atual para a thread"""
-    global _current_user_id
-    _current_user_id = user_id
+def set_current_user_id(user_id: str) -> Token:
+    """Define o user_id do turno atual (escopo da requisição/task)"""
+    token = _current_user_id.set(user_id)
     agent_logger.info(f"🔧 user_id definido no contexto: {user_id}")
+    return token
+
+
+def get_current_user_id() -> Optional[str]:
+    """user_id do turno atual, se definido"""
+    return _current_user_id.get()
+
+
+# Tickets criados no turno atual. A lista é criada no início do turno e
+# apenas recebe append, então é compartilhada mesmo por tasks filhas
+_turn_ticket_ids: ContextVar[Optional[List[str]]] = ContextVar("turn_ticket_ids", default=None)
+
+
+def start_ticket_collection() -> List[str]:
+    """Inicia a coleta dos tickets criados no turno atual e retorna a lista"""
+    ticket_ids: List[str] = []
+    _turn_ticket_ids.set(ticket_ids)
+    return ticket_ids
 
 
 def _get_user_id_from_context() -> Optional[str]:
     """Obtém user_id do contexto atual"""
-    global _current_user_id
-    if _current_user_id:
-        agent_logger.info(f"✅ user_id obtido do contexto: {_current_user_id}")
+    user_id = _current_user_id.get()
+    if user_id:
+        agent_logger.info(f"✅ user_id obtido do contexto: {user_id}")
     else:
         agent_logger.warning("⚠️ user_id não encontrado no contexto - usando default")
-        _current_user_id = "user_default"
-    return _current_user_id
+        user_id = "user_default"
+    return user_id
 
 
 class TicketAPIClient:
@@ -199,6 +219,10 @@ def create_ticket(
         if result["success"]:
             ticket_id = result["ticket_id"]
 
+            turn_ticket_ids = _turn_ticket_ids.get()
+            if turn_ticket_ids is not None:
+                turn_ticket_ids.append(ticket_id)
+
             if user_id:
                 agent_logger.info("\n" + "=" * 70)
                 agent_logger.info(f"🔄 MARCANDO SESSÃO COMO COMPLETA")
@@ -0,0 +1,73 @@
+"""
+Aquecimento do processo na inicialização e estado de prontidão (readiness)
+Cria os singletons pesados antes do primeiro atendimento
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from logger import agent_logger
+from rag import get_category_rag_instance, get_rag_instance
+
+log = agent_logger.with_prefix("WARMUP")
+
+WARMUP_QUERY = "computador lento"
+
+
+def warm_knowledge_base():
+    """Carrega Chroma + modelo de embeddings e executa uma busca de teste"""
+    rag = get_rag_instance()
+    rag.embed_query(WARMUP_QUERY)
+    rag.search_knowledge(WARMUP_QUERY, n_results=1)
+
+
+def warm_category_codes():
+    """Carrega a collection de códigos e executa uma busca de teste"""
+    category_rag = get_category_rag_instance()
+    category_rag.embed_query(WARMUP_QUERY)
+    category_rag.search_category_code(WARMUP_QUERY, n_results=1)
+
+
+class WarmupStatus:
+    """Executa as etapas de aquecimento e guarda prontidão e tempo de cada uma"""
+
+    def __init__(self):
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.finished = False
+        self.total_seconds: Optional[float] = None
+
+    async def run(self, steps: Dict[str, Callable[[], Any]]):
+        """Executa as etapas em sequência, fora do event loop"""
+        self.started_at = time.monotonic()
+        for name in steps:
+            self.components[name] = {"ready": False, "seconds": None, "error": None}
+
+        for name, step in steps.items():
+            started = time.monotonic()
+            try:
+                await asyncio.to_thread(step)
+                self.components[name]["ready"] = True
+                log.success(f"{name} pronto")
+            except Exception as exc:
+                self.components[name]["error"] = str(exc)
+                log.error(f"Falha no aquecimento de {name}: {exc}")
+            self.components[name]["seconds"] = round(time.monotonic() - started, 3)
+            log.info(f"{name}: {self.components[name]['seconds']}s")
+
+        self.total_seconds = round(time.monotonic() - self.started_at, 3)
+        self.finished = True
+        log.info(f"Aquecimento concluído em {self.total_seconds}s | pronto={self.is_ready()}")
+
+    def is_ready(self) -> bool:
+        """Pronto apenas quando todas as etapas terminaram com sucesso"""
+        return self.finished and all(c["ready"] for c in self.components.values())
+
+    def report(self) -> Dict[str, Any]:
+        """Resumo para o endpoint /ready"""
+        return {
+            "ready": self.is_ready(),
+            "warmup_finished": self.finished,
+            "warmup_seconds": self.total_seconds,
+            "components": self.components,
+        }